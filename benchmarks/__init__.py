@@ -0,0 +1,5 @@
+"""
+Ron benchmarks: routing, rendering, URL generation, caching and startup of generated applications.
+
+    python -m benchmarks [--modules 4] [--controllers 4] [--routes 10] [--output results.json] [--baseline baseline.json]
+"""
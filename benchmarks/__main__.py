@@ -0,0 +1,47 @@
+import argparse
+import sys
+import tempfile
+
+from benchmarks import runner
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks')
+    parser.add_argument('--modules', type=int, default=4, help='modules of the generated application')
+    parser.add_argument('--controllers', type=int, default=4, help='controllers per module')
+    parser.add_argument('--routes', type=int, default=10, help='static routes per controller')
+    parser.add_argument('--layout-depth', type=int, default=3, help='nested layouts of the rendered pages')
+    parser.add_argument('--number', type=int, default=1000, help='calls per round')
+    parser.add_argument('--repeat', type=int, default=5, help='rounds per benchmark')
+    parser.add_argument('--flat-routes', action='store_true', help='boot the application with flat_routes')
+    parser.add_argument('--root', help='folder for the generated application, a temporary one by default')
+    parser.add_argument('--output', help='write the results as JSON')
+    parser.add_argument('--baseline', help='JSON results to compare with')
+    parser.add_argument('--threshold', type=float, default=0.1, help='relative slowdown reported as a regression')
+    args = parser.parse_args(argv)
+
+    root = args.root or tempfile.mkdtemp(prefix='ronbench')
+    results = runner.run(root, modules=args.modules, controllers=args.controllers, routes=args.routes,
+                         layout_depth=args.layout_depth, number=args.number, repeat=args.repeat,
+                         flat_routes=args.flat_routes)
+
+    print('{name:<24} {best:>12} {median:>12}'.format(name='benchmark', best='best', median='median'))
+    for name, result in sorted(results['results'].items()):
+        unit = 'ms' if 'best_ms' in result else 'us'
+        print('{name:<24} {best:>9.2f} {unit} {median:>9.2f} {unit}'.format(
+            name=name, best=result['best_' + unit], median=result['median_' + unit], unit=unit))
+    if args.output:
+        runner.save(results, args.output)
+
+    regressions = 0
+    if args.baseline:
+        print('\n{name:<24} {base:>12} {now:>12} {ratio:>8}'.format(name='benchmark', base='baseline', now='now', ratio='ratio'))
+        for name, base, now, ratio, regression in runner.compare(results, runner.load(args.baseline), args.threshold):
+            regressions += regression
+            print('{name:<24} {base:>12.2f} {now:>12.2f} {ratio:>7.2f}x{flag}'.format(
+                name=name, base=base, now=now, ratio=ratio, flag='  REGRESSION' if regression else ''))
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,119 @@
+"""
+Generates synthetic Ron applications for the benchmarks.
+"""
+import os
+import textwrap
+
+PACKAGE = 'ronbench_app'
+
+
+def _write(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as fp:
+        fp.write(textwrap.dedent(content).lstrip())
+
+
+def controller_source(module_index, controller_index, routes):
+    lines = [
+        'from ron.web import Controller',
+        '',
+        '',
+        'class C{c}Controller(Controller):'.format(c=controller_index),
+        '',
+        "    base_route = '/c{c}'".format(c=controller_index),
+    ]
+    for route_index in range(routes):
+        lines += [
+            '',
+            "    @Controller.route('/r{r}')".format(r=route_index),
+            '    def r{r}(self):'.format(r=route_index),
+            "        return 'm{m} c{c} r{r}'".format(m=module_index, c=controller_index, r=route_index),
+        ]
+    lines += [
+        '',
+        "    @Controller.route('/item/<id:int>/<slug>')",
+        '    def item(self, id, slug):',
+        "        return '%d %s' % (id, slug)",
+        '',
+        "    @Controller.action('/page')",
+        '    def page(self):',
+        "        return dict(title='page', rows=list(range(20)))",
+        '',
+        '    @Controller.cached(ttl=3600)',
+        "    @Controller.route('/cached')",
+        '    def cached(self):',
+        "        return 'cached ' * 100",
+        '',
+    ]
+    return '\n'.join(lines)
+
+
+def generate_app(root, modules=4, controllers=4, routes=10, layout_depth=3):
+    """
+    Writes a Ron application package (``ronbench_app``) into root with the given number of
+    modules, controllers per module and static routes per controller. Every controller also has
+    a dynamic route, a templated page rendered in layout_depth nested layouts and a cached route.
+    ``ronbench_app.boot.build()`` returns the initialized application.
+    :return: the package path
+    :rtype: str
+    """
+    package = os.path.join(root, PACKAGE)
+    _write(os.path.join(package, '__init__.py'), '')
+
+    layouts = os.path.join(package, 'layouts')
+    for depth in range(layout_depth):
+        if depth == layout_depth - 1:
+            content = '<html><head><title>{{=title}}</title></head><body>{{include}}</body></html>\n'
+        else:
+            content = "{{extend %r}}\n<div class=\"l%d\">{{include}}</div>\n" % (
+                os.path.join(layouts, 'layout%d.tpl' % (depth + 1)), depth)
+        _write(os.path.join(layouts, 'layout%d.tpl' % depth), content)
+
+    module_config = []
+    for m in range(modules):
+        module_path = os.path.join(package, 'm%d' % m)
+        _write(os.path.join(module_path, '__init__.py'), '')
+        _write(os.path.join(module_path, 'module.py'), '''
+            from ron.base import Module
+
+
+            class M{m}Module(Module):
+                pass
+            '''.format(m=m))
+        _write(os.path.join(module_path, 'controllers', '__init__.py'), '')
+        for c in range(controllers):
+            _write(os.path.join(module_path, 'controllers', 'c%d.py' % c), controller_source(m, c, routes))
+            _write(os.path.join(module_path, 'views', 'c%d_controller' % c, 'page.tpl'), '''
+                {{extend layout}}
+                <ul>{{for row in rows:}}<li>{{=row}}</li>{{pass}}</ul>
+                ''')
+        module_config.append("                    '/m{m}': {{'class': import_module('{package}.m{m}.module').M{m}Module, 'options': {{}}}},".format(
+            m=m, package=PACKAGE))
+
+    _write(os.path.join(package, 'boot.py'), '''
+        import os
+        from importlib import import_module
+
+        from ron import Application
+        from ron.caching.cache import CacheComponent
+        from ron.models import PeeweeDB
+
+
+        def build(**options):
+            config = {{
+                'layout': os.path.join(os.path.dirname(__file__), 'layouts', 'layout0.tpl'),
+                'components': {{
+                    'cache_component': {{'class': CacheComponent, 'options': {{'type': 'memory'}}}},
+                    'db': {{'class': PeeweeDB, 'on_initialize': True,
+                           'options': {{'connection': 'sqlite:///' + os.path.join(os.path.dirname(__file__), 'db.sqlite')}}}},
+                }},
+                'modules': {{
+{modules}
+                }},
+            }}
+            config.update(options)
+            app = Application(config)
+            app.initialize()
+            return app
+        '''.format(modules='\n'.join(module_config)))
+    return package
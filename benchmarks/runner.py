@@ -0,0 +1,164 @@
+"""
+Runs the benchmarks against a generated application, in process, through its WSGI interface.
+"""
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+from time import perf_counter
+
+from benchmarks.generator import generate_app
+
+
+def wsgi_environ(path, method='GET', query=''):
+    return {
+        'REQUEST_METHOD': method,
+        'PATH_INFO': path,
+        'QUERY_STRING': query,
+        'SERVER_NAME': 'bench.local',
+        'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'wsgi.url_scheme': 'http',
+        'wsgi.input': io.BytesIO(),
+        'wsgi.errors': sys.stderr,
+    }
+
+
+def wsgi_call(app, path):
+    """
+    Calls the application for path and returns the status and the body
+    :rtype: tuple
+    """
+    status = []
+
+    def start_response(response_status, headers, exc_info=None):
+        status.append(response_status)
+
+    body = b''.join(app(wsgi_environ(path), start_response))
+    return status[0], body
+
+
+def measure(function, number=1000, repeat=5):
+    """
+    Calls function number times, repeat times
+    :return: seconds per call of the fastest and the median round, and the calls made
+    :rtype: dict
+    """
+    rounds = []
+    for _ in range(repeat):
+        start = perf_counter()
+        for _ in range(number):
+            function()
+        rounds.append((perf_counter() - start) / number)
+    return {
+        'best_us': min(rounds) * 1e6,
+        'median_us': statistics.median(rounds) * 1e6,
+        'ops_per_sec': 1 / min(rounds),
+        'iterations': number * repeat,
+    }
+
+
+def cold_start(root, repeat=3, **build_options):
+    """
+    Measures the application boot in fresh interpreters, imports included
+    :rtype: dict
+    """
+    script = ('import sys, time; start = time.perf_counter(); sys.path[:0] = [{package!r}, {root!r}]; '
+              'from ronbench_app.boot import build; build(**{options!r}); print(time.perf_counter() - start)').format(
+        package=os.path.dirname(os.path.dirname(os.path.abspath(__file__))), root=root, options=build_options)
+    timings = []
+    for _ in range(repeat):
+        output = subprocess.check_output([sys.executable, '-c', script], cwd=root, stderr=subprocess.DEVNULL)
+        timings.append(float(output.decode().strip().splitlines()[-1]))
+    return {'best_ms': min(timings) * 1000, 'median_ms': statistics.median(timings) * 1000, 'iterations': repeat}
+
+
+def run(root, modules=4, controllers=4, routes=10, layout_depth=3, number=1000, repeat=5, flat_routes=False):
+    """
+    Generates an application in root and runs every benchmark
+    :return: the results, with the parameters and the environment
+    :rtype: dict
+    """
+    generate_app(root, modules=modules, controllers=controllers, routes=routes, layout_depth=layout_depth)
+    build_options = {'flat_routes': flat_routes}
+    results = {'cold_start': cold_start(root, **build_options)}
+
+    sys.path.insert(0, root)
+    from ronbench_app.boot import build
+    app = build(**build_options)
+
+    last_module, last_controller = modules - 1, controllers - 1
+    paths = {
+        'dispatch_static_first': '/m0/c0/r0',
+        'dispatch_static_last': '/m%d/c%d/r%d' % (last_module, last_controller, routes - 1),
+        'dispatch_dynamic': '/m%d/c%d/item/42/slug' % (last_module, last_controller),
+        'render_page': '/m0/c0/page',
+        'cache_hit': '/m0/c0/cached',
+    }
+    for name, path in paths.items():
+        status, body = wsgi_call(app, path)
+        if not status.startswith('200'):
+            raise RuntimeError('{path} answered {status}'.format(path=path, status=status))
+        results[name] = measure(lambda path=path: wsgi_call(app, path), number, repeat)
+
+    view = app.modules['/m0'].view
+    results['render_template'] = measure(
+        lambda: view.render('c0_controller/page.tpl', title='page', rows=list(range(20))), number, repeat)
+
+    import bottle
+    from ron.helpers import URL
+    bottle.request.bind(wsgi_environ('/'))
+    action = 'ronbench_app.m%d.controllers.c%d.item' % (last_module, last_controller)
+    results['url_action'] = measure(lambda: URL(action=action, id=42, slug='slug'), number, repeat)
+    results['url_parts'] = measure(lambda: URL('a', 'b', vars={'x': 1}), number, repeat)
+
+    cache = app.cache_component.get_cache('ronbench')
+    cache.put('key', 'value')
+    results['cache_get'] = measure(lambda: cache.get('key'), number, repeat)
+
+    return {
+        'environment': {
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'platform': platform.platform(),
+        },
+        'parameters': {
+            'modules': modules, 'controllers': controllers, 'routes': routes, 'layout_depth': layout_depth,
+            'number': number, 'repeat': repeat, 'flat_routes': flat_routes,
+        },
+        'results': results,
+    }
+
+
+def _time(result):
+    return result.get('best_us', result.get('best_ms'))
+
+
+def compare(results, baseline, threshold=0.1):
+    """
+    Compares results with baseline results, benchmark by benchmark
+    :param threshold: relative slowdown reported as a regression
+    :return: (name, baseline time, time, ratio, regression) tuples
+    :rtype: list
+    """
+    rows = []
+    for name, result in sorted(results['results'].items()):
+        base = baseline['results'].get(name)
+        if base is None:
+            continue
+        ratio = _time(result) / _time(base)
+        rows.append((name, _time(base), _time(result), ratio, ratio > 1 + threshold))
+    return rows
+
+
+def save(results, path):
+    with open(path, 'w') as fp:
+        json.dump(results, fp, indent=1, sort_keys=True)
+
+
+def load(path):
+    with open(path) as fp:
+        return json.load(fp)
@@ -1,4 +1,5 @@
 from .app import Application
+from .web.server import serve
 from bottle import debug
 from bottle import run
 from bottle import static_file
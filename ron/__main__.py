@@ -0,0 +1,81 @@
+"""
+Ron command line tools.
+
+    python -m ron compile-templates package.module:app [--output templates.bundle]
+    python -m ron compress-statics [static_folder]
+    python -m ron freeze-routes package.module:app [--output routes.manifest]
+
+The application reference must point to an initialized Application instance.
+"""
+import argparse
+import sys
+from importlib import import_module
+
+
+def load_application(reference):
+    module_name, _, attribute = reference.partition(':')
+    return getattr(import_module(module_name), attribute or 'app')
+
+
+def compile_templates(args):
+    from ron.templates.bundle import TemplateBundle
+    app = load_application(args.app)
+    bundle = TemplateBundle(config={'path': args.output})
+    errors = bundle.build(app)
+    bundle.save()
+    print('{count} templates compiled into {path}'.format(count=len(bundle.entries), path=bundle.path))
+    for filename, error in errors:
+        print('  skipped {filename}: {error!r}'.format(filename=filename, error=error))
+    return 0
+
+
+def compress_statics(args):
+    from ron.web.statics import StaticFiles
+    written = StaticFiles(config={'root': args.root}).compress(min_size=args.min_size)
+    print('{count} compressed files written'.format(count=len(written)))
+    return 0
+
+
+def freeze_routes(args):
+    from ron.base.lazymodule import LazyModule
+    from ron.web.manifest import RouteManifest
+    app = load_application(args.app)
+    LazyModule.load_all()
+    manifest = RouteManifest(config={'path': args.output})
+    errors = manifest.build(app)
+    manifest.save()
+    print('{count} controller packages frozen into {path}'.format(count=len(manifest.entries), path=manifest.path))
+    for namespace, error in errors:
+        print('  skipped {namespace}: {error!r}'.format(namespace=namespace, error=error))
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m ron')
+    commands = parser.add_subparsers(dest='command')
+
+    command = commands.add_parser('compile-templates', help='precompile views into an on-disk bundle')
+    command.add_argument('app', help='application reference, as package.module:attribute')
+    command.add_argument('--output', default='templates.bundle', help='bundle file path')
+    command.set_defaults(handler=compile_templates)
+
+    command = commands.add_parser('compress-statics', help='write .gz/.br variants of static files')
+    command.add_argument('root', nargs='?', default='static', help='static folder')
+    command.add_argument('--min-size', type=int, default=256, help='smallest file size to compress')
+    command.set_defaults(handler=compress_statics)
+
+    command = commands.add_parser('freeze-routes', help='write the discovered controllers and routes to a manifest')
+    command.add_argument('app', help='application reference, as package.module:attribute')
+    command.add_argument('--output', default='routes.manifest', help='manifest file path')
+    command.set_defaults(handler=freeze_routes)
+
+    args = parser.parse_args(argv)
+    if not getattr(args, 'handler', None):
+        parser.print_help()
+        return 1
+    sys.path.insert(0, '')
+    return args.handler(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
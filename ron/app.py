@@ -1,13 +1,24 @@
 import os
 
 import sys
-from bottle import static_file
+from typing import Callable
 
 from ron.base import Module
+from ron.base.lazymodule import LazyModule
+from ron.base.profiler import boot_profiler
 from ron.base.singleton import Singleton
 from ron.caching.cache import CacheComponent
 from ron.models import PeeweeDB
+from ron.templates.bundle import TemplateBundle
+from ron.web.asgi import ASGIAdapter, use_context_locals
+from ron.web.compression import CompressionMiddleware, compression_stats
+from ron.web.conditional import ConditionalPlugin
+from ron.web.jsonencoder import get_engine
 from ron.web.session import SessionComponent
+from ron.web.manifest import RouteManifest
+from ron.web.metrics import MetricsPlugin, ResponseSizeMiddleware
+from ron.web.router import build_flat_router
+from ron.web.statics import StaticFiles
 from ron.web.urlmanager import UrlManagerComponent
 
 
@@ -34,32 +45,162 @@ class Application(Module, metaclass=Singleton):
     # application URL manager component
     url_manager: UrlManagerComponent = None
 
+    # precompiled templates bundle path, see ron.templates.bundle
+    template_bundle: str = None
+
+    # route manifest path, see ron.web.manifest
+    route_manifest: str = None
+
+    # controllers and routes loaded from route_manifest
+    frozen_routes: RouteManifest = None
+
+    # static files configuration, see ron.web.statics.StaticFiles
+    statics: dict = {}
+
+    # static files server
+    static_files: StaticFiles = None
+
+    # compile the routes of the application and its mounted modules into a single router
+    flat_routes: bool = False
+
+    # mount modules as stubs and load them on their first request, see ron.base.lazymodule
+    lazy_modules: bool = False
+
+    # with lazy_modules, seconds after initialization to load every module in the background.
+    # None disables the warm up
+    lazy_modules_warm_up: float = None
+
+    # measure every route by controller action, see ron.web.metrics
+    metrics: bool = False
+
+    # path of the metrics text endpoint
+    metrics_path: str = '/metrics'
+
+    # metrics plugin, installed in every module when metrics is enabled
+    metrics_plugin: MetricsPlugin = None
+
+    # print a report of the boot phases durations after initialize, see ron.base.profiler
+    boot_profile: bool = False
+
+    # path of the JSON boot profile report
+    boot_profile_output: str = None
+
+    # threads running sync controller actions when served through get_asgi()
+    asgi_threads: int = None
+
+    # make bottle.request and bottle.response context-local for the whole process, required by
+    # async actions, see ron.web.asgi.use_context_locals
+    asgi_context_locals: bool = False
+
+    # add ETags to rendered and JSON responses and answer conditional GETs, see ron.web.conditional
+    etags: bool = False
+
+    # JSON engine of dict responses: 'auto' (orjson when installed, json otherwise), 'orjson',
+    # 'json' or a dumps function, see ron.web.jsonencoder
+    json_engine: str = 'auto'
+
+    # dumps function of json_engine, used by the JSON plugin of every module
+    json_dumps: Callable = None
+
     def __init__(self, config=None, catchall=True, autojson=True):
         # self.__name__ = name
 
-        Module.__init__(self, config=config, catchall=catchall, autojson=autojson)
-        self._expose_statics()
+        if isinstance(config, dict) and config.get('boot_profile'):
+            boot_profiler.enable(config.get('boot_profile_output'))
+        with boot_profiler.phase('create', self.__class__.__name__):
+            Module.__init__(self, config=config, catchall=catchall, autojson=autojson)
+            self.json_dumps = get_engine(self.json_engine)
+            if self.asgi_context_locals:
+                use_context_locals()
+            self._expose_statics()
+            if self.template_bundle:
+                self.view.template_adapter.bundle = TemplateBundle(config={'path': self.template_bundle}).load()
+            if self.route_manifest:
+                self.frozen_routes = RouteManifest(config={'path': self.route_manifest}).load()
+            if self.metrics:
+                self._expose_metrics()
+            if self.etags:
+                self.module_plugins.append(ConditionalPlugin())
         # self.load_components()
 
-    def get_with_middleware(self):
+    def initialize(self):
+        with boot_profiler.phase('boot', self.__class__.__name__):
+            Module.initialize(self)
+            if self.flat_routes:
+                with boot_profiler.phase('flat_routes', self.__class__.__name__):
+                    self.flatten_routes()
+        if self.lazy_modules and self.lazy_modules_warm_up is not None:
+            LazyModule.warm_up(self.lazy_modules_warm_up)
+        boot_profiler.finish()
+
+    def flatten_routes(self):
+        """
+        Replaces the application router with a FlatRouter containing the routes of every mounted
+        module, so a request is matched once instead of once per mount level. Hooks and error
+        handlers of mounted modules are not used for flattened routes.
+        """
+        self.router = build_flat_router(self)
+
+    def get_with_middleware(self, app=None):
         """
         Returns current application applying middlewares from configuration
+        :param app: WSGI application to wrap instead of this one
         :return: Application middleware
         :rtype: Middleware
         """
-        app = self
+        app = app or self
+        if self.metrics_plugin is not None:
+            app = ResponseSizeMiddleware(app, self.metrics_plugin)
         for middleware_data in self.middlewares:
             app = middleware_data['class'](app, **middleware_data.get('options', {}))
         return app
 
+    def get_asgi(self):
+        """
+        Returns an ASGI application serving this one, see ron.web.asgi
+        :rtype: ASGIAdapter
+        """
+        return ASGIAdapter(self, threads=self.asgi_threads)
+
     def _expose_statics(self):
         """
         Expose statics folder
         """
+        self.static_files = StaticFiles(config=self.statics)
+
         @self.route('/static/<filename:path>')
         @self.route('/static/_<version:re:\d+\.\d+\.\d+>/<filename:path>')
-        def server_static(filename, path='', version=None):
-            return static_file(filename, root=os.path.join(path, 'static'))
+        def server_static(filename, version=None):
+            return self.static_files.serve(filename, versioned=version is not None)
+
+    def _expose_metrics(self):
+        """
+        Installs the metrics plugin in every module and exposes the metrics text endpoint
+        """
+        self.metrics_plugin = MetricsPlugin(collectors=[self._database_metrics, self._compression_metrics])
+        self.module_plugins.append(self.metrics_plugin)
+        self.route(self.metrics_path, callback=self.metrics_plugin.serve, skip=[self.metrics_plugin])
+
+    def _database_metrics(self):
+        if not self.db:
+            return []
+        lines = ['# TYPE ron_db_queries_total counter']
+        stats = sorted(self.db.query_stats().items())
+        for action, action_stats in stats:
+            lines.append('ron_db_queries_total{action="%s"} %d' % (action, action_stats['queries']))
+        lines.append('# TYPE ron_db_n_plus_one_total counter')
+        for action, action_stats in stats:
+            lines.append('ron_db_n_plus_one_total{action="%s"} %d' % (action, action_stats['n_plus_one']))
+        for database, pool_stats in sorted(self.db.pool_stats().items()):
+            for name in ('in_use', 'idle', 'waiting', 'created', 'recycled'):
+                lines.append('ron_db_pool_%s{database="%s"} %d' % (name, database, pool_stats[name]))
+        return lines
+
+    def _compression_metrics(self):
+        if not any(isinstance(middleware['class'], type) and issubclass(middleware['class'], CompressionMiddleware)
+                   for middleware in self.middlewares):
+            return []
+        return compression_stats.lines()
 
     def find_action(self, action):
         action_name = action.split('.')[-1]
@@ -0,0 +1,100 @@
+import threading
+
+from ron.web.reverse import reverse_index
+
+# serializes module loading, which changes shared routing state
+_load_lock = threading.RLock()
+
+
+class LazyModule:
+    """
+    WSGI stub mounted in place of a module until the first request under its prefix.
+
+    Loading instantiates the module and imports its controllers and models; the stub then
+    forwards every request to the loaded module. Loading happens once, even with
+    concurrent requests.
+    """
+
+    # stubs whose module was not loaded yet
+    pending = []
+
+    def __init__(self, parent, name, config):
+        self.parent = parent
+        self.name = name
+        self.config = config
+        self.namespace = config['class'].__module__.rsplit('.', 1)[0]
+        self.module = None
+        LazyModule.pending.append(self)
+
+    def load(self):
+        """
+        Returns the module, loading it on the first call
+        :rtype: ron.base.Module
+        """
+        if self.module is None:
+            with _load_lock:
+                if self.module is None:
+                    self.module = self.parent.load_module(self.name, self.config, mount=False)
+                    if self in LazyModule.pending:
+                        LazyModule.pending.remove(self)
+                    from ron import Application
+                    app = Application()
+                    if app.url_manager:
+                        # swaps in new routes and router, see UrlManagerComponent.update
+                        app.url_manager.update(strict=False)
+        return self.module
+
+    def __call__(self, environ, start_response):
+        return self.load()(environ, start_response)
+
+    def namespaces(self, config=None):
+        """
+        Returns the package names of the module and of the submodules in its configuration,
+        found without importing anything else
+        :rtype: list
+        """
+        config = self.config if config is None else config
+        namespaces = [config['class'].__module__.rsplit('.', 1)[0]]
+        for submodule in (config.get('options') or {}).get('modules', {}).values():
+            namespaces.extend(self.namespaces(submodule))
+        return namespaces
+
+    @classmethod
+    def resolve(cls, action):
+        """
+        Loads the pending module an action name belongs to, directly or through one of its
+        configured submodules. Unknown actions load nothing, so reverse_index raises for them.
+        Route names, which carry no package, are found only once their module is loaded
+        :return: whether a module was loaded
+        :rtype: bool
+        """
+        for stub in list(cls.pending):
+            if any(action.startswith(namespace + '.') for namespace in stub.namespaces()):
+                stub.load()
+                return True
+        return False
+
+    @classmethod
+    def load_all(cls):
+        stubs = list(cls.pending)
+        while stubs:
+            for stub in stubs:
+                stub.load()
+            # loaded modules may have lazy submodules of their own
+            stubs = list(cls.pending)
+
+    @classmethod
+    def warm_up(cls, delay=0):
+        """
+        Loads every pending module in a background thread
+        :param delay: seconds to wait before loading
+        :type delay: float
+        :rtype: threading.Thread
+        """
+        timer = threading.Timer(delay, cls.load_all)
+        timer.daemon = True
+        timer.start()
+        return timer
+
+
+reverse_index.resolvers.append(LazyModule.resolve)
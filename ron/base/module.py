@@ -3,12 +3,15 @@ import os
 import pkgutil
 
 from importlib import import_module
-from bottle import Bottle
+from bottle import Bottle, JSONPlugin
 
+from ron.base.lazymodule import LazyModule
+from ron.base.profiler import boot_profiler
 from ron.base.ronobject import RonObject
 from ron.base.view import View
 from ron.exceptions.invalid_configuration_exception import InvalidConfigurationException
 from ron.web import Controller
+from ron.web.reverse import reverse_index
 
 
 class Module(Bottle, RonObject):
@@ -29,6 +32,9 @@ class Module(Bottle, RonObject):
     # mount type can be used for defining mount behavior, can be "mount" or "merge"
     mount_type = 'mount'
 
+    # load the module on its first request. None follows Application.lazy_modules
+    lazy = None
+
     controllers = {}
 
     models = []
@@ -42,6 +48,15 @@ class Module(Bottle, RonObject):
     # module base path
     base_path = None
 
+    # path this module is mounted at, relative to mount_parent
+    mount_prefix = ''
+
+    # module this one is mounted in or merged into
+    mount_parent = None
+
+    # controllers and routes registered by init_controllers, as stored in a route manifest
+    controller_routes = None
+
     # Module namespace. Private
     __namespace = None
 
@@ -82,7 +97,8 @@ class Module(Bottle, RonObject):
                     component_data['options'] = {}
 
                 component_data['options']['module'] = self
-                component = RonObject.instanceObject(component_data)
+                with boot_profiler.phase('component', name):
+                    component = RonObject.instanceObject(component_data)
                 setattr(self, name, component)
 
 
@@ -92,14 +108,31 @@ class Module(Bottle, RonObject):
         return parent_name
 
     def initialize(self):
-        self.load_components(on_initialize=True)
-        for plugin in self.module_plugins:
-            self.install(plugin)
-        if self.__namespace:
-            self.init_controllers()
-            self.init_models()
-        if self.modules:
-            self.init_modules(self.modules)
+        name = self.__class__.__name__
+        with boot_profiler.phase('initialize', name):
+            self.load_components(on_initialize=True)
+            self.use_json_engine()
+            for plugin in self.module_plugins:
+                self.install(plugin)
+            if self.__namespace:
+                with boot_profiler.phase('controllers', name):
+                    self.init_controllers()
+                with boot_profiler.phase('models', name):
+                    self.init_models()
+            if self.modules:
+                self.init_modules(self.modules)
+
+    def use_json_engine(self):
+        """
+        Makes the autojson plugin of the module serialize with the application JSON engine
+        """
+        from ron import Application
+        json_dumps = Application().json_dumps
+        if json_dumps is None:
+            return
+        for plugin in self.plugins:
+            if isinstance(plugin, JSONPlugin):
+                plugin.json_dumps = json_dumps
 
     def init_controllers(self):
         """Initializes all the controllers in the [controllers_path] directory and registers them against the currently
@@ -113,15 +146,57 @@ class Module(Bottle, RonObject):
             return None
 
         from ron import Application
-        controllers_modules = self._get_package_modules(controllers_package)
-        for controller_name in controllers_modules:
-            imported_controller = import_module('.' + controller_name, package=controllers_namespace)
+        app = Application()
+        frozen = app.frozen_routes.get(controllers_namespace, controllers_package) if app.frozen_routes else None
+        if frozen is None:
+            controllers = self._discover_controllers(controllers_namespace, controllers_package)
+        else:
+            controllers = self._frozen_controllers(controllers_namespace, frozen)
+
+        self.controller_routes = []
+        for controller_name, attribute_name, controller_class, routes in controllers:
+            if routes is None:
+                controller_instance = controller_class(self)
+            else:
+                controller_instance = controller_class(self, routes=[(route['action'], route['params']) for route in routes])
+            self.controllers[controllers_namespace+'.'+controller_name] = controller_instance
+            app.controllers[controllers_namespace+'.'+controller_name] = controller_instance
+            self.controller_routes.append({
+                'controller': controllers_namespace + '.' + controller_name + '.' + attribute_name,
+                'base_route': controller_instance.base_route,
+                'routes': [{'action': action, 'params': params} for action, params in getattr(controller_instance, 'bound_routes', [])],
+            })
+
+    def _discover_controllers(self, controllers_namespace, controllers_package):
+        """
+        Finds the controller classes of every module in the controllers package
+        :return: (controller module name, attribute name, class, None) tuples
+        :rtype: list
+        """
+        controllers = []
+        for controller_name in self._get_package_modules(controllers_package):
+            with boot_profiler.phase('import', controllers_namespace + '.' + controller_name):
+                imported_controller = import_module('.' + controller_name, package=controllers_namespace)
             for i in dir(imported_controller):
                 attribute = getattr(imported_controller, i)
                 if inspect.isclass(attribute) and issubclass(attribute, Controller):
-                    controller_class = attribute(self)
-                    self.controllers[controllers_namespace+'.'+controller_name] = controller_class
-                    Application().controllers[controllers_namespace+'.'+controller_name] = controller_class
+                    controllers.append((controller_name, i, attribute, None))
+        return controllers
+
+    @staticmethod
+    def _frozen_controllers(controllers_namespace, frozen):
+        """
+        Imports the controller classes listed in a route manifest
+        :return: (controller module name, attribute name, class, routes) tuples
+        :rtype: list
+        """
+        controllers = []
+        for record in frozen:
+            module_name, attribute_name = record['controller'].rsplit('.', 1)
+            with boot_profiler.phase('import', module_name):
+                controller_class = getattr(import_module(module_name), attribute_name)
+            controllers.append((module_name[len(controllers_namespace) + 1:], attribute_name, controller_class, record['routes']))
+        return controllers
 
     def init_models(self):
         """
@@ -137,34 +212,68 @@ class Module(Bottle, RonObject):
         except:
             models_package = None
         if models_package:
+            # Module.models is a class attribute shared by every module
+            self.models = list(self.models)
             models_modules = self._get_package_modules(models_package)
             for model_name in models_modules:
-                imported_model = import_module('.' + model_name, package=models_namespace)
+                with boot_profiler.phase('import', models_namespace + '.' + model_name):
+                    imported_model = import_module('.' + model_name, package=models_namespace)
                 for i in dir(imported_model):
                     attribute = getattr(imported_model, i)
-                    if inspect.isclass(attribute) and issubclass(attribute, BaseModel):
+                    if inspect.isclass(attribute) and issubclass(attribute, BaseModel) and attribute not in self.models:
                         self.models.append(attribute)
-            Application().db().database.create_tables(self.models)
+            with boot_profiler.phase('ddl', models_namespace):
+                Application().db.create_tables(self.models)
 
     def init_modules(self, modules):
-        for module_name in modules:
-            module_class = modules[module_name].get('_class')
-            module_instance = RonObject.instanceObject(modules[module_name])
-            module_instance.initialize()
-            if module_instance.mount_type == 'mount':
-                self.mount(module_name, module_instance)
-            elif module_instance.mount_type == 'merge':
-                self.merge(module_instance)
-            else:
-                raise InvalidConfigurationException(
-                    'Mount type should be "mount" or "merge", not {mount_type}'.format(mount_type=self.mount_type))
-            # self.modules.append(module_instance)
-            modules[module_name] = module_instance
         from ron import Application
         app = Application()
+        for module_name in modules:
+            module_class = modules[module_name].get('class')
+            lazy = app.lazy_modules if getattr(module_class, 'lazy', None) is None else module_class.lazy
+            if lazy and getattr(module_class, 'mount_type', 'mount') == 'mount':
+                self.mount(module_name, LazyModule(self, module_name, modules[module_name]))
+            else:
+                self.load_module(module_name, modules[module_name])
+        reverse_index.reset()
         if app.url_manager:
-            app.url_manager.remove_defined_routes()
-            app.url_manager.set_routes()
+            # rules pointing to modules not initialized yet are resolved by the application call
+            with boot_profiler.phase('url_manager', self.__class__.__name__):
+                app.url_manager.update(strict=self is app and not LazyModule.pending)
+
+    def load_module(self, module_name, config, mount=True):
+        """
+        Instantiates and initializes a submodule from its configuration and attaches it to this module
+        :param mount: mount the module. False when it is already reachable through a LazyModule
+        :type mount: bool
+        :rtype: Module
+        """
+        with boot_profiler.phase('create', module_name):
+            module_instance = RonObject.instanceObject(config)
+        module_instance.initialize()
+        if module_instance.mount_type == 'mount':
+            if mount:
+                self.mount(module_name, module_instance)
+            module_instance.mount_prefix = '/' + '/'.join(p for p in module_name.split('/') if p)
+        elif module_instance.mount_type == 'merge':
+            self.merge(module_instance)
+        else:
+            raise InvalidConfigurationException(
+                'Mount type should be "mount" or "merge", not {mount_type}'.format(mount_type=self.mount_type))
+        module_instance.mount_parent = self
+        self.modules[module_name] = module_instance
+        return module_instance
+
+    def url_prefix(self):
+        """
+        Returns the path this module is reachable at from the application root
+        :rtype: str
+        """
+        prefix, module = '', self
+        while module is not None:
+            prefix = module.mount_prefix + prefix
+            module = module.mount_parent
+        return prefix
 
     def app(self):
         current = self
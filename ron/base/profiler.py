@@ -0,0 +1,86 @@
+import json
+import os
+from contextlib import contextmanager
+from time import perf_counter
+
+
+class BootProfiler:
+    """
+    Times the phases of the application boot: module and component creation, module
+    initialization, controller and model imports, DDL and URL manager rewrites.
+
+    Disabled unless ``Application.boot_profile`` is set or the ``RON_BOOT_PROFILE`` environment
+    variable is defined (``1``, or the path of the JSON report).
+    """
+
+    def __init__(self):
+        env = os.environ.get('RON_BOOT_PROFILE')
+        self.enabled = bool(env)
+        # JSON report path
+        self.output = env if env and env != '1' else None
+        # (kind, name, start, duration, depth) in start order
+        self.entries = []
+        self._depth = 0
+
+    def enable(self, output=None):
+        self.enabled = True
+        if output:
+            self.output = output
+
+    @contextmanager
+    def phase(self, kind, name):
+        """
+        Times the code run inside the context as a boot phase, if profiling is enabled
+        :param kind: phase kind, e.g. 'initialize', 'import', 'ddl'
+        :param name: module, component or python module name
+        """
+        if not self.enabled:
+            yield
+            return
+        index = len(self.entries)
+        self.entries.append(None)
+        self._depth += 1
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self._depth -= 1
+            self.entries[index] = (kind, name, start, perf_counter() - start, self._depth)
+
+    def phases(self):
+        """
+        Returns the recorded phases, slowest first
+        :rtype: list
+        """
+        return sorted(({'kind': kind, 'name': name, 'start': start, 'duration': duration, 'depth': depth}
+                       for kind, name, start, duration, depth in filter(None, self.entries)),
+                      key=lambda phase: phase['duration'], reverse=True)
+
+    def report(self, limit=40):
+        """
+        Returns the slowest phases as a text table
+        :rtype: str
+        """
+        lines = ['{duration:>10}  {kind:<12} {name}'.format(duration='ms', kind='phase', name='name')]
+        for phase in self.phases()[:limit]:
+            lines.append('{duration:>10.2f}  {kind:<12} {name}'.format(
+                duration=phase['duration'] * 1000, kind=phase['kind'], name=phase['name']))
+        return '\n'.join(lines)
+
+    def save(self, path):
+        with open(path, 'w') as fp:
+            json.dump({'pid': os.getpid(), 'phases': self.phases()}, fp, indent=1)
+
+    def finish(self):
+        """
+        Prints the report and writes it as JSON when an output path is set
+        """
+        if not self.enabled:
+            return
+        print(self.report())
+        if self.output:
+            self.save(self.output)
+
+
+# profiler of the current process
+boot_profiler = BootProfiler()
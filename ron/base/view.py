@@ -1,5 +1,6 @@
 import functools
 import os
+from time import perf_counter
 
 from bottle import template as bottle_template
 
@@ -7,6 +8,7 @@ from ron.base.basecomponent import BaseComponent
 from collections.abc import MutableMapping
 
 from ron.templates.yatl_template import YatlTemplate
+from ron.web.metrics import record_render
 
 
 class View(BaseComponent):
@@ -17,6 +19,19 @@ class View(BaseComponent):
     # views path
     path = 'views'
 
+    # template lookup list. Kept between calls so bottle reuses the prepared template adapters
+    _lookup = None
+
+    def template_lookup(self):
+        """
+        Returns the template lookup list for this view
+        :rtype: list
+        """
+        path = os.path.join(self.module.base_path, self.path)
+        if self._lookup != [path]:
+            self._lookup = [path]
+        return self._lookup
+
     def render(self, view_file, *args, **params):
         """
         Renders a view.
@@ -31,8 +46,30 @@ class View(BaseComponent):
         """
         template = functools.partial(bottle_template, template_adapter=self.template_adapter)
         from ron import Application
-        return template(view_file, *args, template_lookup=[os.path.join(self.module.base_path, self.path)], layout=Application().layout, **params)
+        start = perf_counter()
+        try:
+            return template(view_file, *args, template_lookup=self.template_lookup(), layout=Application().layout, **params)
+        finally:
+            record_render(perf_counter() - start)
 
+    def stream(self, view_file, *args, chunk_size=4096, **params):
+        """
+        Renders a view as a generator of chunks, so the response is sent while it is rendered.
+        :param view_file: the view name.
+        :type view_file: str
+        :param chunk_size: minimum size of the chunks sent to the client
+        :type chunk_size: int
+        :param params: the parameters (name-value pairs) that will be made available in the view file.
+        :type params:
+        :return: the rendering result
+        :rtype: generator
+        """
+        from ron import Application
+        params['layout'] = Application().layout
+        template = self.template_adapter(name=view_file, lookup=self.template_lookup())
+        if not hasattr(template, 'stream'):
+            return iter([template.render(*args, **params)])
+        return template.stream(*args, chunk_size=chunk_size, **params)
 
     def __call__(self, view_file, **defaults):
         ''' Decorator: renders a template for a handler.
@@ -47,16 +84,13 @@ class View(BaseComponent):
         def decorator(func):
             @functools.wraps(func)
             def wrapper(controller, *args, **kwargs):
-                from bottle import template
-                template = functools.partial(template, template_adapter=self.template_adapter)
                 result = func(controller, *args, **kwargs)
-                from ron import Application
                 if isinstance(result, (dict, MutableMapping)):
                     tplvars = defaults.copy()
                     tplvars.update(result)
-                    return template(view_file, layout=Application().layout, **tplvars)
+                    return self.render(view_file, **tplvars)
                 elif result is None:
-                    return template(view_file, defaults, layout=Application().layout)
+                    return self.render(view_file, defaults)
                 return result
 
             return wrapper
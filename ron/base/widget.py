@@ -1,8 +1,20 @@
+import hashlib
+
 
 class Widget:
 
-    def __init__(self, options=dict()):
+    # seconds the rendered widget is kept in the fragment cache. None disables caching
+    cache_ttl = None
+
+    # request attributes included in the fragment cache key
+    cache_vary = ('path',)
+
+    def __init__(self, options=dict(), cache_ttl=None, cache_vary=None):
         self.options = options
+        if cache_ttl is not None:
+            self.cache_ttl = cache_ttl
+        if cache_vary is not None:
+            self.cache_vary = cache_vary
 
     def run(self):
         raise NotImplementedError
@@ -10,5 +22,19 @@ class Widget:
     def __str__(self):
         return self.xml()
 
+    def cache_key(self):
+        from ron import request
+        parts = [self.__class__.__module__, self.__class__.__qualname__, self.options]
+        parts.extend(getattr(request, attribute, None) for attribute in self.cache_vary)
+        return hashlib.sha1(repr(parts).encode('utf8')).hexdigest()
+
     def xml(self):
-        return self.run()
+        if not self.cache_ttl:
+            return self.run()
+        from ron.caching.fragment import fragment_cache
+        key = self.cache_key()
+        text = fragment_cache.get(key)
+        if text is None:
+            text = self.run()
+            fragment_cache.put(key, text, self.cache_ttl)
+        return text
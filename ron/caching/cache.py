@@ -1,4 +1,10 @@
+import pickle
 import sys
+import threading
+import time
+from collections import OrderedDict
+
+from ron.exceptions.invalid_configuration_exception import InvalidConfigurationException
 
 try:
     from beaker.cache import CacheManager
@@ -6,7 +12,192 @@ except ModuleNotFoundError as e:
     print("Required beaker module, try to install it with 'pip install beaker'")
     sys.exit(1)
 
+
+def approximate_size(value):
+    if isinstance(value, (str, bytes)):
+        return len(value)
+    try:
+        return len(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return sys.getsizeof(value)
+
+
+class LRUCache:
+    """
+    Bounded in-process cache limited by entry count and approximate size in bytes, with per-key TTL
+    """
+
+    def __init__(self, max_entries=1024, max_bytes=None, ttl=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """
+        Returns the value stored for key
+        :raises KeyError: if key is missing or expired
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] is not None and entry[0] <= time.time():
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                raise KeyError(key)
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def put(self, key, value, ttl=None):
+        ttl = min(t for t in (ttl, self.ttl) if t) if ttl or self.ttl else None
+        size = approximate_size(value)
+        if self.max_bytes and size > self.max_bytes:
+            self.remove(key)
+            return
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (time.time() + ttl if ttl else None, size, value)
+            self.bytes += size
+            while self._entries and (len(self._entries) > self.max_entries
+                                     or (self.max_bytes and self.bytes > self.max_bytes)):
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def remove(self, key):
+        with self._lock:
+            self._remove(key)
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry[1]
+
+    def clear(self, prefix=None):
+        with self._lock:
+            for key in [k for k in self._entries if prefix is None or k[0] == prefix]:
+                self._remove(key)
+
+    def stats(self):
+        """
+        Returns cache counters
+        :rtype: dict
+        """
+        return {
+            'entries': len(self._entries),
+            'bytes': self.bytes,
+            'max_entries': self.max_entries,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
+
+
+class TieredCache:
+    """
+    Beaker cache namespace fronted by an in-process LRUCache.
+
+    Reads are served from the local tier when possible; writes and removals go through to both
+    tiers. Other processes only see a change in their local tier once its TTL expires, at most
+    ``ttl`` seconds when set, the LRUCache TTL otherwise.
+    """
+
+    def __init__(self, cache, local, ttl=None):
+        self.cache = cache
+        self.local = local
+        self.ttl = ttl
+        self.namespace_name = cache.namespace_name
+
+    def _local_key(self, key):
+        return (self.namespace_name, key)
+
+    def _local_ttl(self, kw):
+        ttls = [ttl for ttl in (kw.get('expiretime', self.cache.expiretime), self.ttl) if ttl]
+        return min(ttls) if ttls else None
+
+    def get(self, key, **kw):
+        try:
+            return self.local.get(self._local_key(key))
+        except KeyError:
+            pass
+        value = self.cache.get(key, **kw)
+        self.local.put(self._local_key(key), value, self._local_ttl(kw))
+        return value
+    get_value = get
+
+    def put(self, key, value, **kw):
+        self.cache.put(key, value, **kw)
+        self.local.put(self._local_key(key), value, self._local_ttl(kw))
+    set_value = put
+
+    def remove_value(self, key, **kw):
+        self.local.remove(self._local_key(key))
+        self.cache.remove_value(key, **kw)
+    remove = remove_value
+
+    def clear(self):
+        self.local.clear(self.namespace_name)
+        self.cache.clear()
+
+    def __getitem__(self, key):
+        return self.get(key)
+
+    def __contains__(self, key):
+        try:
+            self.local.get(self._local_key(key))
+            return True
+        except KeyError:
+            return key in self.cache
+
+    def has_key(self, key):
+        return key in self
+
+    def __delitem__(self, key):
+        self.remove_value(key)
+
+    def __setitem__(self, key, value):
+        self.put(key, value)
+
+    def __getattr__(self, name):
+        return getattr(self.cache, name)
+
+
 class CacheComponent(CacheManager):
+    """
+    Beaker cache manager. When ``local_max_entries`` is set, caches returned by get_cache and
+    get_cache_region are fronted by a shared in-process LRU tier bounded by ``local_max_entries``
+    and ``local_max_bytes``, whose entries live at most ``local_ttl`` seconds. The local TTL
+    bounds how long a worker misses changes made by other workers, so it must be set.
+    """
 
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, local_max_entries=None, local_max_bytes=None, local_ttl=5, **kwargs):
         CacheManager.__init__(self, *args, **kwargs)
+        if local_max_entries and not local_ttl:
+            raise InvalidConfigurationException('The local cache tier requires a local_ttl')
+        self.local = LRUCache(local_max_entries, local_max_bytes, local_ttl) if local_max_entries else None
+
+    def get_cache(self, name, local_ttl=None, **kwargs):
+        """
+        :param local_ttl: seconds the entries of this cache live in the local tier, when shorter
+            than the component local_ttl
+        """
+        cache = CacheManager.get_cache(self, name, **kwargs)
+        return TieredCache(cache, self.local, local_ttl) if self.local else cache
+
+    def get_cache_region(self, name, region):
+        cache = CacheManager.get_cache_region(self, name, region)
+        return TieredCache(cache, self.local) if self.local else cache
+
+    def stats(self):
+        """
+        Returns the local tier counters, or None when it is disabled
+        :rtype: dict
+        """
+        return self.local.stats() if self.local else None
@@ -0,0 +1,75 @@
+from io import StringIO
+
+
+class FragmentCache:
+    """
+    Caches rendered pieces of a page (widgets and template ``cache`` blocks) in the
+    application CacheComponent. Does nothing when no cache component is configured.
+    """
+
+    # cache namespace for fragments
+    namespace = 'ron.fragments'
+
+    def cache(self):
+        from ron import Application
+        cache_component = Application().cache_component
+        return cache_component.get_cache(self.namespace) if cache_component else None
+
+    def get(self, key):
+        cache = self.cache()
+        if cache is None:
+            return None
+        try:
+            return cache.get(key)
+        except KeyError:
+            return None
+
+    def put(self, key, text, ttl=None):
+        cache = self.cache()
+        if cache is not None:
+            if ttl:
+                cache.put(key, text, expiretime=ttl)
+            else:
+                cache.put(key, text)
+
+    def begin(self, response, key, ttl=None):
+        """
+        Starts a template cache block. Writes the cached text and returns True on a hit,
+        otherwise starts capturing the template output and returns False.
+        """
+        text = self.get(key)
+        if text is not None:
+            response.body.write(text)
+            return True
+        if not hasattr(response, '_ron_fragments'):
+            response._ron_fragments = []
+        response._ron_fragments.append((key, ttl, response.body))
+        response.body = StringIO()
+        return False
+
+    def end(self, response):
+        """
+        Ends a template cache block started by begin, storing the captured output
+        """
+        key, ttl, body = response._ron_fragments.pop()
+        text = response.body.getvalue()
+        response.body = body
+        body.write(text)
+        self.put(key, text, ttl)
+
+
+def cache_lexer(parser, value, top, stack):
+    """
+    yatl lexer for ``{{cache key[, ttl]}} ... {{endcache}}`` blocks
+    """
+    from yatl.template import Node
+    top.append(Node('\nif not FRAGMENTS.begin(response, {args}):'.format(args=value)))
+
+
+def endcache_lexer(parser, value, top, stack):
+    from yatl.template import Node
+    top.append(Node('\nFRAGMENTS.end(response)\npass'))
+
+
+# fragment cache shared by widgets and templates
+fragment_cache = FragmentCache()
@@ -0,0 +1,168 @@
+import hashlib
+import inspect
+import time
+import types
+from functools import wraps
+
+
+def tag_name(tag):
+    """
+    Returns the invalidation tag for a string or a model class
+    :rtype: str
+    """
+    if isinstance(tag, str):
+        return tag
+    return tag._meta.table_name
+
+
+class ResponseCache:
+    """
+    Caches full controller responses (body, status and headers) in the application
+    CacheComponent.
+
+    Entries are fresh for ``ttl`` seconds. During the following ``stale`` seconds a single
+    request rebuilds the entry while the rest keep serving the stale copy. The rebuild lock is
+    the beaker creation lock of the backend (see acquire): it spans every worker with redis,
+    the workers of one host with file, dbm and memcached, and one process with memory.
+    Entries are dropped when any of their ``tags`` is invalidated, which BaseModel does on save
+    and delete for the model table name.
+    """
+
+    # cache namespace for stored responses
+    namespace = 'ron.responses'
+
+    # cache namespace for tag versions
+    tags_namespace = 'ron.responses.tags'
+
+    # seconds a tag version lives in the local cache tier, how long a worker may miss an
+    # invalidation made by another one
+    tags_local_ttl = 1
+
+    # headers never stored with a cached response
+    excluded_headers = ('Content-Length', 'Set-Cookie')
+
+    def __init__(self, ttl=60, stale=0, vary_query=(), vary_session=None, tags=()):
+        self.ttl = ttl
+        self.stale = stale
+        self.vary_query = vary_query
+        self.vary_session = vary_session
+        self.tags = [tag_name(tag) for tag in tags]
+
+    @staticmethod
+    def cache_component():
+        from ron import Application
+        return Application().cache_component
+
+    @classmethod
+    def invalidate(cls, *tags):
+        """
+        Invalidates every cached response stored with any of the given tags
+        :param tags: tag names or model classes
+        """
+        cache_component = cls.cache_component()
+        if not cache_component:
+            return
+        tags_cache = cache_component.get_cache(cls.tags_namespace, local_ttl=cls.tags_local_ttl)
+        version = time.time()
+        for tag in tags:
+            tags_cache.put(tag_name(tag), version)
+
+    def tag_versions(self, cache_component):
+        tags_cache = cache_component.get_cache(self.tags_namespace, local_ttl=self.tags_local_ttl)
+        versions = {}
+        for tag in self.tags:
+            try:
+                versions[tag] = tags_cache.get(tag)
+            except KeyError:
+                versions[tag] = None
+        return versions
+
+    def key(self, args, kwargs):
+        from ron import Application, request
+        parts = [request.script_name, request.route.rule, args, sorted(kwargs.items())]
+        parts.append([(name, request.query.getall(name)) for name in self.vary_query])
+        if self.vary_session:
+            session_manager = Application().session_manager
+            session = session_manager() if session_manager else None
+            parts.append(session.get(self.vary_session) if session is not None else None)
+        return hashlib.sha1(repr(parts).encode('utf8')).hexdigest()
+
+    @staticmethod
+    def acquire(cache, key):
+        """
+        Takes the rebuild lock of an entry without waiting. It is the creation lock of the
+        beaker backend, taken atomically: a redis SET NX (redis), a file lock in lock_dir shared
+        by the processes of one host (file, dbm and memcached), or a lock of this process (memory)
+        :return: the lock, or None when another request holds it
+        """
+        lock = cache.namespace.get_creation_lock(key)
+        return lock if lock.acquire(False) else None
+
+    @staticmethod
+    def release(lock):
+        lock.release()
+
+    def __call__(self, func):
+        if inspect.iscoroutinefunction(func):
+            raise TypeError('Cached responses are not supported for async actions: ' + func.__name__)
+
+        @wraps(func)
+        def wrapper(controller, *args, **kwargs):
+            from ron import request
+            cache_component = self.cache_component()
+            if not cache_component or request.method not in ('GET', 'HEAD'):
+                return func(controller, *args, **kwargs)
+
+            cache = cache_component.get_cache(self.namespace)
+            key = self.key(args, kwargs)
+            versions = self.tag_versions(cache_component)
+            try:
+                entry = cache.get(key)
+            except KeyError:
+                entry = None
+            if entry is not None and entry['tags'] != versions:
+                entry = None
+
+            if entry is not None:
+                if time.time() - entry['created'] < self.ttl:
+                    return self.replay(entry)
+                lock = self.acquire(cache, key)
+                if lock is None:
+                    return self.replay(entry)
+                try:
+                    return self.build(func, controller, args, kwargs, cache, key, versions)
+                finally:
+                    self.release(lock)
+            return self.build(func, controller, args, kwargs, cache, key, versions)
+
+        return wrapper
+
+    def build(self, func, controller, args, kwargs, cache, key, versions):
+        from ron import response
+        body = func(controller, *args, **kwargs)
+        if isinstance(body, (types.GeneratorType, map)):
+            body = ''.join(body)
+        if response.status_code != 200 or not isinstance(body, (str, bytes, dict)):
+            return body
+        entry = {
+            'created': time.time(),
+            'status': response.status_line,
+            'headers': [(name, value) for name, value in response.headers.allitems()
+                        if name not in self.excluded_headers],
+            'tags': versions,
+            'body': body,
+        }
+        cache.put(key, entry, expiretime=self.ttl + self.stale)
+        return body
+
+    def replay(self, entry):
+        from ron import response
+        response.status = entry['status']
+        seen = set()
+        for name, value in entry['headers']:
+            if name in seen:
+                response.add_header(name, value)
+            else:
+                response.set_header(name, value)
+                seen.add(name)
+        return entry['body']
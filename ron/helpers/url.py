@@ -1,8 +1,21 @@
 import urllib
 
 from ron import request
+from ron.web.reverse import reverse_index
 
-def URL(*parts, vars=None, hash=None, scheme=False, host=False):
+
+def _origin():
+    """
+    Returns the (scheme, host) of the current request, computed once per request
+    """
+    origin = request.environ.get('ron.url.origin')
+    if origin is None:
+        orig_scheme, _, org_host = request.url.split('/')[:3]
+        origin = request.environ['ron.url.origin'] = (orig_scheme, org_host)
+    return origin
+
+
+def URL(*parts, vars=None, hash=None, scheme=False, host=False, action=None, **url_args):
     """
     Helper who generates an URL
     Examples:
@@ -10,16 +23,24 @@ def URL(*parts, vars=None, hash=None, scheme=False, host=False):
     URL('a','b',vars=dict(x=1),scheme=None)    -> //{domain}/a/b?x=1
     URL('a','b',vars=dict(x=1),scheme=True)    -> http://{domain}/a/b?x=1
     URL('a','b',vars=dict(x=1),scheme='https') -> https://{domain}/a/b?x=1
+    URL(action='main.controllers.site.show', id=3) -> /main/show/3
+    With action, the URL is built from the route of that controller action (or route name);
+    arguments not used by the route are added to vars.
     """
-    prefix = '/'
-    url = prefix + '/'.join(parts)
+    if action:
+        url, extra = reverse_index.build(action, url_args)
+        if extra:
+            vars = dict(extra, **(vars or {}))
+    else:
+        prefix = '/'
+        url = prefix + '/'.join(parts)
     if vars:
         url += '?' + '&'.join('%s=%s' % (k, urllib.parse.quote(str(v))) for k,v in vars.items())
     if hash:
         url += '#%s' % hash
 
-    orig_scheme, _, org_host = request.url.split('/')[:3]
     if scheme or host:
+        orig_scheme, org_host = _origin()
         if host:
             host = org_host if host is True else host
         else:
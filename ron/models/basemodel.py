@@ -1,7 +1,9 @@
-from peewee import Model
-from peewee_validates import ModelValidator
+from peewee import Tuple, chunked, Model
+from peewee_validates import DEFAULT_MESSAGES
 
 from ron import Application
+from ron.caching.response import ResponseCache
+from ron.models.validator import SharedModelValidator
 
 
 class BaseModel(Model):
@@ -9,20 +11,112 @@ class BaseModel(Model):
     Base class for peewee ORM models
     """
 
-    def __init__(self, *args, **kwargs):
-        Model.__init__(self, *args, **kwargs)
+    # validator of the instance, built on first use
+    _validator = None
 
-        self._validator = ModelValidator(self)
+    @classmethod
+    def select(cls, *fields):
+        query = super().select(*fields)
+        replica = Application().db.read_database()
+        if replica is not None:
+            query = query.bind(replica)
+        return query
 
     def validate(self, data=None):
         if data:
-            return self._validator.validate(data)
+            return self.validator().validate(data)
         else:
-            return self._validator.validate()
+            return self.validator().validate()
 
     def validator(self):
+        if self._validator is None:
+            self._validator = SharedModelValidator(self)
         return self._validator
 
+    @classmethod
+    def validate_many(cls, rows, batch_size=500):
+        """
+        Validates a batch of rows. Unique fields and unique indexes are checked with one query
+        per batch_size rows, and against the other rows of the batch
+        :param rows: dicts of field values
+        :return: the cleaned data of the valid rows and the errors of the invalid ones, by row index
+        :rtype: tuple
+        """
+        validator = SharedModelValidator(cls(), unique_checks=False)
+        cleaned = {}
+        errors = {}
+        for index, row in enumerate(rows):
+            # a fresh instance per row, so callable defaults are evaluated for every row
+            validator.instance = cls()
+            if validator.validate(dict(row)):
+                cleaned[index] = validator.data
+            else:
+                errors[index] = validator.errors
+
+        unique_fields = [((name,), (field,)) for name, field in cls._meta.fields.items()
+                         if field.unique and not field.primary_key]
+        unique_fields += [(tuple(columns), tuple(cls._meta.fields[column] for column in columns))
+                          for columns, unique in (index for index in cls._meta.indexes if isinstance(index, (list, tuple)))
+                         if unique]
+        for names, fields in unique_fields:
+            message = DEFAULT_MESSAGES['unique' if len(names) == 1 else 'index']
+            values = {}
+            for index, data in cleaned.items():
+                value = tuple(data.get(name) for name in names)
+                if None not in value:
+                    values.setdefault(value, []).append(index)
+            taken = set(value for value, indexes in values.items() if len(indexes) > 1)
+            target = fields[0] if len(fields) == 1 else Tuple(*fields)
+            for batch in chunked(list(values), batch_size):
+                lookup = [value[0] for value in batch] if len(fields) == 1 else batch
+                taken.update(tuple(existing) for existing in cls.select(*fields).where(target.in_(lookup)).tuples())
+            for value in taken:
+                for index in values.get(value, ()):
+                    errors.setdefault(index, {}).update((name, message) for name in names)
+
+        valid = [data for index, data in sorted(cleaned.items()) if index not in errors]
+        return valid, dict(sorted(errors.items()))
+
+    @classmethod
+    def bulk_create_validated(cls, rows, batch_size=100, partial=False):
+        """
+        Validates a batch of rows with validate_many and inserts them with insert_many, batch_size
+        rows per query, in a transaction
+        :param partial: insert the valid rows even if some rows are invalid. Otherwise nothing is
+            inserted when there are errors
+        :return: the number of inserted rows and the errors by row index
+        :rtype: tuple
+        """
+        valid, errors = cls.validate_many(rows)
+        if errors and not partial:
+            return 0, errors
+        columns = set(cls._meta.fields)
+        valid = [{name: value for name, value in data.items() if name in columns} for data in valid]
+        with cls._meta.database.atomic():
+            for batch in chunked(valid, batch_size):
+                cls.insert_many(batch).execute()
+        if valid:
+            ResponseCache.invalidate(cls)
+        return len(valid), errors
+
+    def save(self, *args, **kwargs):
+        result = Model.save(self, *args, **kwargs)
+        ResponseCache.invalidate(self.__class__)
+        return result
+
+    def delete_instance(self, *args, **kwargs):
+        result = Model.delete_instance(self, *args, **kwargs)
+        ResponseCache.invalidate(self.__class__)
+        return result
+
+    def to_dict(self):
+        """
+        Returns the loaded field values by field name, foreign keys as their ids. Models are
+        serialized to JSON with it, see ron.web.jsonencoder
+        :rtype: dict
+        """
+        return dict(self.__data__)
+
     def update_model(self, data):
         for key,value in data.items():
             setattr(self,key,value)
@@ -1,18 +1,51 @@
+import hashlib
+import logging
 import sys
 
+from peewee import CharField, DatabaseError, Model
+
 try:
     from bottle_peewee import PeeweePlugin
 except ModuleNotFoundError as e:
     print("Required bottle_peewee module, try to install it with 'pip install bottle-peewee'")
     sys.exit(1)
 
+from ron.models.pool import DatabasePlugin
+
+logger = logging.getLogger(__name__)
+
+
+class SchemaFingerprint(Model):
+    """
+    Fingerprint of the DDL of every table created through PeeweeDB.create_tables
+    """
+    table = CharField(primary_key=True)
+    fingerprint = CharField()
+
+    class Meta(object):
+        table_name = 'ron_schema'
+
 
 class PeeweeDB:
     """
     Models component using the peewee ORM
+
+    create_tables stores a fingerprint of the DDL of every model in the ``ron_schema`` table and
+    skips models whose fingerprint did not change, so a restart costs a single query. Tables
+    changed since their fingerprint was stored are compared with the database columns; the
+    differences are logged and kept in ``schema_report``.
+
+    Setting ``max_connections`` (with optional ``stale_timeout``, seconds before an idle
+    connection is recycled, and ``timeout``, seconds to wait for a free connection) pools the
+    connections. ``replicas`` is a list of database URLs where BaseModel selects are sent when
+    not in a transaction.
+
+    ``query_log`` counts and times the queries of every request and reports possible N+1
+    queries, see ron.models.pool.DatabasePlugin.
     """
 
-    def __init__(self, *args, module=None, **kwargs):
+    def __init__(self, *args, module=None, schema_fingerprint=True, max_connections=None, stale_timeout=None,
+                 timeout=None, replicas=None, query_log=True, n_plus_one_threshold=10, **kwargs):
         from ron import Application
         app = Application()
 
@@ -21,11 +54,129 @@ class PeeweeDB:
         for option, value in kwargs.items():
             options[option] = value
 
-        self.db = PeeweePlugin(**options)
+        pool = None
+        if max_connections is not None:
+            pool = {'max_connections': max_connections, 'stale_timeout': stale_timeout, 'timeout': timeout}
+
+        self.db = DatabasePlugin(pool=pool, replicas=replicas or (), query_log=query_log,
+                                 n_plus_one_threshold=n_plus_one_threshold, **options)
 
         self.module = module
 
+        # use ron_schema to skip unchanged tables. False runs create_tables(safe=True) every time
+        self.schema_fingerprint = schema_fingerprint
+
+        # fingerprints stored in ron_schema, read once
+        self._fingerprints = None
+
+        # {table: {'status': ..., 'missing_columns': [...], 'extra_columns': [...]}}
+        self.schema_report = {}
+
         app.module_plugins.append(self.db)
 
     def __call__(self, *args, **kwargs):
-        return self.db
\ No newline at end of file
+        return self.db
+
+    @property
+    def database(self):
+        return self.db.database
+
+    def read_database(self):
+        """
+        Returns the database for a read only query: a replica, or None for the primary database
+        """
+        return self.db.replica()
+
+    def query_stats(self):
+        """
+        Returns the queries run by this worker, by controller action
+        :rtype: dict
+        """
+        return self.db.query_stats
+
+    def close(self):
+        """
+        Closes every database connection of this process
+        """
+        self.db.close_all()
+
+    def pool_stats(self):
+        """
+        Returns the connection pool metrics of this worker, by database
+        :rtype: dict
+        """
+        return self.db.stats()
+
+    def fingerprint(self, model):
+        """
+        Returns a hash of the CREATE TABLE and CREATE INDEX statements of a model
+        :rtype: str
+        """
+        digest = hashlib.sha1()
+        queries = [model._schema._create_table(safe=False)] + model._schema._create_indexes(safe=False)
+        for query in queries:
+            sql, params = self.database.get_sql_context().sql(query).query()
+            digest.update(repr((sql, params)).encode('utf-8'))
+        return digest.hexdigest()
+
+    def stored_fingerprints(self):
+        """
+        Returns the fingerprints stored in the database, creating the ron_schema table if needed
+        :rtype: dict
+        """
+        if self._fingerprints is None:
+            with self.database.bind_ctx([SchemaFingerprint]):
+                try:
+                    self._fingerprints = dict(SchemaFingerprint.select().tuples())
+                except DatabaseError:
+                    if self.database.in_transaction():
+                        self.database.rollback()
+                    self.database.create_tables([SchemaFingerprint])
+                    self._fingerprints = {}
+        return self._fingerprints
+
+    def create_tables(self, models):
+        """
+        Creates the tables and indexes of models whose fingerprint changed
+        :return: the report entries of the models that were not up to date
+        :rtype: dict
+        """
+        if not self.schema_fingerprint:
+            self.database.create_tables(models)
+            return {}
+        stored = self.stored_fingerprints()
+        changed = []
+        for model in models:
+            fingerprint = self.fingerprint(model)
+            if stored.get(model._meta.table_name) != fingerprint:
+                changed.append((model, fingerprint))
+        if not changed:
+            return {}
+
+        report = {}
+        for model, fingerprint in changed:
+            table = model._meta.table_name
+            if not self.database.table_exists(table):
+                entry = {'status': 'created', 'missing_columns': [], 'extra_columns': []}
+            else:
+                columns = set(column.name for column in self.database.get_columns(table))
+                fields = set(field.column_name for field in model._meta.sorted_fields)
+                entry = {'status': 'updated' if columns == fields else 'changed',
+                         'missing_columns': sorted(fields - columns),
+                         'extra_columns': sorted(columns - fields)}
+            report[table] = entry
+
+        # creates missing tables and indexes in foreign key order, never alters existing tables
+        self.database.create_tables([model for model, _ in changed])
+        with self.database.bind_ctx([SchemaFingerprint]):
+            for model, fingerprint in changed:
+                table = model._meta.table_name
+                entry = report[table]
+                if entry['status'] == 'changed':
+                    logger.warning('Table %s does not match model %s: missing columns %s, extra columns %s',
+                                   table, model.__name__, entry['missing_columns'], entry['extra_columns'])
+                else:
+                    SchemaFingerprint.replace(table=table, fingerprint=fingerprint).execute()
+                    stored[table] = fingerprint
+        self.schema_report.update(report)
+        return report
@@ -0,0 +1,289 @@
+import inspect
+import itertools
+import logging
+import threading
+from urllib.parse import urlparse
+
+import bottle
+from bottle_peewee import PeeweePlugin
+from playhouse.db_url import parse, schemes
+
+from ron.exceptions.invalid_configuration_exception import InvalidConfigurationException
+from ron.models.queries import QueryInstrumentation, QueryLog
+from ron.web.controller import action_name
+
+logger = logging.getLogger(__name__)
+
+
+class PoolMetrics:
+    """
+    Mixin for playhouse.pool databases counting created and recycled connections
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.created = 0
+        self.recycled = 0
+        super().__init__(*args, **kwargs)
+
+    def _connect(self):
+        with self._pool_lock:
+            idle = set(id(conn) for timestamp, counter, conn in self._connections)
+            conn = super()._connect()
+            if id(conn) not in idle:
+                self.created += 1
+        return conn
+
+    def _close_raw(self, conn):
+        self.recycled += 1
+        return super()._close_raw(conn)
+
+    def stats(self):
+        """
+        Returns the connections in use, idle, waiting threads, created and recycled (closed by
+        the pool because they were stale or not reusable)
+        :rtype: dict
+        """
+        with self._pool_lock:
+            return {
+                'in_use': len(self._in_use),
+                'idle': len(self._connections),
+                'waiting': len(getattr(self._pool_available, '_waiters', ())),
+                'created': self.created,
+                'recycled': self.recycled,
+                'max_connections': self._max_connections,
+            }
+
+
+# subclasses of the playhouse.db_url database classes with PoolMetrics/QueryInstrumentation
+_extended_classes = {}
+
+
+def is_streamed(body):
+    """
+    Returns whether a response body is produced while it is sent, e.g. a generator
+    :rtype: bool
+    """
+    return (hasattr(body, '__iter__') and not hasattr(body, 'read')
+            and not isinstance(body, (str, bytes, bytearray, dict, list, tuple)))
+
+
+class ReleasingBody:
+    """
+    Streamed response body holding the request connections until it is exhausted or closed
+    """
+
+    def __init__(self, body, release):
+        self.body = body
+        self.release = release
+        self.released = False
+
+    def __iter__(self):
+        # bottle does not close bodies that turn out empty or fail on their first chunk
+        try:
+            yield from self.body
+        finally:
+            self.close()
+
+    def close(self):
+        if self.released:
+            return
+        self.released = True
+        try:
+            if hasattr(self.body, 'close'):
+                self.body.close()
+        finally:
+            self.release()
+
+
+def open_database(url, pool=None, instrument=False):
+    """
+    Returns the database for a database URL, as playhouse.db_url.connect does
+    :param pool: max_connections, stale_timeout and timeout for a playhouse.pool database (the
+        ``+pool`` variant of the URL scheme), or None for no pool
+    :param instrument: record the statements in the current QueryLog
+    """
+    scheme = urlparse(url).scheme
+    if pool is not None and not scheme.endswith('+pool'):
+        scheme += '+pool'
+    database_class = schemes.get(scheme)
+    if database_class is None:
+        raise InvalidConfigurationException('Unsupported database {url!r}'.format(url=url))
+    mixins = ((PoolMetrics,) if pool is not None else ()) + ((QueryInstrumentation,) if instrument else ())
+    if mixins:
+        key = (database_class, mixins)
+        if key not in _extended_classes:
+            name = ''.join(mixin.__name__ for mixin in mixins) + database_class.__name__
+            _extended_classes[key] = type(name, mixins + (database_class,), {})
+        database_class = _extended_classes[key]
+    connect_kwargs = parse(url)
+    connect_kwargs.update((option, value) for option, value in (pool or {}).items() if value is not None)
+    return database_class(**connect_kwargs)
+
+
+class DatabasePlugin(PeeweePlugin):
+    """
+    PeeweePlugin with optional connection pooling, read replicas and query instrumentation.
+
+    With pool options, the primary database and every replica are pooled: each request checks
+    out a connection and returns it to the pool when it ends, or once its body is sent when
+    the action returns a streamed body such as a generator. Replicas are used round robin.
+    The database is set up once, even if the plugin is installed in several modules.
+
+    With query_log, the statements of every request are counted and timed. A normalized
+    statement run more than n_plus_one_threshold times in one request is logged as a possible
+    N+1 query of the controller action. Totals by action are kept in query_stats, and sent as
+    X-Query-Count/X-Query-Time response headers in debug mode.
+    """
+
+    def __init__(self, connection=None, pool=None, replicas=(), query_log=True, n_plus_one_threshold=10):
+        PeeweePlugin.__init__(self, connection)
+        self.pool = pool
+        self.replica_connections = list(replicas)
+        self.replicas = []
+        self._replica_cycle = None
+        self._lock = threading.Lock()
+        self.query_log = query_log
+        self.n_plus_one_threshold = n_plus_one_threshold
+        # {action: {'requests': ..., 'queries': ..., 'time': ..., 'n_plus_one': ...}}
+        self.query_stats = {}
+
+    def open(self, url):
+        return open_database(url, pool=self.pool, instrument=self.query_log)
+
+    def setup(self, app):
+        with self._lock:
+            if self.database is not None:
+                return
+            app.config.setdefault('PEEWEE_CONNECTION', self.connection)
+            self.connection = app.config.get('PEEWEE_CONNECTION')
+            self.replicas = [self.open(url) for url in self.replica_connections]
+            self._replica_cycle = itertools.cycle(self.replicas) if self.replicas else None
+            self.database = self.open(self.connection)
+            self.proxy.initialize(self.database)
+
+    def replica(self):
+        """
+        Returns the next replica, or None when there are no replicas or the current thread is in
+        a transaction on the primary database, which must see its own writes
+        """
+        if self._replica_cycle is None or self.database.in_transaction():
+            return None
+        return next(self._replica_cycle)
+
+    def release(self):
+        """
+        Returns the connections opened by the current thread to their pools
+        """
+        for database in [self.database] + self.replicas:
+            if not database.is_closed():
+                database.close()
+
+    def close_all(self):
+        """
+        Closes every connection of the current process, pooled ones included, e.g. before
+        forking workers that must not share them
+        """
+        if self.database is None:
+            return
+        for database in [self.database] + self.replicas:
+            if isinstance(database, PoolMetrics):
+                database.close_all()
+            elif not database.is_closed():
+                database.close()
+
+    def apply(self, callback, route):
+        if inspect.iscoroutinefunction(callback):
+            return self._async(callback, route)
+        if self.pool is None and self.connection.startswith('sqlite'):
+            # the connection of each thread stays open
+            handler = PeeweePlugin.apply(self, callback, route)
+        else:
+            handler = self._connected(callback)
+        if not self.query_log:
+            return handler
+        action = action_name(route.callback)
+
+        def wrapper(*args, **kwargs):
+            log = QueryLog.start()
+            try:
+                return handler(*args, **kwargs)
+            finally:
+                QueryLog.stop()
+                self.record_queries(action, log)
+
+        return wrapper
+
+    def _async(self, callback, route):
+        """
+        Wraps an async action. Connections are per thread, so none is opened for it: its queries,
+        run through ron.web.asgi.run_in_thread, connect on demand in the pool threads
+        """
+        if not self.query_log:
+            return callback
+        action = action_name(route.callback)
+
+        async def wrapper(*args, **kwargs):
+            log = QueryLog.start()
+            try:
+                return await callback(*args, **kwargs)
+            finally:
+                QueryLog.stop()
+                self.record_queries(action, log)
+
+        return wrapper
+
+    def _connected(self, callback):
+        """
+        Runs an action with a connection, in a transaction except on SQLite. The connection is
+        released when the action returns or, for a streamed body, once the body is sent
+        """
+
+        def wrapper(*args, **kwargs):
+            self.database.connect(reuse_if_open=True)
+            streamed = False
+            try:
+                if self.connection.startswith('sqlite'):
+                    result = callback(*args, **kwargs)
+                else:
+                    with self.database.transaction():
+                        result = callback(*args, **kwargs)
+                if isinstance(result, bottle.HTTPResponse) and is_streamed(result.body):
+                    streamed = True
+                    result.body = ReleasingBody(result.body, self.release)
+                elif is_streamed(result):
+                    streamed = True
+                    result = ReleasingBody(result, self.release)
+                return result
+            finally:
+                if not streamed:
+                    self.release()
+
+        return wrapper
+
+    def record_queries(self, action, log):
+        """
+        Adds the query log of a request to query_stats and reports its N+1 candidates
+        """
+        stats = self.query_stats.get(action)
+        if stats is None:
+            stats = self.query_stats[action] = {'requests': 0, 'queries': 0, 'time': 0.0, 'n_plus_one': 0}
+        stats['requests'] += 1
+        stats['queries'] += log.count
+        stats['time'] += log.time
+        if log.count > self.n_plus_one_threshold:
+            repeated = log.repeated(self.n_plus_one_threshold)
+            for sql, (count, duration) in repeated.items():
+                logger.warning('Possible N+1 query in %s: %d runs (%.1f ms) of %s', action, count, duration * 1000, sql)
+            if repeated:
+                stats['n_plus_one'] += 1
+        if bottle.DEBUG:
+            bottle.response.set_header('X-Query-Count', str(log.count))
+            bottle.response.set_header('X-Query-Time', '%.6f' % log.time)
+
+    def stats(self):
+        """
+        Returns the pool metrics of this worker, by database
+        :rtype: dict
+        """
+        databases = [('primary', self.database)] + [('replica%d' % index, replica) for index, replica in enumerate(self.replicas)]
+        return {name: database.stats() for name, database in databases if isinstance(database, PoolMetrics)}
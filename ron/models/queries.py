@@ -0,0 +1,109 @@
+import re
+from contextvars import ContextVar
+from time import perf_counter
+
+# string and numeric literals, and lists of placeholders or literals as in "IN (?, ?, ?)"
+_literals = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_lists = re.compile(r"\((?:\s*(?:\?|%s)\s*,)+\s*(?:\?|%s)\s*\)")
+
+# query log of the request handled by the current thread or task, and the last one stopped there
+_log = ContextVar('ron.query_log', default=None)
+_last = ContextVar('ron.query_log.last', default=None)
+
+
+def normalize_sql(sql):
+    """
+    Returns the SQL statement with literals replaced by ? and placeholder lists collapsed, so
+    statements that differ only in their values compare equal
+    :rtype: str
+    """
+    return _lists.sub('(?, ...)', _literals.sub('?', sql))
+
+
+class QueryLog:
+    """
+    SQL statements run while handling one request, with their count and duration
+    """
+
+    def __init__(self):
+        # {sql: [count, seconds]}
+        self.statements = {}
+        self.count = 0
+        self.time = 0.0
+
+    def record(self, sql, duration):
+        entry = self.statements.get(sql)
+        if entry is None:
+            self.statements[sql] = [1, duration]
+        else:
+            entry[0] += 1
+            entry[1] += duration
+        self.count += 1
+        self.time += duration
+
+    def normalized(self):
+        """
+        Returns the statements grouped by normalized text
+        :return: {normalized sql: [count, seconds]}
+        :rtype: dict
+        """
+        grouped = {}
+        for sql, (count, duration) in self.statements.items():
+            entry = grouped.setdefault(normalize_sql(sql), [0, 0.0])
+            entry[0] += count
+            entry[1] += duration
+        return grouped
+
+    def repeated(self, threshold):
+        """
+        Returns the normalized statements run more than threshold times, the N+1 candidates
+        :rtype: dict
+        """
+        return {sql: entry for sql, entry in self.normalized().items() if entry[0] > threshold}
+
+    @staticmethod
+    def start():
+        log = QueryLog()
+        _log.set(log)
+        return log
+
+    @staticmethod
+    def stop():
+        _last.set(_log.get())
+        _log.set(None)
+
+    @staticmethod
+    def last():
+        """
+        Returns the query log of the current thread or task, or the last one stopped
+        :rtype: QueryLog
+        """
+        return _log.get() or _last.get()
+
+    @staticmethod
+    def forget():
+        _last.set(None)
+
+    @staticmethod
+    def current():
+        """
+        Returns the query log of the current thread or task, or None outside an instrumented request
+        :rtype: QueryLog
+        """
+        return _log.get()
+
+
+class QueryInstrumentation:
+    """
+    Mixin for peewee databases recording every statement in the current QueryLog
+    """
+
+    def execute_sql(self, sql, *args, **kwargs):
+        log = _log.get()
+        if log is None:
+            return super().execute_sql(sql, *args, **kwargs)
+        start = perf_counter()
+        try:
+            return super().execute_sql(sql, *args, **kwargs)
+        finally:
+            log.record(sql, perf_counter() - start)
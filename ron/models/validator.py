@@ -0,0 +1,60 @@
+from peewee import ManyToManyField
+from peewee_validates import Field, ModelValidator
+
+
+class SharedModelValidator(ModelValidator):
+    """
+    ModelValidator whose field introspection is done once per model class instead of once per
+    validator.
+
+    With ``unique_checks=False`` unique fields and unique indexes are not checked against the
+    database; BaseModel.validate_many does those checks for a whole batch at once.
+    """
+
+    __slots__ = ('unique_checks',)
+
+    # {model class: [(name, peewee field)]}
+    _model_fields = {}
+
+    # {validator class: [name of declared validator fields]}
+    _declared_fields = {}
+
+    def __init__(self, instance, unique_checks=True):
+        self.unique_checks = unique_checks
+        ModelValidator.__init__(self, instance)
+
+    @classmethod
+    def model_fields(cls, model):
+        """
+        Returns the fields of a model to validate, many-to-many fields included
+        :rtype: list
+        """
+        fields = cls._model_fields.get(model)
+        if fields is None:
+            fields = [(name, field) for name, field in model._meta.fields.items()
+                      if not getattr(field, 'primary_key', False)]
+            for name in dir(model):
+                field = getattr(model, name, None)
+                if isinstance(field, ManyToManyField):
+                    fields.append((name, field))
+            cls._model_fields[model] = fields
+        return fields
+
+    def initialize_fields(self):
+        for name, field in self.model_fields(type(self.instance)):
+            validator_field = self.convert_field(name, field)
+            if not self.unique_checks:
+                validator_field.validators = [validator for validator in validator_field.validators
+                                              if getattr(validator, '__name__', None) != 'unique_validator']
+            self._meta.fields[name] = validator_field
+
+        declared = self._declared_fields.get(type(self))
+        if declared is None:
+            declared = [name for name in dir(self) if isinstance(getattr(self, name, None), Field)]
+            self._declared_fields[type(self)] = declared
+        for name in declared:
+            self._meta.fields[name] = getattr(self, name)
+
+    def perform_index_validation(self, data):
+        if self.unique_checks:
+            ModelValidator.perform_index_validation(self, data)
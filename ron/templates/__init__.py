@@ -1,2 +1,4 @@
+from ron.templates.bundle import TemplateBundle
+from ron.templates.cache import TemplateCache
 from ron.templates.yatl_template import YatlTemplate
 from ron.templates.yatl_template import yatl_template
\ No newline at end of file
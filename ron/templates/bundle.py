@@ -0,0 +1,118 @@
+import hashlib
+import importlib.util
+import marshal
+import os
+
+from ron.base.ronobject import RonObject
+from ron.templates.cache import CompiledTemplate
+
+
+def file_hash(filename):
+    with open(filename, 'rb') as fp:
+        return hashlib.sha1(fp.read()).hexdigest()
+
+
+class TemplateBundle(RonObject):
+    """
+    On-disk bundle of precompiled templates.
+
+    Build it once per deployment (``python -m ron compile-templates``) and point ``Application.template_bundle`` at the
+    file; workers then load code objects from it instead of parsing the templates. Every entry
+    keeps the content hash of the files it was compiled from and is ignored when any of them
+    changed.
+    """
+
+    # bundle file path
+    path = 'templates.bundle'
+
+    def __init__(self, *args, **kwargs):
+        RonObject.__init__(self, *args, **kwargs)
+        self.entries = {}
+
+    def build(self, app, template_adapter=None):
+        """
+        Precompiles every template in the views folder of the application and its submodules
+        :param app: initialized application
+        :type app: ron.Application
+        :param template_adapter: template adapter class, YatlTemplate by default
+        :return: list of (filename, error) pairs for templates that could not be compiled
+        :rtype: list
+        """
+        if template_adapter is None:
+            from ron.templates.yatl_template import YatlTemplate
+            template_adapter = YatlTemplate
+        errors = []
+        for views_path in self._views_paths(app):
+            for root, dirs, files in os.walk(views_path):
+                for filename in files:
+                    if filename.rsplit('.', 1)[-1] not in template_adapter.extensions:
+                        continue
+                    name = os.path.relpath(os.path.join(root, filename), views_path)
+                    try:
+                        adapter = template_adapter(name=name, lookup=[views_path])
+                        compiled = adapter.compile({'layout': app.layout})
+                    except Exception as e:
+                        errors.append((os.path.join(root, filename), e))
+                        continue
+                    hashes = {dependency: file_hash(dependency) for dependency in compiled.files}
+                    self.entries[(adapter.filename, app.layout)] = (compiled.code, hashes)
+        return errors
+
+    @staticmethod
+    def _views_paths(module, seen=None):
+        seen = set() if seen is None else seen
+        if id(module) in seen:
+            return []
+        seen.add(id(module))
+        paths = []
+        if module.base_path and module.view:
+            views_path = os.path.abspath(os.path.join(module.base_path, module.view.path))
+            if os.path.isdir(views_path):
+                paths.append(views_path)
+        for submodule in (module.modules or {}).values():
+            if not isinstance(submodule, dict):
+                paths.extend(p for p in TemplateBundle._views_paths(submodule, seen) if p not in paths)
+        return paths
+
+    def save(self):
+        data = marshal.dumps({'magic': importlib.util.MAGIC_NUMBER, 'entries': self.entries})
+        tmp_path = '{path}.{pid}.tmp'.format(path=self.path, pid=os.getpid())
+        with open(tmp_path, 'wb') as fp:
+            fp.write(data)
+        os.replace(tmp_path, self.path)
+
+    def load(self):
+        """
+        Loads the bundle file. A missing file or a bundle built by another Python version is ignored
+        :return: the bundle itself
+        :rtype: TemplateBundle
+        """
+        try:
+            with open(self.path, 'rb') as fp:
+                data = marshal.loads(fp.read())
+        except (OSError, EOFError, ValueError, TypeError):
+            return self
+        if isinstance(data, dict) and data.get('magic') == importlib.util.MAGIC_NUMBER:
+            self.entries = data['entries']
+        return self
+
+    def get(self, key):
+        """
+        Returns the compiled template for key, or None if missing or if any source file changed
+        :rtype: CompiledTemplate
+        """
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        code, hashes = entry
+        files = {}
+        for filename, digest in hashes.items():
+            try:
+                if file_hash(filename) != digest:
+                    raise OSError
+                files[filename] = os.path.getmtime(filename)
+            except OSError:
+                self.entries.pop(key, None)
+                return None
+        return CompiledTemplate(code, files)
+
@@ -0,0 +1,97 @@
+import os
+import threading
+from collections import OrderedDict
+
+import bottle
+
+from ron.base.ronobject import RonObject
+
+
+class CompiledTemplate:
+    """
+    A template already turned into Python code, plus the files it was built from
+    """
+
+    def __init__(self, code, files):
+        self.code = code
+        # {filename: mtime} for the template and every file it extends or includes
+        self.files = files
+
+    def is_stale(self):
+        for filename, mtime in self.files.items():
+            try:
+                if os.path.getmtime(filename) != mtime:
+                    return True
+            except OSError:
+                return True
+        return False
+
+
+class TemplateCache(RonObject):
+    """
+    Bounded LRU cache of compiled templates.
+
+    In development mode (``auto_reload`` enabled, by default when ``bottle.DEBUG`` is on) every
+    hit checks the modification time of the template files and recompiles stale entries. In
+    production mode cached entries are never re-checked.
+    """
+
+    # maximum number of compiled templates kept in memory
+    max_size = 128
+
+    # check file mtimes on every hit. None follows bottle.DEBUG
+    auto_reload = None
+
+    def __init__(self, *args, **kwargs):
+        RonObject.__init__(self, *args, **kwargs)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _auto_reload(self):
+        return bottle.DEBUG if self.auto_reload is None else self.auto_reload
+
+    def get(self, key):
+        """
+        Returns the compiled template stored for key or None when missing or stale
+        :param key: cache key
+        :type key: tuple
+        :rtype: CompiledTemplate
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        if entry is not None and self._auto_reload() and entry.is_stale():
+            entry = None
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return entry
+
+    def set(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """
+        Returns cache counters
+        :rtype: dict
+        """
+        return {
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+        }
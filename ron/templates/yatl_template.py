@@ -1,20 +1,208 @@
+import ast
 import functools
 import os
+import textwrap
+from io import StringIO
 
 from bottle import BaseTemplate, template
 
+from ron.caching.fragment import cache_lexer, endcache_lexer, fragment_cache
+from ron.templates.cache import CompiledTemplate, TemplateCache
+
+
+class Flush:
+    """
+    Marker for streamed templates: ``{{=FLUSH}}`` sends everything written so far as a chunk.
+    Renders as an empty string when the template is not streamed.
+    """
+
+    def xml(self):
+        return ''
+
+FLUSH = Flush()
+
+
+class StreamResponse:
+    """
+    Template writer used when streaming. Buffers the output and queues it in chunks of at
+    least chunk_size characters, or whenever FLUSH is written; the template generator hands
+    the queued chunks out with drain.
+    """
+
+    def __init__(self, chunk_size=4096):
+        self.chunk_size = chunk_size
+        # body is swapped while a cache block captures its output
+        self.output = self.body = StringIO()
+        # chunks ready to be sent
+        self.chunks = []
+
+    def write(self, data, escape=True):
+        from yatl.helpers import xmlescape
+        streaming = self.body is self.output
+        if data is FLUSH:
+            if streaming:
+                self.flush()
+            return
+        if not escape:
+            data = str(data)
+        elif hasattr(data, 'xml') and callable(data.xml):
+            data = str(data.xml())
+        else:
+            data = str(xmlescape(str(data)))
+        self.body.write(data)
+        if streaming and self.output.tell() >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        """
+        Queues everything written so far as a chunk
+        """
+        chunk = self.output.getvalue()
+        self.output.seek(0)
+        self.output.truncate()
+        if chunk:
+            self.chunks.append(chunk)
+
+    def drain(self):
+        """
+        Returns the queued chunks and empties the queue
+        :rtype: list
+        """
+        chunks, self.chunks = self.chunks, []
+        return chunks
+
+
+class StreamTransformer(ast.NodeTransformer):
+    """
+    Makes the generator function of a streamed template hand out the queued chunks after
+    every ``response.write`` statement of its own. Functions defined by the template
+    (``{{def}}`` helpers) are left alone: their output is queued and sent by the next write
+    of the template body.
+    """
+
+    def visit_FunctionDef(self, node):
+        if node.name != YatlTemplate.stream_function:
+            return node
+        self.generic_visit(node)
+        return node
+
+    def visit_AsyncFunctionDef(self, node):
+        return node
+
+    def visit_ClassDef(self, node):
+        return node
+
+    def visit_Expr(self, node):
+        call = node.value
+        if (isinstance(call, ast.Call) and isinstance(call.func, ast.Attribute) and call.func.attr == 'write'
+                and isinstance(call.func.value, ast.Name) and call.func.value.id == 'response'):
+            drain = ast.parse('yield from response.drain()').body[0]
+            return [node, ast.copy_location(drain, node)]
+        return node
 
 
 class YatlTemplate(BaseTemplate):
-    def prepare(self, *args, **kwargs):
-        from yatl import render
-        self.tpl = render
+
+    # compiled templates shared by every adapter instance
+    cache = TemplateCache()
+
+    # precompiled TemplateBundle checked before parsing a template
+    bundle = None
+
+    # name of the generator function streamed templates are compiled into
+    stream_function = '__ron_stream__'
+
+    # custom yatl lexers
+    lexers = {'cache': cache_lexer, 'endcache': endcache_lexer}
+
+    def prepare(self, delimiters=('{{', '}}'), **kwargs):
+        self.delimiters = delimiters.split(' ', 1) if isinstance(delimiters, str) else delimiters
+
+    def compile(self, context, stream=False):
+        """
+        Parses the template file, the layout and its includes into a code object
+        :param context: rendering context, used to resolve dynamic extend and include names
+        :type context: dict
+        :param stream: compile the template into a generator function yielding its output
+        :type stream: bool
+        :rtype: CompiledTemplate
+        """
+        from yatl.template import TemplateParser, file_reader
+
+        files = {}
+
+        def reader(filename, mode='rb'):
+            text = file_reader(filename, mode)
+            files[filename] = os.path.getmtime(filename)
+            return text
+
+        text = reader(self.filename).decode(self.encoding)
+        parser = TemplateParser(text, context=dict(context), path=os.path.dirname(self.filename),
+                                delimiters=self.delimiters, reader=reader, lexers=self.lexers,
+                                writer='response.write')
+        code = str(parser)
+        if stream:
+            code = 'def {name}():\n{body}\n    return\n    yield\n'.format(
+                name=self.stream_function, body=textwrap.indent(code, '    '))
+            code = ast.fix_missing_locations(StreamTransformer().visit(ast.parse(code, self.filename)))
+        return CompiledTemplate(compile(code, self.filename, 'exec'), files)
+
+    def get_compiled(self, context, stream=False):
+        key = (self.filename, context.get('layout'))
+        if stream:
+            key += ('stream',)
+        compiled = self.cache.get(key)
+        if compiled is None:
+            compiled = self.bundle.get(key) if self.bundle else None
+            if compiled is None:
+                compiled = self.compile(context, stream=stream)
+            self.cache.set(key, compiled)
+        return compiled
 
     def render(self, *args, **kwargs):
+        from yatl.template import DummyResponse, NOESCAPE
+        for dictarg in args: kwargs.update(dictarg)
+        _defaults = self.defaults.copy()
+        _defaults.update(kwargs)
+        compiled = self.get_compiled(_defaults)
+        _defaults.setdefault('NOESCAPE', NOESCAPE)
+        _defaults.setdefault('FLUSH', FLUSH)
+        _defaults.setdefault('FRAGMENTS', fragment_cache)
+        response = _defaults.get('response')
+        if response is not None and hasattr(response, 'body'):
+            old_body, response.body = response.body, StringIO()
+        else:
+            old_body, response = None, DummyResponse()
+            _defaults['response'] = response
+        exec(compiled.code, _defaults)
+        text = response.body.getvalue()
+        if old_body is not None:
+            response.body = old_body
+        return text
+
+    def stream(self, *args, chunk_size=4096, **kwargs):
+        """
+        Renders the template as a generator of string chunks.
+
+        Lazy iterables in the context (e.g. ``query.iterator()``) are consumed while the chunks
+        are sent, so rows are never materialized all at once. Note that they are therefore
+        evaluated after the request handler (and its plugins) returned.
+        :param chunk_size: minimum size of each chunk, unless flushed before with FLUSH
+        :type chunk_size: int
+        :rtype: generator
+        """
+        from yatl.template import NOESCAPE
         for dictarg in args: kwargs.update(dictarg)
         _defaults = self.defaults.copy()
         _defaults.update(kwargs)
-        dirname = os.path.dirname(self.filename)
-        return self.tpl(path=dirname, filename=self.filename, context=_defaults)
+        compiled = self.get_compiled(_defaults, stream=True)
+        _defaults.setdefault('NOESCAPE', NOESCAPE)
+        _defaults.setdefault('FLUSH', FLUSH)
+        _defaults.setdefault('FRAGMENTS', fragment_cache)
+        response = _defaults['response'] = StreamResponse(chunk_size)
+        exec(compiled.code, _defaults)
+        yield from _defaults[self.stream_function]()
+        response.flush()
+        yield from response.drain()
 
-yatl_template = functools.partial(template, template_adapter=YatlTemplate)
\ No newline at end of file
+yatl_template = functools.partial(template, template_adapter=YatlTemplate)
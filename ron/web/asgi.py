@@ -0,0 +1,483 @@
+import asyncio
+import contextvars
+import inspect
+import sys
+import tempfile
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+import bottle
+from bottle import Bottle, HTTPError, HTTPResponse, JSONPlugin, path_shift
+
+from ron.base.lazymodule import LazyModule
+
+# queued when a response body is exhausted
+_DONE = object()
+
+# chunks of a sync response body read ahead of the client
+_READ_AHEAD = 8
+
+# marks an unset context local
+_UNSET = object()
+
+# thread pool of the adapter serving the current request
+_executor = contextvars.ContextVar('ron.asgi.executor', default=None)
+
+
+def context_property(name):
+    """
+    Returns a property stored in a context variable: local to the thread outside asyncio, and
+    to the task inside it
+    """
+    var = contextvars.ContextVar('bottle.' + name, default=_UNSET)
+
+    def fget(self):
+        value = var.get()
+        if value is _UNSET:
+            raise RuntimeError('Request context not initialized.')
+        return value
+
+    def fset(self, value):
+        var.set(value)
+
+    def fdel(self):
+        var.set(_UNSET)
+
+    return property(fget, fset, fdel, 'Context-local property')
+
+
+def use_context_locals():
+    """
+    Makes bottle.request and bottle.response context-local instead of thread-local, so async
+    actions sharing the event loop thread each see their own request, and a request handled
+    by several pool threads keeps its state.
+
+    This patches bottle's LocalRequest and LocalResponse classes for the whole process, WSGI
+    serving included, where context variables behave as thread locals. Applications opt in
+    with ``asgi_context_locals: True``; async actions require it
+    """
+    if context_locals_enabled():
+        return
+    bottle.LocalRequest.environ = context_property('environ')
+    for name in ('_status_line', '_status_code', '_cookies', '_headers', 'body'):
+        setattr(bottle.LocalResponse, name, context_property(name))
+    bottle.LocalRequest._ron_context_locals = True
+
+
+def context_locals_enabled():
+    return getattr(bottle.LocalRequest, '_ron_context_locals', False)
+
+
+def is_async(callback):
+    return inspect.iscoroutinefunction(callback) or inspect.isasyncgenfunction(callback)
+
+
+async def run_in_thread(func, *args, **kwargs):
+    """
+    Runs a blocking call from an async action on the thread pool of the ASGI adapter, with the
+    current request context, e.g. ``rows = await run_in_thread(list, Item.select())``
+    """
+    context = contextvars.copy_context()
+    return await asyncio.get_running_loop().run_in_executor(
+        _executor.get(), partial(context.run, func, *args, **kwargs))
+
+
+class DeferredResponse:
+    """
+    Innermost WSGI application of the middleware chain for async actions: it records the
+    environ and start_response the middlewares pass in, and sends the response of the action,
+    awaited meanwhile, when the chain iterates it on the thread pool
+    """
+
+    def __init__(self, loop, fallback):
+        self.loop = loop
+        # WSGI application answering the request when it does not reach an async route
+        self.fallback = fallback
+        self.environ = None
+        self.start_response = None
+        self.status = None
+        self.headers = None
+        self.body = None
+
+    @staticmethod
+    def application(environ, start_response):
+        deferred = environ['ron.asgi.deferred']
+        deferred.environ = environ
+        deferred.start_response = start_response
+        return deferred
+
+    def __iter__(self):
+        if self.status is None:
+            self.body = self.fallback(self.environ, self.start_response)
+            yield from self.body
+            return
+        self.start_response(self.status, self.headers)
+        if not hasattr(self.body, '__aiter__'):
+            yield from self.body
+            return
+        # the chunks are produced on the event loop
+        iterator = self.body.__aiter__()
+        while True:
+            try:
+                yield asyncio.run_coroutine_threadsafe(iterator.__anext__(), self.loop).result()
+            except StopAsyncIteration:
+                return
+
+    def close(self):
+        if hasattr(self.body, 'aclose'):
+            asyncio.run_coroutine_threadsafe(self.body.aclose(), self.loop).result()
+        elif hasattr(self.body, 'close'):
+            self.body.close()
+
+
+class ASGIAdapter:
+    """
+    ASGI application serving a Ron application.
+
+    Sync controller actions run through the WSGI middlewares and the bottle application on a
+    bounded thread pool, each response on one thread, from the call to the end of its body. Actions declared with ``async def`` run on the event loop: their
+    routes are resolved there, following mounted modules, and their plugins and hooks are
+    called around the awaited handler. An action may also return an async iterator, which is
+    streamed as it produces chunks. Response bodies are sent chunk by chunk, never buffered.
+
+    Blocking calls in async actions, database queries included, belong in ``run_in_thread``.
+    """
+
+    def __init__(self, app, threads=None):
+        """
+        :param app: initialized Application
+        :param threads: size of the thread pool running sync actions
+        """
+        self.app = app
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='ron-asgi')
+        self.wsgi = app.get_with_middleware()
+        self.deferred_wsgi = (app.get_with_middleware(DeferredResponse.application)
+                              if app.middlewares or app.metrics_plugin is not None else None)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+        if scope['type'] != 'http':
+            raise ValueError('Unsupported ASGI scope type: ' + scope['type'])
+        body = await self.read_body(receive)
+        if body is None:
+            return
+        _executor.set(self.executor)
+        environ = self.environ(scope, body)
+        route_environ, match = self.resolve(environ)
+        while isinstance(match, LazyModule):
+            await self.run_sync(contextvars.copy_context(), match.load)
+            route_environ, match = self.resolve(environ)
+        if match is None:
+            return await self.send_wsgi(send, self.wsgi, environ, contextvars.copy_context())
+        if not context_locals_enabled():
+            raise RuntimeError('Async actions require asgi_context_locals: True in the application config')
+        if self.deferred_wsgi is None:
+            status, headers, body = await self.call_async(route_environ, *match)
+            return await self.send_response(send, status, headers, body, contextvars.copy_context())
+
+        deferred = environ['ron.asgi.deferred'] = DeferredResponse(asyncio.get_running_loop(), self.app)
+        state = {}
+        # middlewares may block, so the chain runs on the thread pool too
+        result = await self.run_sync(contextvars.copy_context(), self.deferred_wsgi, environ, self.start_response(state))
+        if deferred.environ is not None:
+            route_environ, match = self.resolve(deferred.environ)
+            if match is not None and not isinstance(match, LazyModule):
+                # lets middlewares read route options, as after Bottle._handle
+                deferred.environ['bottle.route'] = match[1]
+                deferred.status, deferred.headers, deferred.body = await self.call_async(route_environ, *match)
+        # else a middleware answered without calling the application, result is its response
+        await self.send_wsgi_result(send, result, state, contextvars.copy_context())
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    @staticmethod
+    async def read_body(receive):
+        """
+        Reads the request body, spooled to disk past bottle's MEMFILE_MAX
+        :return: the body file, or None when the client disconnected
+        """
+        body = tempfile.SpooledTemporaryFile(max_size=bottle.BaseRequest.MEMFILE_MAX)
+        more = True
+        while more:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                body.close()
+                return None
+            body.write(message.get('body', b''))
+            more = message.get('more_body', False)
+        body.seek(0)
+        return body
+
+    @staticmethod
+    def environ(scope, body):
+        """
+        Builds the WSGI environ of an ASGI HTTP scope
+        :rtype: dict
+        """
+        script_name = scope.get('root_path', '')
+        path = scope['path']
+        if script_name and path.startswith(script_name):
+            path = path[len(script_name):]
+        server = scope.get('server') or ('localhost', 80)
+        environ = {
+            'REQUEST_METHOD': scope['method'],
+            'SCRIPT_NAME': script_name.encode('utf8').decode('latin1'),
+            'PATH_INFO': path.encode('utf8').decode('latin1'),
+            'QUERY_STRING': scope.get('query_string', b'').decode('latin1'),
+            'SERVER_NAME': server[0],
+            'SERVER_PORT': str(server[1]),
+            'SERVER_PROTOCOL': 'HTTP/' + scope.get('http_version', '1.1'),
+            'CONTENT_LENGTH': str(body.seek(0, 2)),
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': scope.get('scheme', 'http'),
+            'wsgi.input': body,
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': False,
+            'wsgi.run_once': False,
+            'asgi.scope': scope,
+        }
+        body.seek(0)
+        if scope.get('client'):
+            environ['REMOTE_ADDR'], environ['REMOTE_PORT'] = scope['client'][0], str(scope['client'][1])
+        for name, value in scope.get('headers', ()):
+            name, value = name.decode('latin1').upper().replace('-', '_'), value.decode('latin1')
+            if name == 'CONTENT_TYPE':
+                environ['CONTENT_TYPE'] = value
+            elif name not in ('CONTENT_LENGTH', 'TRANSFER_ENCODING'):
+                # the body is already complete and de-chunked
+                key = 'HTTP_' + name
+                environ[key] = environ[key] + ',' + value if key in environ else value
+        return environ
+
+    @staticmethod
+    def prepare(environ):
+        # as Bottle._handle does before matching
+        path = environ['bottle.raw_path'] = environ['PATH_INFO']
+        try:
+            environ['PATH_INFO'] = path.encode('latin1').decode('utf8')
+        except UnicodeError:
+            pass
+
+    def resolve(self, environ):
+        """
+        Finds the async route a request is dispatched to, following mounted modules as their
+        mount points would
+        :return: a copy of environ with the paths shifted for the route, and (applications from
+            this one to the route owner, route, url args); None for sync routes and requests not
+            answered by a route; a LazyModule to load before resolving again
+        :rtype: tuple
+        """
+        environ = dict(environ)
+        self.prepare(environ)
+        apps, app = [], self.app
+        while True:
+            try:
+                route, args = app.router.match(environ)
+            except HTTPError:
+                return environ, None
+            apps.append(app)
+            mountpoint = route.config.get('mountpoint')
+            if not mountpoint:
+                return environ, (apps, route, args) if is_async(route.callback) else None
+            target = mountpoint['target']
+            if isinstance(target, LazyModule):
+                if target.module is None:
+                    return environ, target
+                target = target.module
+            if not isinstance(target, Bottle):
+                return environ, None
+            environ['SCRIPT_NAME'], environ['PATH_INFO'] = path_shift(
+                environ.get('SCRIPT_NAME', '/'), environ['PATH_INFO'],
+                len([segment for segment in mountpoint['prefix'].split('/') if segment]))
+            app = target
+
+    def run_sync(self, context, func, *args):
+        return asyncio.get_running_loop().run_in_executor(self.executor, partial(context.run, func, *args))
+
+    async def call_async(self, environ, apps, route, args):
+        """
+        Calls an async route as Bottle._handle would, on the event loop
+        :return: status line, headers and body, a list or a (sync or async) iterable
+        :rtype: tuple
+        """
+        app = apps[-1]
+        environ['bottle.app'] = app
+        bottle.request.bind(environ)
+        bottle.response.bind()
+        environ['route.handle'] = environ['bottle.route'] = route
+        environ['route.url_args'] = args
+        try:
+            for owner in apps:
+                owner.trigger_hook('before_request')
+            try:
+                out = route.call(**args)
+                if inspect.isawaitable(out):
+                    out = await out
+            finally:
+                for owner in reversed(apps):
+                    owner.trigger_hook('after_request')
+        except HTTPResponse as e:
+            out = e
+        except (KeyboardInterrupt, SystemExit, MemoryError):
+            raise
+        except Exception as e:
+            if not app.catchall:
+                raise
+            stacktrace = traceback.format_exc()
+            environ['wsgi.errors'].write(stacktrace)
+            out = HTTPError(500, 'Internal Server Error', e, stacktrace)
+
+        json_plugin = next((plugin for plugin in route.all_plugins() if isinstance(plugin, JSONPlugin)), None)
+        if json_plugin is not None:
+            # the plugin only saw the coroutine
+            if isinstance(out, dict):
+                out = json_plugin.json_dumps(out)
+                bottle.response.content_type = 'application/json'
+            elif isinstance(out, HTTPResponse) and isinstance(out.body, dict):
+                out.body = json_plugin.json_dumps(out.body)
+                out.content_type = 'application/json'
+        if hasattr(out, '__aiter__'):
+            body = self.encode(out, bottle.response.charset)
+        else:
+            body = app._cast(out)
+        if bottle.response._status_code in (100, 101, 204, 304) or environ['REQUEST_METHOD'] == 'HEAD':
+            await self.close(body, contextvars.copy_context())
+            body = []
+        return bottle.response._status_line, bottle.response.headerlist, body
+
+    @staticmethod
+    async def encode(chunks, charset):
+        try:
+            async for chunk in chunks:
+                yield chunk.encode(charset) if isinstance(chunk, str) else chunk
+        finally:
+            if hasattr(chunks, 'aclose'):
+                await chunks.aclose()
+
+    @staticmethod
+    def start_response(state):
+        def start_response(status, headers, exc_info=None):
+            if exc_info and state.get('sent'):
+                raise exc_info[1].with_traceback(exc_info[2])
+            state['status'], state['headers'] = status, headers
+            return state.setdefault('written', []).append
+
+        state['written'] = []
+        return start_response
+
+    async def send_wsgi(self, send, wsgi, environ, context):
+        state = {}
+        await self.send_pumped(send, state, context, wsgi, environ, self.start_response(state))
+
+    async def send_wsgi_result(self, send, result, state, context):
+        """
+        Sends the response of a WSGI application, iterating its body on the thread pool
+        """
+        if isinstance(result, (list, tuple)):
+            state['sent'] = True
+            return await self.send_response(send, state['status'], state['headers'],
+                                            state['written'] + list(result), context)
+        await self.send_pumped(send, state, context, lambda: result)
+
+    async def send_response(self, send, status, headers, body, context):
+        if not isinstance(body, (list, tuple)) and not hasattr(body, '__aiter__'):
+            state = {'status': status, 'headers': headers, 'written': []}
+            return await self.send_pumped(send, state, context, lambda: body)
+        await self.start(send, status, headers)
+        if isinstance(body, (list, tuple)):
+            await send({'type': 'http.response.body', 'body': b''.join(body), 'more_body': False})
+            return
+        try:
+            async for chunk in body:
+                await self.send_chunk(send, chunk)
+            await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+        finally:
+            await self.close(body, context)
+
+    async def send_pumped(self, send, state, context, produce, *args):
+        """
+        Sends the body returned by produce(*args), called and iterated by pump on a single pool
+        thread
+        :param state: status, headers and chunks written by start_response
+        """
+        queue = asyncio.Queue()
+        space = threading.Semaphore(_READ_AHEAD)
+        stop = threading.Event()
+        job = self.run_sync(context, self.pump, asyncio.get_running_loop(), queue, space, stop, produce, *args)
+        item = None
+        try:
+            item = await queue.get()
+            if item is _DONE:
+                # raises when the application failed before its first chunk
+                await job
+            state['sent'] = True
+            await self.start(send, state['status'], state['headers'])
+            for chunk in state['written']:
+                await self.send_chunk(send, chunk)
+            while item is not _DONE:
+                space.release()
+                await self.send_chunk(send, item)
+                item = await queue.get()
+            await job
+            await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+        finally:
+            if item is not _DONE:
+                # the client is gone: the thread stops reading and closes the body
+                stop.set()
+                space.release()
+                await asyncio.wait([job])
+
+    @staticmethod
+    def pump(loop, queue, space, stop, produce, *args):
+        """
+        Calls produce and iterates the body it returns on the current pool thread, handing the
+        chunks to the event loop through queue. The call, the iteration and the close of a
+        response share one thread, so thread-local state such as bottle.request without context
+        locals or a pooled database connection belongs to that response only. At most
+        _READ_AHEAD chunks wait in the queue
+        """
+        body = None
+        try:
+            body = produce(*args)
+            for chunk in body:
+                space.acquire()
+                if stop.is_set():
+                    break
+                loop.call_soon_threadsafe(queue.put_nowait, chunk)
+        finally:
+            try:
+                if hasattr(body, 'close'):
+                    body.close()
+            finally:
+                loop.call_soon_threadsafe(queue.put_nowait, _DONE)
+
+    @staticmethod
+    async def start(send, status, headers):
+        await send({
+            'type': 'http.response.start',
+            'status': int(status.split(' ', 1)[0]),
+            'headers': [(name.lower().encode('latin1'), value.encode('latin1')) for name, value in headers],
+        })
+
+    @staticmethod
+    async def send_chunk(send, chunk):
+        if chunk:
+            await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+
+    async def close(self, body, context):
+        if hasattr(body, 'aclose'):
+            await body.aclose()
+        elif hasattr(body, 'close'):
+            await self.run_sync(context, body.close)
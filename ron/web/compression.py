@@ -0,0 +1,225 @@
+import threading
+import time
+import zlib
+
+# zlib window bits of every supported content encoding
+WBITS = {'gzip': 16 + zlib.MAX_WBITS, 'deflate': zlib.MAX_WBITS}
+
+
+class CompressionStats:
+    """
+    Compression counters of the process, shared by every CompressionMiddleware instance
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # {encoding: responses}
+        self.responses = {}
+        self.skipped = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.cpu = 0.0
+
+    def record(self, encoding, bytes_in, bytes_out, cpu):
+        with self._lock:
+            self.responses[encoding] = self.responses.get(encoding, 0) + 1
+            self.bytes_in += bytes_in
+            self.bytes_out += bytes_out
+            self.cpu += cpu
+
+    def skip(self):
+        with self._lock:
+            self.skipped += 1
+
+    def lines(self):
+        """
+        Returns the counters in the Prometheus text exposition format
+        :rtype: list
+        """
+        lines = ['# TYPE ron_compression_responses_total counter']
+        for encoding, count in sorted(self.responses.items()):
+            lines.append('ron_compression_responses_total{encoding="%s"} %d' % (encoding, count))
+        for name, fmt, value in (('ron_compression_skipped_total', '%d', self.skipped),
+                                 ('ron_compression_bytes_in_total', '%d', self.bytes_in),
+                                 ('ron_compression_bytes_out_total', '%d', self.bytes_out),
+                                 ('ron_compression_bytes_saved_total', '%d', self.bytes_in - self.bytes_out),
+                                 ('ron_compression_cpu_seconds_total', '%f', self.cpu)):
+            lines.append('# TYPE %s counter' % name)
+            lines.append(('%s ' + fmt) % (name, value))
+        return lines
+
+
+# counters of this process
+compression_stats = CompressionStats()
+
+
+class Compressor:
+    """
+    Compresses one response body. Streamed bodies are flushed after every chunk, so the client
+    gets each chunk as soon as the application yields it
+    """
+
+    def __init__(self, encoding, level, streamed):
+        self.encoding = encoding
+        self.streamed = streamed
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, WBITS[encoding])
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.cpu = 0.0
+
+    def compress(self, data):
+        start = time.thread_time()
+        out = self._compressor.compress(data)
+        if self.streamed:
+            out += self._compressor.flush(zlib.Z_SYNC_FLUSH)
+        self.cpu += time.thread_time() - start
+        self.bytes_in += len(data)
+        self.bytes_out += len(out)
+        return out
+
+    def finish(self):
+        start = time.thread_time()
+        out = self._compressor.flush()
+        self.cpu += time.thread_time() - start
+        self.bytes_out += len(out)
+        compression_stats.record(self.encoding, self.bytes_in, self.bytes_out, self.cpu)
+        return out
+
+
+class CompressionMiddleware:
+    """
+    WSGI middleware compressing responses with gzip or deflate, as negotiated with the
+    Accept-Encoding request header.
+
+    Responses are left alone when their content type is not in types, when they are smaller
+    than min_size bytes, or when they are already encoded. Bodies of unknown length
+    (streamed) are compressed chunk by chunk as they are produced. A route can set its own
+    level with a ``compress_level`` route option, e.g. ``@Controller.route('/feed',
+    compress_level=9)``; 0 disables compression for it.
+    """
+
+    # mime types worth compressing; entries ending with / match every subtype
+    compressible_types = ('text/', 'application/json', 'application/javascript', 'application/xml',
+                          'application/xhtml+xml', 'application/rss+xml', 'application/atom+xml',
+                          'application/ld+json', 'application/manifest+json', 'image/svg+xml')
+
+    def __init__(self, app, level=6, min_size=1024, types=None, encodings=('gzip', 'deflate')):
+        """
+        :param level: zlib compression level, 1 (fastest) to 9 (smallest)
+        :param min_size: smallest body compressed, in bytes, when its length is known
+        :param types: compressible mime types, compressible_types by default
+        :param encodings: supported encodings, in order of preference
+        """
+        self.app = app
+        self.level = level
+        self.min_size = min_size
+        self.types = tuple(types or self.compressible_types)
+        self.encodings = tuple(encoding for encoding in encodings if encoding in WBITS)
+
+    def __call__(self, environ, start_response):
+        encoding = self.negotiate(environ.get('HTTP_ACCEPT_ENCODING', ''))
+        state = {}
+
+        def compressing_start_response(status, headers, exc_info=None):
+            compressor = state['compressor'] = self.compressor(environ, status, headers, encoding)
+            write = start_response(status, headers, exc_info)
+            if compressor is None:
+                return write
+            return lambda data: write(compressor.compress(data))
+
+        result = self.app(environ, compressing_start_response)
+        if 'compressor' in state and state['compressor'] is None:
+            return result
+        return self.compressed(result, state)
+
+    def negotiate(self, accept_encoding):
+        """
+        Returns the preferred encoding accepted by the client, or None
+        :rtype: str
+        """
+        if not accept_encoding:
+            return None
+        accepted, refused = set(), set()
+        for item in accept_encoding.split(','):
+            name, _, params = item.partition(';')
+            params = params.replace(' ', '')
+            name = name.strip().lower()
+            if params.startswith('q=') and params[2:].strip('0.') == '':
+                refused.add(name)
+            else:
+                accepted.add(name)
+        for encoding in self.encodings:
+            if encoding not in refused and (encoding in accepted or '*' in accepted):
+                return encoding
+        return None
+
+    def compressible(self, content_type):
+        mimetype = content_type.split(';', 1)[0].strip().lower()
+        return any(mimetype.startswith(item) if item.endswith('/') else mimetype == item for item in self.types)
+
+    def compressor(self, environ, status, headers, encoding):
+        """
+        Decides whether a response is compressed and updates its headers accordingly
+        :return: the Compressor of the body, or None to send it as is
+        :rtype: Compressor
+        """
+        code = int(status[:3])
+        values = {name.lower(): value for name, value in headers}
+        if code == 304 and self.compressible(values.get('content-type', 'text/')):
+            # a 304 carries the Vary of the 200 it stands for, which has no Content-Type here
+            self.vary(headers, values)
+            return None
+        if code < 200 or code >= 300 or code in (204, 206) or environ['REQUEST_METHOD'] == 'HEAD':
+            return None
+        if 'content-encoding' in values or 'no-transform' in values.get('cache-control', ''):
+            return None
+        if not self.compressible(values.get('content-type', '')):
+            return None
+        self.vary(headers, values)
+
+        route = environ.get('bottle.route')
+        level = route.config.get('compress_level', self.level) if route is not None else self.level
+        length = values.get('content-length')
+        if encoding is None or not level or (length is not None and int(length) < self.min_size):
+            compression_stats.skip()
+            return None
+
+        etag = values.get('etag')
+        headers[:] = [(name, value) for name, value in headers if name.lower() != 'content-length']
+        if etag is not None and not etag.startswith('W/'):
+            # the compressed body is a different representation
+            headers[:] = [(name, 'W/' + value if name.lower() == 'etag' else value) for name, value in headers]
+        headers.append(('Content-Encoding', encoding))
+        return Compressor(encoding, level, streamed=length is None)
+
+    @staticmethod
+    def vary(headers, values):
+        """
+        Adds Accept-Encoding to the Vary header of a response
+        """
+        vary = values.get('vary')
+        if vary is None:
+            headers.append(('Vary', 'Accept-Encoding'))
+        elif 'accept-encoding' not in vary.lower() and vary.strip() != '*':
+            headers[:] = [(name, value + ', Accept-Encoding' if name.lower() == 'vary' else value)
+                          for name, value in headers]
+
+    @staticmethod
+    def compressed(result, state):
+        try:
+            compressor = None
+            for chunk in result:
+                # start_response may be called on the first iteration
+                compressor = state.get('compressor')
+                if compressor is None:
+                    yield chunk
+                elif chunk:
+                    data = compressor.compress(chunk)
+                    if data:
+                        yield data
+            compressor = state.get('compressor')
+            if compressor is not None:
+                yield compressor.finish()
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
@@ -0,0 +1,137 @@
+import calendar
+import hashlib
+import inspect
+from datetime import date, datetime
+
+import bottle
+from bottle import HTTPResponse, JSONPlugin
+
+
+def make_etag(value):
+    """
+    Returns a weak ETag for a response body or any other validator (a version number, an
+    update time, ...)
+    :rtype: str
+    """
+    if not isinstance(value, bytes):
+        value = str(value).encode('utf8')
+    return 'W/"%s"' % hashlib.blake2b(value, digest_size=12).hexdigest()
+
+
+def etag_matches(header, etag):
+    """
+    Returns whether an If-None-Match header matches etag, with the weak comparison
+    :rtype: bool
+    """
+    if header.strip() == '*':
+        return True
+    etag = etag[2:] if etag.startswith('W/') else etag
+    for candidate in header.split(','):
+        candidate = candidate.strip()
+        if (candidate[2:] if candidate.startswith('W/') else candidate) == etag:
+            return True
+    return False
+
+
+def timestamp(value):
+    if isinstance(value, datetime):
+        return calendar.timegm(value.utctimetuple())
+    if isinstance(value, date):
+        return calendar.timegm(value.timetuple())
+    return int(value)
+
+
+def is_fresh(etag=None, last_modified=None):
+    """
+    Returns whether the client copy of the current request is still valid for the given
+    validators. If-None-Match takes precedence over If-Modified-Since
+    :rtype: bool
+    """
+    request = bottle.request
+    if request.method not in ('GET', 'HEAD'):
+        return False
+    if_none_match = request.environ.get('HTTP_IF_NONE_MATCH')
+    if if_none_match is not None:
+        return etag is not None and etag_matches(if_none_match, etag)
+    if_modified_since = request.environ.get('HTTP_IF_MODIFIED_SINCE')
+    if if_modified_since and last_modified is not None:
+        since = bottle.parse_date(if_modified_since.split(';')[0].strip())
+        return since is not None and since >= timestamp(last_modified)
+    return False
+
+
+def not_modified(response):
+    """
+    Turns response into a 304 Not Modified response, keeping its headers except the ones
+    describing the body
+    """
+    response.status = 304
+    for name in ('Content-Type', 'Content-Length'):
+        if name in response:
+            del response[name]
+    return response
+
+
+def conditional(etag=None, last_modified=None):
+    """
+    Sets ETag and Last-Modified validators on the current response, and ends the request with
+    304 Not Modified when the client copy matches them
+    :param etag: any value changing when the response does, e.g. a version number
+    :param last_modified: datetime, date or timestamp of the last change
+    :raises HTTPResponse: 304 Not Modified
+    """
+    if etag is not None:
+        etag = make_etag(etag)
+        bottle.response.set_header('ETag', etag)
+    if last_modified is not None:
+        bottle.response.set_header('Last-Modified', bottle.http_date(timestamp(last_modified)))
+    if is_fresh(etag, last_modified):
+        raise not_modified(bottle.response.copy(cls=HTTPResponse))
+
+
+class ConditionalPlugin:
+    """
+    Bottle plugin adding an ETag, a hash of the body, to successful GET responses rendered by
+    an action (strings, bytes and autojson dicts), and answering a matching If-None-Match
+    with 304 Not Modified. Responses that already carry validators, e.g. set by
+    Controller.conditional, streamed bodies and files are left alone.
+    """
+
+    name = 'conditional'
+    api = 2
+
+    def apply(self, callback, route):
+        json_plugin = next((plugin for plugin in route.all_plugins() if isinstance(plugin, JSONPlugin)), None)
+        json_dumps = json_plugin.json_dumps if json_plugin is not None else None
+
+        if inspect.iscoroutinefunction(callback):
+            async def async_wrapper(*args, **kwargs):
+                return self.validate(await callback(*args, **kwargs), json_dumps)
+
+            return async_wrapper
+
+        def wrapper(*args, **kwargs):
+            return self.validate(callback(*args, **kwargs), json_dumps)
+
+        return wrapper
+
+    @staticmethod
+    def validate(result, json_dumps):
+        response = bottle.response
+        if bottle.request.method not in ('GET', 'HEAD') or response.status_code != 200 or 'ETag' in response:
+            return result
+        if isinstance(result, dict) and json_dumps is not None:
+            result = json_dumps(result)
+            response.content_type = 'application/json'
+        if isinstance(result, str):
+            body = result.encode(response.charset)
+        elif isinstance(result, bytes):
+            body = result
+        else:
+            return result
+        etag = make_etag(body)
+        response.set_header('ETag', etag)
+        if is_fresh(etag):
+            not_modified(response)
+            return ''
+        return result
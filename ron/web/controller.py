@@ -1,22 +1,62 @@
 import functools
+import inspect
 from functools import wraps
 from inflection import underscore
 
+from ron.caching.response import ResponseCache
+from ron.web.conditional import conditional
+from ron.web.reverse import reverse_index
+
 def routeapp(obj, app):
+    """
+    Finds the routed methods of a controller and registers their routes
+    :return: the registered routes, as (action name, route params) pairs
+    :rtype: list
+    """
+    routes = []
     for kw in dir(obj):
         attr = getattr(obj, kw)
         if hasattr(attr, 'route'):
             if isinstance(attr.route, dict):
-                route_params = attr.route
+                route_list = [attr.route]
+            elif isinstance(attr.route, list):
+                route_list = attr.route
+            else:
+                continue
+            for route_data in route_list:
+                # route dicts belong to the function and are shared by every controller instance
+                route_params = dict(route_data)
                 if obj.base_route:
                     route_params['path'] = obj.base_route + route_params['path']
-                app.route(**route_params)(attr)
-            elif isinstance(attr.route, list):
-                for route_data in attr.route:
-                    route_params = route_data
-                    if obj.base_route:
-                        route_params['path'] = obj.base_route + route_params['path']
-                    app.route(**route_params)(attr)
+                routes.append((kw, route_params))
+    bind_routes(obj, app, routes)
+    return routes
+
+
+def bind_routes(obj, app, routes):
+    """
+    Registers already resolved (action name, route params) pairs of a controller
+    """
+    for kw, route_params in routes:
+        app.route(**route_params)(getattr(obj, kw))
+        index_route(obj.__class__.__module__ + '.' + kw, app, route_params)
+    return routes
+
+
+def action_name(callback):
+    """
+    Returns the dotted name (``package.controllers.module.action``) of a route callback
+    :rtype: str
+    """
+    owner = getattr(callback, '__self__', None)
+    module = owner.__class__.__module__ if owner is not None else getattr(callback, '__module__', None)
+    return '{module}.{name}'.format(module=module, name=getattr(callback, '__name__', repr(callback)))
+
+
+def index_route(action_name, app, route_params):
+    reverse_index.add(action_name, app, route_params['path'])
+    if route_params.get('name'):
+        reverse_index.add(route_params['name'], app, route_params['path'])
 
 
 class Controller:
@@ -25,9 +65,26 @@ class Controller:
 
     module = None
 
-    def __init__(self, module):
+    def __init__(self, module, routes=None):
+        """
+        :param routes: (action name, route params) pairs to register instead of inspecting the
+            controller, as stored in a route manifest
+        :type routes: list
+        """
         self.module = module
-        routeapp(self, self.module.app())
+        if routes is None:
+            self.bound_routes = routeapp(self, self.module.app())
+        else:
+            self.bound_routes = bind_routes(self, self.module.app(), routes)
+
+    def conditional(self, etag=None, last_modified=None):
+        """
+        Sets the ETag and Last-Modified validators of the response. When the client copy
+        matches them the request ends here with 304 Not Modified, before any rendering
+        :param etag: any value changing when the response does, e.g. a version number
+        :param last_modified: datetime, date or timestamp of the last change, e.g. a model's updated_at
+        """
+        conditional(etag=etag, last_modified=last_modified)
 
     @staticmethod
     def add_route(function, route, **route_args):
@@ -45,7 +102,7 @@ class Controller:
 
         return decorator
 
-    def action(route=None, filepath=None, ext='.tpl', **route_args):
+    def action(route=None, filepath=None, ext='.tpl', stream=False, **route_args):
         ''' Decorator: renders a template for a handler.
                         The handler can control its behavior like that:
 
@@ -54,25 +111,54 @@ class Controller:
                             process the template, but return the handler result as is.
                             This includes returning a HTTPResponse(dict) to get,
                             for instance, JSON with autojson or other castfilters.
+
+                        With stream=True (or a chunk size) the template is sent in chunks
+                        while it renders, see View.stream.
+
+                        An ``async def`` handler is awaited before rendering, see ron.web.asgi.
                     '''
         def real_decorator(func):
 
             Controller.add_route(func, route, **route_args)
 
-            @wraps(func)
-            def wrapper(self, *args, **kwargs):
-                result = func(self, *args, **kwargs)
+            def render(self, result):
                 if not filepath:
                     action = func.__name__
                     filename = underscore(self.__class__.__name__) + '/' + action + ext
                 else:
                     filename = filepath
+                if stream:
+                    chunk_size = 4096 if stream is True else stream
+                    return self.module.view.stream(filename, chunk_size=chunk_size, **result)
                 return self.module.view.render(filename, **result)
 
+            if inspect.iscoroutinefunction(func):
+                @wraps(func)
+                async def async_wrapper(self, *args, **kwargs):
+                    return render(self, await func(self, *args, **kwargs))
+
+                return async_wrapper
+
+            @wraps(func)
+            def wrapper(self, *args, **kwargs):
+                return render(self, func(self, *args, **kwargs))
+
             return wrapper
 
         return real_decorator
 
+    def cached(ttl=60, stale=0, vary_query=(), vary_session=None, tags=()):
+        ''' Decorator: caches the full response of a handler in the application cache component.
+                Apply it above Controller.route/Controller.action:
+
+                  - ttl: seconds the response is served from cache
+                  - stale: extra seconds a stale copy is served while one request rebuilds it
+                  - vary_query: query variables included in the cache key
+                  - vary_session: session key (e.g. the user id) included in the cache key
+                  - tags: tag names or model classes; saving or deleting a model invalidates them
+            '''
+        return ResponseCache(ttl=ttl, stale=stale, vary_query=vary_query, vary_session=vary_session, tags=tags)
+
     def view(tpl_name):
         ''' Decorator: renders a template for a handler.
                 The handler can control its behavior like that:
@@ -84,6 +170,14 @@ class Controller:
                     for instance, JSON with autojson or other castfilters.
             '''
         def decorator(func):
+            if inspect.iscoroutinefunction(func):
+                @functools.wraps(func)
+                async def async_wrapper(self, *args, **kwargs):
+                    result = await func(self, *args, **kwargs)
+                    return self.module.view.render(tpl_name, **result)
+
+                return async_wrapper
+
             @functools.wraps(func)
             def wrapper(self, *args, **kwargs):
                 result = func(self, *args, **kwargs)
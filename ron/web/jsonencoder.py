@@ -0,0 +1,90 @@
+import datetime
+import decimal
+import json
+import uuid
+
+import bottle
+from peewee import Model, chunked
+from playhouse.shortcuts import model_to_dict
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def default(value):
+    """
+    Serializes the values JSON engines do not know: models, dates, decimals, uuids and sets
+    """
+    if isinstance(value, Model):
+        to_dict = getattr(value, 'to_dict', None)
+        return to_dict() if to_dict is not None else model_to_dict(value, recurse=False)
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, (decimal.Decimal, uuid.UUID)):
+        return str(value)
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    raise TypeError('Object of type {name} is not JSON serializable'.format(name=type(value).__name__))
+
+
+_json_encoder = json.JSONEncoder(default=default, ensure_ascii=False, separators=(',', ':'))
+
+
+def json_dumps(value):
+    return _json_encoder.encode(value)
+
+
+def orjson_dumps(value):
+    return orjson.dumps(value, default=default, option=orjson.OPT_NON_STR_KEYS)
+
+
+# dumps function of every JSON engine
+engines = {
+    'json': json_dumps,
+    'orjson': orjson_dumps,
+}
+
+
+def get_engine(engine='auto'):
+    """
+    Returns the dumps function of a JSON engine
+    :param engine: 'auto' (orjson when installed, json otherwise), an engines key or a dumps function
+    :rtype: callable
+    """
+    if callable(engine):
+        return engine
+    if engine == 'auto':
+        engine = 'orjson' if orjson is not None else 'json'
+    if engine == 'orjson' and orjson is None:
+        raise ValueError('The orjson JSON engine requires the orjson package')
+    return engines[engine]
+
+
+def json_stream(rows, dumps=None, batch_size=100):
+    """
+    Returns a response body encoding rows as a JSON array while it is sent, so large results
+    are served in constant memory. A peewee query is run when the body is sent, with
+    query.iterator(), so its rows are not cached; DatabasePlugin keeps the request connection
+    until then. Return it from a sync action: the rows are read on the thread sending the
+    response.
+    :param rows: peewee query or any iterable of JSON serializable rows
+    :param dumps: dumps function, the application JSON engine by default
+    :param batch_size: rows encoded per chunk
+    :rtype: generator
+    """
+    if dumps is None:
+        from ron import Application
+        dumps = Application().json_dumps or get_engine()
+    bottle.response.content_type = 'application/json'
+    return _encode_rows(rows, dumps, batch_size)
+
+
+def _encode_rows(rows, dumps, batch_size):
+    separator = b'['
+    for batch in chunked(rows.iterator() if hasattr(rows, 'iterator') else rows, batch_size):
+        encoded = [dumps(row) for row in batch]
+        yield separator + b','.join(row if isinstance(row, bytes) else row.encode('utf8') for row in encoded)
+        separator = b','
+    yield b']' if separator == b',' else b'[]'
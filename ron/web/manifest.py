@@ -0,0 +1,119 @@
+import hashlib
+import json
+import os
+from importlib import import_module
+
+import bottle
+
+from ron.base.ronobject import RonObject
+
+# bumped when the manifest layout changes
+MANIFEST_VERSION = 1
+
+
+def source_hash(package):
+    """
+    Returns a hash of the names and contents of the python files of a package (not recursive)
+    :rtype: str
+    """
+    digest = hashlib.sha1()
+    for path in package.__path__:
+        for filename in sorted(os.listdir(path)):
+            if not filename.endswith('.py'):
+                continue
+            digest.update(filename.encode('utf-8'))
+            with open(os.path.join(path, filename), 'rb') as fp:
+                digest.update(fp.read())
+    return digest.hexdigest()
+
+
+class RouteManifest(RonObject):
+    """
+    Snapshot of the controllers and routes found by controller discovery.
+
+    Write it once per deployment (``python -m ron freeze-routes``) and point
+    ``Application.route_manifest`` at the file. Modules then import the listed controllers and
+    register the listed routes, without scanning packages and classes. A module whose
+    controllers package changed since the manifest was written, or that is missing from it,
+    falls back to discovery. The manifest is not used while ``bottle.DEBUG`` is on.
+    """
+
+    # manifest file path
+    path = 'routes.manifest'
+
+    def __init__(self, *args, **kwargs):
+        RonObject.__init__(self, *args, **kwargs)
+        # {controllers namespace: {'hash': source hash, 'controllers': [controller record]}}
+        self.entries = {}
+
+    def build(self, app):
+        """
+        Collects the controllers and routes of the application and its loaded submodules
+        :param app: initialized application
+        :type app: ron.Application
+        :return: controllers namespaces that could not be stored, with the reason
+        :rtype: list
+        """
+        errors = []
+        for module in self._modules(app):
+            if module.controller_routes is None:
+                continue
+            namespace = module._get_module_namespace() + '.controllers'
+            entry = {'hash': source_hash(import_module(namespace)), 'controllers': module.controller_routes}
+            try:
+                json.dumps(entry)
+            except (TypeError, ValueError) as e:
+                errors.append((namespace, e))
+                continue
+            self.entries[namespace] = entry
+        return errors
+
+    @staticmethod
+    def _modules(module, seen=None):
+        from ron.base import Module
+        seen = set() if seen is None else seen
+        if id(module) in seen:
+            return []
+        seen.add(id(module))
+        modules = [module]
+        for submodule in (module.modules or {}).values():
+            if isinstance(submodule, Module):
+                modules.extend(RouteManifest._modules(submodule, seen))
+        return modules
+
+    def save(self):
+        data = json.dumps({'version': MANIFEST_VERSION, 'entries': self.entries}, indent=1, sort_keys=True)
+        tmp_path = '{path}.{pid}.tmp'.format(path=self.path, pid=os.getpid())
+        with open(tmp_path, 'w') as fp:
+            fp.write(data)
+        os.replace(tmp_path, self.path)
+
+    def load(self):
+        """
+        Loads the manifest file. A missing file or another manifest version is ignored
+        :return: the manifest itself
+        :rtype: RouteManifest
+        """
+        try:
+            with open(self.path) as fp:
+                data = json.load(fp)
+        except (OSError, ValueError):
+            return self
+        if isinstance(data, dict) and data.get('version') == MANIFEST_VERSION:
+            self.entries = data['entries']
+        return self
+
+    def get(self, namespace, package):
+        """
+        Returns the controller records of a controllers package, or None if the package is not in
+        the manifest, changed since it was written, or debug mode is on
+        :param namespace: controllers package name
+        :param package: controllers package
+        :rtype: list
+        """
+        entry = self.entries.get(namespace)
+        if entry is None or bottle.DEBUG:
+            return None
+        if source_hash(package) != entry['hash']:
+            return None
+        return entry['controllers']
@@ -0,0 +1,249 @@
+import inspect
+import threading
+from bisect import bisect_left
+from contextvars import ContextVar
+from time import perf_counter
+
+import bottle
+
+from ron.models.queries import QueryLog
+from ron.web.controller import action_name
+
+# latency histogram upper bounds, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# metrics shard of the current thread
+_local = threading.local()
+
+# template render time of the request handled by the current thread or task
+_render = ContextVar('ron.metrics.render', default=0.0)
+
+# metrics shards of every thread
+_shards = []
+
+
+def _shard():
+    shard = getattr(_local, 'shard', None)
+    if shard is None:
+        shard = _local.shard = {}
+        _shards.append(shard)
+    return shard
+
+
+def record_render(duration):
+    """
+    Adds template render time to the request handled by the current thread or task
+    """
+    _render.set(_render.get() + duration)
+
+
+class ActionMetrics:
+    """
+    Counters of one controller action in one thread
+    """
+
+    __slots__ = ('requests', 'errors', 'in_flight', 'latency', 'buckets', 'size', 'sized', 'render', 'db')
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.latency = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.size = 0
+        self.sized = 0
+        self.render = 0.0
+        self.db = 0.0
+
+    def add(self, other):
+        for name in ('requests', 'errors', 'in_flight', 'latency', 'size', 'sized', 'render', 'db'):
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        self.buckets = [count + other_count for count, other_count in zip(self.buckets, other.buckets)]
+
+
+class MetricsPlugin:
+    """
+    Bottle plugin measuring every route by controller action: latency histogram, requests in
+    flight, errors, response sizes, and the time spent rendering templates and in the database.
+
+    Every thread writes to its own counters, so recording takes no lock; they are added up when
+    the metrics are read. ``text`` renders them in the Prometheus text format. Response sizes
+    are measured by ResponseSizeMiddleware, once bottle has encoded the body.
+    """
+
+    name = 'metrics'
+    api = 2
+
+    def __init__(self, collectors=()):
+        # callables returning extra lines for text()
+        self.collectors = list(collectors)
+
+    def apply(self, callback, route):
+        action = action_name(route.callback)
+
+        if inspect.iscoroutinefunction(callback):
+            async def async_wrapper(*args, **kwargs):
+                metrics, start = self.begin(action)
+                error = True
+                try:
+                    result = await callback(*args, **kwargs)
+                    error = bottle.response.status_code >= 500
+                    return result
+                except bottle.HTTPResponse as e:
+                    error = e.status_code >= 500
+                    raise
+                finally:
+                    self.end(metrics, start, error)
+                    self.sized(action, error)
+
+            return async_wrapper
+
+        def wrapper(*args, **kwargs):
+            metrics, start = self.begin(action)
+            error = True
+            try:
+                result = callback(*args, **kwargs)
+                error = bottle.response.status_code >= 500
+                return result
+            except bottle.HTTPResponse as e:
+                error = e.status_code >= 500
+                raise
+            finally:
+                self.end(metrics, start, error)
+                self.sized(action, error)
+
+        return wrapper
+
+    @staticmethod
+    def begin(action):
+        """
+        Starts measuring a request to action
+        :return: the metrics of the action in this thread, and the start time
+        :rtype: tuple
+        """
+        shard = _shard()
+        metrics = shard.get(action)
+        if metrics is None:
+            metrics = shard[action] = ActionMetrics()
+        metrics.in_flight += 1
+        _render.set(0.0)
+        QueryLog.forget()
+        return metrics, perf_counter()
+
+    @staticmethod
+    def end(metrics, start, error):
+        duration = perf_counter() - start
+        metrics.in_flight -= 1
+        metrics.requests += 1
+        metrics.errors += error
+        metrics.latency += duration
+        metrics.buckets[bisect_left(LATENCY_BUCKETS, duration)] += 1
+        metrics.render += _render.get()
+        log = QueryLog.last()
+        if log is not None:
+            metrics.db += log.time
+
+    @staticmethod
+    def sized(action, error):
+        """
+        Lets ResponseSizeMiddleware measure the body of the current request for action
+        """
+        actions = bottle.request.environ.get('ron.metrics.sized')
+        if actions is not None and not error:
+            actions.append(action)
+
+    @staticmethod
+    def record_size(action, size):
+        shard = _shard()
+        metrics = shard.get(action)
+        if metrics is None:
+            metrics = shard[action] = ActionMetrics()
+        metrics.size += size
+        metrics.sized += 1
+
+    def collect(self):
+        """
+        Returns the metrics of every thread added up, by action
+        :rtype: dict
+        """
+        totals = {}
+        for shard in list(_shards):
+            for action, metrics in list(shard.items()):
+                totals.setdefault(action, ActionMetrics()).add(metrics)
+        return totals
+
+    def text(self):
+        """
+        Returns the metrics in the Prometheus text exposition format
+        :rtype: str
+        """
+        totals = sorted(self.collect().items())
+        lines = ['# TYPE ron_request_duration_seconds histogram']
+        for action, metrics in totals:
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS + ('+Inf',), metrics.buckets):
+                cumulative += count
+                lines.append('ron_request_duration_seconds_bucket{action="%s",le="%s"} %d' % (action, bound, cumulative))
+            lines.append('ron_request_duration_seconds_sum{action="%s"} %f' % (action, metrics.latency))
+            lines.append('ron_request_duration_seconds_count{action="%s"} %d' % (action, metrics.requests))
+        for name, kind, attribute, fmt in (('ron_requests_in_flight', 'gauge', 'in_flight', '%d'),
+                                           ('ron_request_errors_total', 'counter', 'errors', '%d'),
+                                           ('ron_response_size_bytes_sum', 'counter', 'size', '%d'),
+                                           ('ron_response_size_bytes_count', 'counter', 'sized', '%d'),
+                                           ('ron_template_render_seconds_total', 'counter', 'render', '%f'),
+                                           ('ron_db_seconds_total', 'counter', 'db', '%f')):
+            lines.append('# TYPE %s %s' % (name, kind))
+            for action, metrics in totals:
+                lines.append(('%s{action="%s"} ' + fmt) % (name, action, getattr(metrics, attribute)))
+        for collector in self.collectors:
+            lines.extend(collector())
+        return '\n'.join(lines) + '\n'
+
+    def serve(self):
+        bottle.response.content_type = 'text/plain; version=0.0.4; charset=utf-8'
+        return self.text()
+
+
+class ResponseSizeMiddleware:
+    """
+    WSGI middleware measuring the response bodies of the actions measured by MetricsPlugin as
+    they are sent: after autojson and bottle's casting, so JSON and streamed bodies are
+    counted too. Bodies with a Content-Length are not iterated here.
+    """
+
+    def __init__(self, app, plugin):
+        self.app = app
+        self.plugin = plugin
+
+    def __call__(self, environ, start_response):
+        # actions measured for this request, filled by the plugin when the route runs
+        actions = environ['ron.metrics.sized'] = []
+        length = []
+
+        def sizing_start_response(status, headers, exc_info=None):
+            length[:] = [value for name, value in headers if name.lower() == 'content-length']
+            return start_response(status, headers, exc_info)
+
+        result = self.app(environ, sizing_start_response)
+        if actions and length:
+            self.plugin.record_size(actions[-1], int(length[0]))
+            return result
+        if actions and isinstance(result, (list, tuple)):
+            self.plugin.record_size(actions[-1], sum(map(len, result)))
+            return result
+        if not actions and environ.get('ron.asgi.deferred') is not result:
+            return result
+        # the action runs, or its body is produced, while the result is iterated
+        return self.counted(result, actions, length)
+
+    def counted(self, result, actions, length):
+        size = 0
+        try:
+            for chunk in result:
+                size += len(chunk)
+                yield chunk
+            if actions:
+                self.plugin.record_size(actions[-1], int(length[0]) if length else size)
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
@@ -0,0 +1,91 @@
+from bottle import Router
+
+# used only to tokenize rules and to look up wildcard filters
+_router = Router()
+
+
+def rule_builder(rule):
+    """
+    Returns the URL builder for a rule: a list of literal strings and (name, to_url) pairs
+    :rtype: list
+    """
+    builder = []
+    anons = 0
+    for key, mode, conf in _router._itertokens(rule):
+        if mode:
+            if mode == 'default':
+                mode = _router.default_filter
+            out_filter = _router.filters[mode](conf)[2]
+            if not key:
+                key = 'anon%d' % anons
+                anons += 1
+            builder.append((key, out_filter or str))
+        elif key:
+            builder.append(key)
+    return builder
+
+
+class ReverseEntry:
+
+    def __init__(self, module, rule):
+        self.module = module
+        self.rule = rule
+        self._builder = None
+
+    def builder(self):
+        if self._builder is None:
+            prefix = self.module.url_prefix() if self.module is not None else ''
+            self._builder = rule_builder(prefix + self.rule)
+        return self._builder
+
+
+class ReverseIndex:
+    """
+    Index of the routes of every controller action, by dotted action name
+    (``package.controllers.module.action``) and by route name.
+    """
+
+    def __init__(self):
+        self.entries = {}
+        # callables(name) -> bool, called for unknown names; return True after registering routes
+        self.resolvers = []
+
+    def add(self, name, module, rule, first=False):
+        """
+        Registers a route. The first route registered for a name is used to build its URLs,
+        unless a later one is added with first=True (as URL manager rules are).
+        """
+        if first or name not in self.entries:
+            self.entries[name] = ReverseEntry(module, rule)
+
+    def reset(self):
+        for entry in self.entries.values():
+            entry._builder = None
+
+    def build(self, name, url_args):
+        """
+        Fills the route of name with url_args
+        :return: the path and the arguments not used by the route
+        :rtype: tuple
+        """
+        entry = self.entries.get(name)
+        while entry is None and any(resolver(name) for resolver in self.resolvers):
+            entry = self.entries.get(name)
+        if entry is None:
+            raise KeyError('No route for action {name!r}'.format(name=name))
+        url_args = dict(url_args)
+        parts = []
+        for part in entry.builder():
+            if isinstance(part, str):
+                parts.append(part)
+            else:
+                key, to_url = part
+                try:
+                    parts.append(to_url(url_args.pop(key)))
+                except KeyError:
+                    raise KeyError('Missing URL argument {key!r} for action {name!r}'.format(key=key, name=name))
+        return ''.join(parts), url_args
+
+
+# routes registered by controllers and the URL manager
+reverse_index = ReverseIndex()
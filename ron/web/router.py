@@ -0,0 +1,262 @@
+import re
+
+from bottle import Bottle, HTTPError, Router, RouteSyntaxError, path_shift
+
+
+def literal_segments(rule):
+    """
+    Returns the leading path segments of a rule that contain no wildcard
+    :rtype: list
+    """
+    segments = []
+    for segment in rule.split('/')[1:-1] if rule.endswith('/') else rule.split('/')[1:]:
+        if '<' in segment or ':' in segment or '\\' in segment:
+            break
+        segments.append(segment)
+    return segments
+
+
+class FlatRouter(Router):
+    """
+    Router holding the routes of a whole application tree, mounted modules included.
+
+    Static paths are answered with a dict lookup. Dynamic rules are stored in a trie keyed by
+    their leading literal path segments, so only rules sharing a prefix with the request path
+    are tried, in registration order. Routes coming from a mounted module are registered with
+    the mount depth, and the request path is shifted on match as the mount would have done.
+    """
+
+    def __init__(self, strict=False):
+        Router.__init__(self, strict)
+        # {method: {path: (target, getargs, shift)}}
+        self.static = {}
+        # {method: [children, rules]}, where children is {segment: node} and rules is
+        # a list of (index, match, target, getargs, shift)
+        self.trie = {}
+        self._count = 0
+
+    def add(self, rule, method, target, name=None, shift=0):
+        keys, pattern, filters, builder, is_static = self._parse(rule)
+
+        self.builder[rule] = builder
+        if name:
+            self.builder[name] = builder
+        self.rules.append((rule, method, target))
+
+        if is_static and not self.strict_order:
+            self.static.setdefault(method, {})[self.build(rule)] = (target, None, shift)
+            return
+
+        try:
+            re_match = re.compile('^(%s)$' % pattern).match
+        except re.error as e:
+            raise RouteSyntaxError("Could not add Route: %s (%s)" % (rule, e))
+
+        if filters:
+            def getargs(path):
+                url_args = re_match(path).groupdict()
+                for key, wildcard_filter in filters:
+                    try:
+                        url_args[key] = wildcard_filter(url_args[key])
+                    except ValueError:
+                        raise HTTPError(400, 'Path has wrong format.')
+                return url_args
+        elif keys:
+            def getargs(path):
+                return re_match(path).groupdict()
+        else:
+            getargs = None
+
+        node = self.trie.setdefault(method, [{}, []])
+        for segment in literal_segments(rule):
+            node = node[0].setdefault(segment, [{}, []])
+        self._count += 1
+        node[1].append((self._count, re_match, target, getargs, shift))
+
+    def update(self, removed=(), added=()):
+        """
+        Removes and adds application routes, see update_router. A removed mount takes the
+        routes of the mounted modules with it
+        """
+        removed = set(removed)
+        for route in list(removed):
+            mountpoint = route.config.get('mountpoint')
+            if mountpoint and isinstance(mountpoint['target'], Bottle):
+                removed.update(sub_route for _, _, sub_route, _ in flatten_routes(mountpoint['target']))
+        if removed:
+            self.rules = [rule for rule in self.rules if rule[2] not in removed]
+            for method, table in list(self.static.items()):
+                self.static[method] = {path: entry for path, entry in table.items() if entry[0] not in removed}
+            nodes = list(self.trie.values())
+            while nodes:
+                node = nodes.pop()
+                node[1] = [rule for rule in node[1] if rule[2] not in removed]
+                nodes.extend(node[0].values())
+        for route in added:
+            self.add(route.rule, route.method, route, name=route.name)
+
+    def _parse(self, rule):
+        anons, keys, pattern, filters, builder, is_static = 0, [], '', [], [], True
+        for key, mode, conf in self._itertokens(rule):
+            if mode:
+                is_static = False
+                if mode == 'default':
+                    mode = self.default_filter
+                mask, in_filter, out_filter = self.filters[mode](conf)
+                if not key:
+                    pattern += '(?:%s)' % mask
+                    key = 'anon%d' % anons
+                    anons += 1
+                else:
+                    pattern += '(?P<%s>%s)' % (key, mask)
+                    keys.append(key)
+                if in_filter:
+                    filters.append((key, in_filter))
+                builder.append((key, out_filter or str))
+            elif key:
+                pattern += re.escape(key)
+                builder.append((None, key))
+        return keys, pattern, filters, builder, is_static
+
+    def _candidates(self, method, path):
+        node = self.trie.get(method)
+        if node is None:
+            return []
+        candidates = list(node[1])
+        for segment in path.split('/')[1:]:
+            node = node[0].get(segment)
+            if node is None:
+                break
+            candidates.extend(node[1])
+        if len(candidates) > 1:
+            candidates.sort(key=lambda candidate: candidate[0])
+        return candidates
+
+    def _lookup(self, method, path):
+        entry = self.static.get(method, {}).get(path)
+        if entry is not None:
+            return entry
+        for index, re_match, target, getargs, shift in self._candidates(method, path):
+            if re_match(path):
+                return target, getargs, shift
+        return None
+
+    def match(self, environ):
+        verb = environ['REQUEST_METHOD'].upper()
+        path = environ['PATH_INFO'] or '/'
+        if verb == 'HEAD':
+            methods = ['PROXY', verb, 'GET', 'ANY']
+        else:
+            methods = ['PROXY', verb, 'ANY']
+
+        for method in methods:
+            entry = self._lookup(method, path)
+            if entry is not None:
+                target, getargs, shift = entry
+                url_args = getargs(path) if getargs else {}
+                if shift:
+                    environ['SCRIPT_NAME'], environ['PATH_INFO'] = path_shift(
+                        environ.get('SCRIPT_NAME', '/'), environ['PATH_INFO'], shift)
+                return target, url_args
+
+        allowed = set(m for m in set(self.static) | set(self.trie)
+                      if m not in methods and self._lookup(m, path) is not None)
+        if allowed:
+            raise HTTPError(405, "Method not allowed.", Allow=",".join(sorted(allowed)))
+        raise HTTPError(404, "Not found: " + repr(path))
+
+
+def flatten_routes(app, prefix='', shift=0, seen=None):
+    """
+    Yields (rule, method, route, shift) for every route of app and of the Bottle applications
+    mounted in it, with rules prefixed by their mount points
+    """
+    seen = set() if seen is None else seen
+    for route in app.routes:
+        mountpoint = route.config.get('mountpoint')
+        if not mountpoint or not isinstance(mountpoint['target'], Bottle):
+            yield prefix + route.rule, route.method, route, shift
+            continue
+        target = mountpoint['target']
+        if id(target) in seen:
+            continue
+        seen.add(id(target))
+        segments = [segment for segment in mountpoint['prefix'].split('/') if segment]
+        mount_prefix = prefix + '/' + '/'.join(segments)
+        for rule, method, sub_route, sub_shift in flatten_routes(target, mount_prefix, shift + len(segments), seen):
+            yield rule, method, sub_route, sub_shift
+            if rule == mount_prefix + '/' and not mountpoint['prefix'].endswith('/'):
+                yield mount_prefix, method, sub_route, sub_shift
+
+
+def build_flat_router(app):
+    """
+    Returns a FlatRouter with every route of app and its mounted modules
+    :rtype: FlatRouter
+    """
+    router = FlatRouter()
+    for rule, method, route, shift in flatten_routes(app):
+        router.add(rule, method, route, name=route.name, shift=shift)
+    return router
+
+
+def update_router(router, removed=(), added=()):
+    """
+    Removes and adds routes in a live router, e.g. for UrlManagerComponent. Only the tables of
+    the methods concerned change: each is built aside and swapped in with a single assignment,
+    so requests dispatched meanwhile see a method's routes either before or after the update.
+    Combined regexes holding no changed route are reused
+    :param removed: Route objects to remove
+    :param added: Route objects to add
+    """
+    if isinstance(router, FlatRouter):
+        return router.update(removed, added)
+    removed = set(removed)
+    # parses the added routes as router.add would, without touching the live router
+    scratch = Router(router.strict_order)
+    scratch.filters = router.filters
+    for route in added:
+        scratch.add(route.rule, route.method, route, name=route.name)
+    router.builder.update(scratch.builder)
+
+    for method in set(route.method for route in removed) | set(scratch.static) | set(scratch.dyna_routes):
+        removing = any(route.method == method for route in removed)
+        if removing or method in scratch.static:
+            static = {path: entry for path, entry in router.static.get(method, {}).items() if entry[0] not in removed}
+            static.update(scratch.static.get(method, {}))
+            router.static[method] = static
+        if removing or method in scratch.dyna_routes:
+            old = router.dyna_routes.get(method, [])
+            rules = [rule for rule in old if rule[2] not in removed]
+            groups = {flatpat: index for index, (_, flatpat, _, _) in enumerate(rules)}
+            for rule in scratch.dyna_routes.get(method, []):
+                if rule[1] in groups:
+                    # replaces the route with the same pattern, as Router.add does
+                    rules[groups[rule[1]]] = rule
+                else:
+                    groups[rule[1]] = len(rules)
+                    rules.append(rule)
+            regexes = _compile_rules(router, rules, old, router.dyna_regexes.get(method, []))
+            router.dyna_routes[method] = rules
+            for key in [key for key in router._groups if key[1] == method]:
+                del router._groups[key]
+            router._groups.update(((flatpat, method), index) for flatpat, index in groups.items())
+            router.dyna_regexes[method] = regexes
+
+
+def _compile_rules(router, rules, old_rules, old_regexes):
+    """
+    Returns the combined regexes of the dynamic rules of a method, as Router._compile builds
+    them, reusing the old ones that cover only unchanged rules
+    :rtype: list
+    """
+    maxgroups = router._MAX_GROUPS_PER_PATTERN
+    changed = next((index for index, (rule, old_rule) in enumerate(zip(rules, old_rules)) if rule is not old_rule),
+                   min(len(rules), len(old_rules)))
+    kept = changed // maxgroups
+    regexes = old_regexes[:kept]
+    for start in range(kept * maxgroups, len(rules), maxgroups):
+        some = rules[start:start + maxgroups]
+        combined = re.compile('|'.join('(^%s$)' % flatpat for _, flatpat, _, _ in some)).match
+        regexes.append((combined, [(target, getargs) for _, _, target, getargs in some]))
+    return regexes
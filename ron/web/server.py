@@ -0,0 +1,255 @@
+import gc
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer
+
+
+class QuietHandler(WSGIRequestHandler):
+
+    def log_message(self, format, *args):
+        pass
+
+
+class PooledWSGIServer(WSGIServer):
+    """
+    WSGIServer handling connections on a pool of threads. While every thread is busy, the
+    accept loop waits and new connections stay in the listen backlog
+    """
+
+    def __init__(self, *args, threads=8, **kwargs):
+        WSGIServer.__init__(self, *args, **kwargs)
+        self.threads = threads
+        self._slots = threading.BoundedSemaphore(threads)
+        self._executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='ron-worker')
+
+    def process_request(self, request, client_address):
+        self._slots.acquire()
+        self._executor.submit(self._process_request, request, client_address)
+
+    def _process_request(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            self._slots.release()
+
+    def server_close(self):
+        WSGIServer.server_close(self)
+        # waits for the requests in progress
+        self._executor.shutdown(wait=True)
+
+
+class PreforkServer:
+    """
+    Serves an initialized application from several forked worker processes.
+
+    Everything loaded before forking (modules, controllers, compiled templates) is shared by the
+    workers copy-on-write. Workers accept from one shared listening socket, or bind their own
+    with SO_REUSEPORT. The master restarts workers that die, stops them gracefully on SIGTERM or
+    SIGINT, and replaces them one at a time on SIGHUP. Workers fork from the master, so a SIGHUP
+    renews the processes but does not load changed code.
+
+    Workers serve with wsgiref, which speaks HTTP/1.0 without keep-alive: put a reverse proxy
+    such as nginx in front of them to serve clients.
+    """
+
+    # threads of each worker when threads is True
+    default_threads = 8
+
+    def __init__(self, app, host='127.0.0.1', port=8080, workers=None, reuse_port=False, threads=0, backlog=2048,
+                 timeout=30, quiet=False):
+        """
+        :param app: initialized Application
+        :param workers: worker processes, the CPU count by default
+        :param reuse_port: every worker binds its own socket with SO_REUSEPORT
+        :param threads: threads serving the requests of every worker, True for default_threads.
+            0 serves one request at a time
+        :param timeout: seconds a stopping worker has to finish its requests before it is killed
+        """
+        self.app = app
+        self.host = host
+        self.port = port
+        self.workers = workers or os.cpu_count() or 1
+        self.reuse_port = reuse_port
+        self.threads = self.default_threads if threads is True else threads
+        self.backlog = backlog
+        self.timeout = timeout
+        self.quiet = quiet
+        self.socket = None
+        # {pid: start time}
+        self.processes = {}
+        self.running = False
+        self.reload_requested = False
+
+    def listen(self):
+        family = socket.AF_INET6 if ':' in self.host else socket.AF_INET
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if self.reuse_port:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        sock.bind((self.host, self.port))
+        sock.listen(self.backlog)
+        return sock
+
+    def prepare(self):
+        """
+        Loads everything workers should share and closes what they must not share
+        """
+        from ron.base.lazymodule import LazyModule
+        LazyModule.load_all()
+        if getattr(self.app, 'db', None):
+            self.app.db.close()
+        gc.collect()
+        if hasattr(gc, 'freeze'):
+            # keeps the garbage collector from touching, and so copying, the shared objects
+            gc.freeze()
+
+    def run(self):
+        self.prepare()
+        if self.reuse_port:
+            # fails early if the port is taken; workers bind their own sockets
+            self.listen().close()
+        else:
+            self.socket = self.listen()
+        self.running = True
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+        signal.signal(signal.SIGHUP, self._reload)
+        print('Serving on http://{host}:{port}/ with {workers} workers'.format(
+            host=self.host, port=self.port, workers=self.workers), file=sys.stderr)
+        for _ in range(self.workers):
+            self.spawn()
+        while self.running:
+            self.reap()
+            if self.reload_requested:
+                self.reload_requested = False
+                self.rolling_restart()
+            time.sleep(0.2)
+        self.stop_workers(list(self.processes))
+        if self.socket:
+            self.socket.close()
+
+    def _stop(self, signum, frame):
+        self.running = False
+
+    def _reload(self, signum, frame):
+        self.reload_requested = True
+
+    def spawn(self):
+        pid = os.fork()
+        if pid:
+            self.processes[pid] = time.monotonic()
+            return pid
+        code = 1
+        try:
+            code = self.serve_worker()
+        except BaseException:
+            traceback.print_exc()
+        finally:
+            os._exit(code)
+
+    def reap(self):
+        """
+        Collects the workers that exited and starts replacements while running
+        """
+        while self.processes:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if not pid:
+                return
+            started = self.processes.pop(pid, None)
+            if started is not None and self.running:
+                if time.monotonic() - started < 1:
+                    # do not spin on a worker that dies while starting
+                    time.sleep(1)
+                self.spawn()
+
+    def stop_workers(self, pids):
+        for pid in pids:
+            self._signal(pid, signal.SIGTERM)
+        deadline = time.monotonic() + self.timeout
+        remaining = set(pids)
+        while remaining and time.monotonic() < deadline:
+            for pid in list(remaining):
+                try:
+                    if os.waitpid(pid, os.WNOHANG)[0]:
+                        remaining.discard(pid)
+                except ChildProcessError:
+                    remaining.discard(pid)
+            time.sleep(0.05)
+        for pid in remaining:
+            self._signal(pid, signal.SIGKILL)
+            try:
+                os.waitpid(pid, 0)
+            except ChildProcessError:
+                pass
+        for pid in pids:
+            self.processes.pop(pid, None)
+
+    def rolling_restart(self):
+        """
+        Replaces the workers one at a time: starts a new one, then stops an old one
+        """
+        for pid in list(self.processes):
+            if not self.running:
+                return
+            self.spawn()
+            self.stop_workers([pid])
+
+    @staticmethod
+    def _signal(pid, signum):
+        try:
+            os.kill(pid, signum)
+        except ProcessLookupError:
+            pass
+
+    def serve_worker(self):
+        """
+        Serves requests in a worker process until it receives SIGTERM
+        :return: exit code
+        :rtype: int
+        """
+        signal.signal(signal.SIGHUP, signal.SIG_IGN)
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        sock = self.socket or self.listen()
+        handler = QuietHandler if self.quiet else WSGIRequestHandler
+        if self.threads:
+            server = PooledWSGIServer(sock.getsockname()[:2], handler, bind_and_activate=False, threads=self.threads)
+        else:
+            server = WSGIServer(sock.getsockname()[:2], handler, bind_and_activate=False)
+        server.socket.close()
+        server.socket = sock
+        server.server_name = socket.getfqdn(sock.getsockname()[0])
+        server.server_port = sock.getsockname()[1]
+        server.setup_environ()
+        # middlewares are applied once per worker
+        server.set_app(self.app.get_with_middleware())
+
+        def stop(signum, frame):
+            threading.Thread(target=server.shutdown).start()
+
+        signal.signal(signal.SIGTERM, stop)
+        server.serve_forever(poll_interval=0.5)
+        server.server_close()
+        return 0
+
+
+def serve(app, host='127.0.0.1', port=8080, workers=None, **options):
+    """
+    Serves an initialized application with pre-forked workers, see PreforkServer.
+    Without os.fork (e.g. on Windows) the application is served by bottle.run in one process.
+    """
+    if not hasattr(os, 'fork'):
+        import bottle
+        return bottle.run(app.get_with_middleware(), host=host, port=port, quiet=options.get('quiet', False))
+    PreforkServer(app, host=host, port=port, workers=workers, **options).run()
@@ -1,24 +1,476 @@
+import atexit
+import base64
+import copy
+import hashlib
+import hmac
+import inspect
+import json
+import logging
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+import bottle
 from beaker.middleware import SessionMiddleware
+from beaker.session import SessionObject
 
-class SessionComponent:
+logger = logging.getLogger(__name__)
+
+# marks a queued removal in a WriteBehind buffer
+_REMOVED = object()
+
+
+def delete_cookie(response, key, cookie_options):
+    response.delete_cookie(key, **{option: cookie_options[option] for option in ('path', 'domain')
+                                   if cookie_options.get(option)})
+
+
+class Session(dict):
     """
-    Session component using the beaker session middleware
+    Session data of one request. Changes are found by comparing the data with a copy taken when
+    it was loaded, so values may also be changed in place
     """
 
-    def __init__(self, *args, **kwargs):
-        from ron import Application
-        app = Application()
+    def __init__(self, data=None, id=None):
+        dict.__init__(self, data or {})
+        self.id = id
+        self.is_new = id is None
+        self.invalidated = False
+        self._dirty = False
+        self._loaded = copy.deepcopy(dict(self))
+
+    def save(self):
+        """
+        Writes the session at the end of the request even if its data did not change
+        """
+        self._dirty = True
+
+    def delete(self):
+        """
+        Clears the session and drops it from the client and the store
+        """
+        self.clear()
+        self.invalidated = True
+
+    def changed(self):
+        return self._dirty or self.invalidated or dict(self) != self._loaded
+
+
+class BeakerSession(SessionObject):
+    """
+    Beaker session written back only when its data changed
+    """
+
+    def snapshot(self):
+        self.__dict__['_loaded'] = copy.deepcopy(dict(self._session()))
+        self.__dict__['_dropped'] = []
+        self.__dict__['_deleted'] = False
+        return self
+
+    def changed(self):
+        return self.dirty() or dict(self._session()) != self.__dict__['_loaded']
+
+    def delete(self):
+        """
+        Clears the session, drops it from the store and expires its cookie
+        """
+        self.__dict__['_dropped'].append(self._session().id)
+        self.__dict__['_deleted'] = True
+        SessionObject.delete(self)
+
+    def invalidate(self):
+        """
+        Clears the session and gives it a new id, dropping the old one from the store
+        """
+        self.__dict__['_dropped'].append(self._session().id)
+        self.__dict__['_dirty'] = True
+        self._session().invalidate()
+
+
+class BeakerSessions:
+    """
+    Sessions stored by beaker, e.g. in memory, files, dbm or a database. The options are beaker
+    session options (type, data_dir, url, timeout, key, ...). Sessions are saved when they
+    changed. With a timeout and beaker's save_accessed_time (the default), a session that is
+    only read is saved again once touch_after of the timeout went by since its last save, so
+    timeout still counts from the last access, give or take that share.
+    """
+
+    def __init__(self, touch_after=0.1, **options):
+        """
+        :param touch_after: share of the timeout after which reading a session saves its
+            access time
+        """
+        self.touch_after = touch_after
+        self.options = SessionMiddleware(None, {'session.{name}'.format(name=option): value
+                                                for option, value in options.items()}).options
+
+    def load(self, request):
+        session = BeakerSession(request.environ, **self.options).snapshot()
+        request.environ['beaker.session'] = session
+        return session
+
+    def persist(self, session, response):
+        beaker_session = session._session()
+        if not session.changed():
+            if not self.needs_touch(beaker_session):
+                return
+            beaker_session.save(accessed_only=True)
+        else:
+            for id in session.__dict__['_dropped']:
+                self.remove(beaker_session, id)
+            if session.__dict__['_deleted']:
+                # beaker's delete() already set the expired cookie, saving would send it again live
+                if beaker_session.use_cookies:
+                    beaker_session._delete_cookie()
+            else:
+                beaker_session.save()
+        headers = session.__dict__['_headers']
+        if headers.get('set_cookie') and headers.get('cookie_out'):
+            response.add_header('Set-Cookie', headers['cookie_out'])
+
+    def needs_touch(self, beaker_session):
+        """
+        Returns whether an unchanged session must be saved to keep its timeout counting from
+        the last access
+        :rtype: bool
+        """
+        if not beaker_session.timeout or not beaker_session.save_atime or beaker_session.is_new:
+            return False
+        last_accessed = getattr(beaker_session, 'last_accessed', None)
+        return last_accessed is not None and time.time() - last_accessed >= beaker_session.timeout * self.touch_after
+
+    @staticmethod
+    def remove(beaker_session, id):
+        if not hasattr(beaker_session, 'namespace_class'):
+            # cookie sessions store nothing on the server
+            return
+        namespace = beaker_session.namespace_class(id, data_dir=beaker_session.data_dir, digest_filenames=False,
+                                                   **beaker_session.namespace_args)
+        namespace.acquire_write_lock(replace=True)
+        try:
+            namespace.remove()
+        finally:
+            namespace.release_write_lock()
+
+
+class CookieSessions:
+    """
+    Stateless sessions: the data travels in a cookie as JSON signed with HMAC-SHA256, so nothing
+    is stored on the server. Clients can read, but not change, the data. Browsers limit a cookie
+    to about 4 KB.
+    """
+
+    def __init__(self, secret, key='ron.session', timeout=None, **cookie_options):
+        """
+        :param secret: signing key
+        :param timeout: seconds a session is valid after its last change
+        :param cookie_options: bottle set_cookie options (path, domain, secure, httponly, ...)
+        """
+        if not secret:
+            raise ValueError('Cookie sessions require a secret')
+        self.secret = secret.encode() if isinstance(secret, str) else secret
+        self.key = key
+        self.timeout = timeout
+        self.cookie_options = dict({'path': '/', 'httponly': True, 'samesite': 'Lax'}, **cookie_options)
+
+    def sign(self, payload):
+        return base64.urlsafe_b64encode(hmac.new(self.secret, payload, hashlib.sha256).digest()).rstrip(b'=')
+
+    def dumps(self, data):
+        payload = base64.urlsafe_b64encode(json.dumps([int(time.time()), data], separators=(',', ':')).encode())
+        payload = payload.rstrip(b'=')
+        return (payload + b'.' + self.sign(payload)).decode()
+
+    def loads(self, value):
+        """
+        Returns the data of a cookie value, or None if it is invalid or expired
+        :rtype: dict
+        """
+        payload, _, signature = value.encode().rpartition(b'.')
+        if not payload or not hmac.compare_digest(signature, self.sign(payload)):
+            return None
+        try:
+            created, data = json.loads(base64.urlsafe_b64decode(payload + b'=' * (-len(payload) % 4)))
+        except ValueError:
+            return None
+        if self.timeout and created + self.timeout < time.time():
+            return None
+        return data
+
+    def load(self, request):
+        value = request.get_cookie(self.key)
+        data = self.loads(value) if value else None
+        session = Session(data)
+        session.is_new = data is None
+        return session
+
+    def persist(self, session, response):
+        if not session.changed():
+            return
+        if session.invalidated:
+            delete_cookie(response, self.key, self.cookie_options)
+            return
+        response.set_cookie(self.key, self.dumps(dict(session)), **self.cookie_options)
+
+
+class WriteBehind:
+    """
+    Queues writes to a cache and applies them in batches from a background thread, every
+    flush_interval seconds or as soon as batch_size keys are pending. Reads in this process
+    see the queued values; other processes see them once they are flushed.
+    """
+
+    def __init__(self, cache, batch_size=100, flush_interval=1.0):
+        self.cache = cache
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        # {key: value or _REMOVED}, queued and being flushed
+        self.pending = OrderedDict()
+        self.flushing = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread_pid = None
+        atexit.register(self.flush)
+
+    def get(self, key, default=None):
+        with self._lock:
+            value = self.pending.get(key, self.flushing.get(key, default))
+        return default if value is _REMOVED else value
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self.pending or key in self.flushing
+
+    def put(self, key, value):
+        with self._lock:
+            self.pending[key] = value
+            full = len(self.pending) >= self.batch_size
+        self._start()
+        if full:
+            self._wake.set()
+
+    def remove(self, key):
+        self.put(key, _REMOVED)
 
-        options = {}
+    def flush(self):
+        """
+        Writes every queued value to the cache. When a write fails, the values not written yet
+        are queued again, unless a newer value was queued meanwhile, and the error is raised
+        """
+        with self._lock:
+            batch, self.pending = self.pending, OrderedDict()
+            self.flushing = batch
+        items = list(batch.items())
+        index = 0
+        try:
+            for index, (key, value) in enumerate(items):
+                if value is _REMOVED:
+                    self.cache.remove_value(key)
+                else:
+                    self.cache.put(key, value)
+        except Exception:
+            with self._lock:
+                for key, value in items[index:]:
+                    self.pending.setdefault(key, value)
+            raise
+        finally:
+            with self._lock:
+                self.flushing = {}
 
-        for option, value in kwargs.items():
-            options['session.{name}'.format(name=option)] = value
+    def _start(self):
+        # threads do not survive a fork, every worker process starts its own
+        if self._thread_pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread_pid == os.getpid():
+                return
+            self._thread_pid = os.getpid()
+        threading.Thread(target=self._run, name='ron-session-writer', daemon=True).start()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                # the batch is queued again and retried on the next round
+                logger.exception('Session write-behind flush failed, %d sessions pending', len(self.pending))
+
+
+class StoreSessions:
+    """
+    Sessions stored in a namespace of the application cache component, under a random id sent
+    in a cookie. With flush_interval, writes are batched by a WriteBehind buffer; None writes
+    every change when the request ends.
+    """
 
-        app.middlewares.append({
-            'class': SessionMiddleware,
-            'options': options
-        })
+    def __init__(self, key='ron.session.id', timeout=None, namespace='ron.sessions', batch_size=100,
+                 flush_interval=1.0, **cookie_options):
+        """
+        :param timeout: seconds a session is kept after its last change
+        :param cookie_options: bottle set_cookie options (path, domain, secure, httponly, ...)
+        """
+        self.key = key
+        self.timeout = timeout
+        self.namespace = namespace
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.cookie_options = dict({'path': '/', 'httponly': True, 'samesite': 'Lax'}, **cookie_options)
+        self._cache = None
+        self._writer = None
+
+    @property
+    def cache(self):
+        if self._cache is None:
+            from ron import Application
+            cache_component = Application().cache_component
+            if cache_component is None:
+                raise RuntimeError('Store sessions require the application cache component')
+            options = {'expire': self.timeout} if self.timeout else {}
+            self._cache = cache_component.get_cache(self.namespace, **options)
+        return self._cache
+
+    @property
+    def writer(self):
+        if self._writer is None and self.flush_interval is not None:
+            self._writer = WriteBehind(self.cache, self.batch_size, self.flush_interval)
+        return self._writer
+
+    def read(self, id):
+        if self.writer is not None and id in self.writer:
+            return self.writer.get(id)
+        try:
+            return self.cache.get(id)
+        except KeyError:
+            return None
+
+    def write(self, id, data):
+        if self.writer is not None:
+            if data is None:
+                self.writer.remove(id)
+            else:
+                self.writer.put(id, data)
+        elif data is None:
+            self.cache.remove_value(id)
+        else:
+            self.cache.put(id, data)
+
+    def load(self, request):
+        id = request.get_cookie(self.key)
+        data = self.read(id) if id else None
+        return Session(data, id=id if data is not None else None)
+
+    def persist(self, session, response):
+        if not session.changed():
+            return
+        if session.invalidated:
+            if session.id:
+                self.write(session.id, None)
+            delete_cookie(response, self.key, self.cookie_options)
+            return
+        if session.id is None:
+            session.id = secrets.token_urlsafe(32)
+            response.set_cookie(self.key, session.id, **self.cookie_options)
+        self.write(session.id, dict(session))
+
+
+class SessionPlugin:
+    """
+    Bottle plugin writing the session of a request back when its action returns
+    """
+
+    name = 'session'
+    api = 2
+
+    def __init__(self, component):
+        self.component = component
+
+    def apply(self, callback, route):
+        if hasattr(route.app, 'url_prefix') and (route.app.url_prefix() + route.rule).startswith(self.component.skip_paths):
+            return callback
+        persist = self.component.persist
+
+        if inspect.iscoroutinefunction(callback):
+            async def async_wrapper(*args, **kwargs):
+                try:
+                    result = await callback(*args, **kwargs)
+                except bottle.HTTPResponse as e:
+                    persist(e)
+                    raise
+                persist(result if isinstance(result, bottle.HTTPResponse) else bottle.response)
+                return result
+
+            return async_wrapper
+
+        def wrapper(*args, **kwargs):
+            try:
+                result = callback(*args, **kwargs)
+            except bottle.HTTPResponse as e:
+                persist(e)
+                raise
+            persist(result if isinstance(result, bottle.HTTPResponse) else bottle.response)
+            return result
+
+        return wrapper
+
+
+class SessionComponent:
+    """
+    Request sessions. A session is loaded on the first call in a request, and written back when
+    its action returns, only if its data changed. Requests under skip_paths get no session.
+
+    Backends: 'beaker' (the default, the other options are beaker session options), 'cookie'
+    (signed cookie, see CookieSessions) and 'store' (cache component, see StoreSessions).
+
+    With middleware=True, beaker's SessionMiddleware is added to the application middlewares
+    instead, as in previous versions: the session is in ``environ['beaker.session']`` for every
+    middleware and hook, and beaker decides when it is saved.
+    """
+
+    backends = {
+        'beaker': BeakerSessions,
+        'cookie': CookieSessions,
+        'store': StoreSessions,
+    }
+
+    def __init__(self, *args, module=None, backend='beaker', skip_paths=('/static/',), middleware=False, **kwargs):
+        from ron import Application
+        # the application itself while it is being created, when loaded without on_initialize
+        app = module if isinstance(module, Application) else Application()
+
+        self.skip_paths = tuple(skip_paths)
+        self.middleware = middleware
+        if middleware:
+            app.middlewares.append({
+                'class': SessionMiddleware,
+                'options': {'session.{name}'.format(name=option): value for option, value in kwargs.items()},
+            })
+            self.backend = None
+            return
+        self.backend = self.backends[backend](**kwargs) if isinstance(backend, str) else backend
+        app.module_plugins.append(SessionPlugin(self))
 
     def __call__(self, *args, **kwargs):
         from ron import request
-        return request.environ.get('beaker.session')
\ No newline at end of file
+        if self.middleware:
+            return request.environ.get('beaker.session')
+        session = request.environ.get('ron.session')
+        if session is None:
+            if request.fullpath.startswith(self.skip_paths):
+                return None
+            session = request.environ['ron.session'] = self.backend.load(request)
+        return session
+
+    def persist(self, response):
+        """
+        Writes the session of the current request back, if it was loaded and changed
+        :param response: bottle response or HTTPResponse receiving the session cookie
+        """
+        from ron import request
+        session = request.environ.get('ron.session')
+        if session is not None:
+            self.backend.persist(session, response)
@@ -0,0 +1,266 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import threading
+import time
+
+import bottle
+from bottle import HTTPError, HTTPResponse, parse_date, request, static_file
+
+from ron.base.ronobject import RonObject
+from ron.web.conditional import etag_matches
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+class StaticFileInfo:
+    """
+    Metadata computed once per static file: validators, headers and precompressed variants
+    """
+
+    def __init__(self, path, stats, etag, mimetype, variants):
+        self.path = path
+        self.mtime = stats.st_mtime
+        self.size = stats.st_size
+        self.etag = etag
+        self.mimetype = mimetype
+        self.last_modified = time.strftime("%a, %d %b %Y %H:%M:%S GMT", time.gmtime(stats.st_mtime))
+        # {content encoding: (path, size, etag)}
+        self.variants = variants
+
+
+class StaticFiles(RonObject):
+    """
+    Serves the application static folder.
+
+    Versioned URLs (``/static/_1.2.3/...``) are sent with long lived ``immutable`` caching
+    headers. Every response carries a strong ETag, computed once per file. Precompressed
+    ``.br``/``.gz`` siblings built with ``compress`` are sent to clients accepting them, and
+    small files can be kept in memory. Files are otherwise returned as file objects so the
+    WSGI server can use ``wsgi.file_wrapper`` (sendfile).
+    """
+
+    # static folder
+    root = 'static'
+
+    # Cache-Control max-age for unversioned URLs. None sends no Cache-Control header
+    max_age = None
+
+    # Cache-Control max-age for versioned URLs
+    immutable_max_age = 31536000
+
+    # precompressed variants, in order of preference
+    encodings = ('br', 'gzip')
+
+    # files up to this size are kept in memory. 0 disables the memory cache
+    memory_max_file_size = 0
+
+    # memory cache limit in bytes
+    memory_max_bytes = 16 * 1024 * 1024
+
+    # check file modification times on every request. None follows bottle.DEBUG
+    auto_reload = None
+
+    # mime types worth compressing, besides text/*
+    compressible_types = ('application/javascript', 'application/json', 'application/xml',
+                          'image/svg+xml', 'application/wasm')
+
+    extensions = {'gzip': '.gz', 'br': '.br'}
+
+    def __init__(self, *args, **kwargs):
+        RonObject.__init__(self, *args, **kwargs)
+        from ron.caching.cache import LRUCache
+        self._info = {}
+        self._lock = threading.Lock()
+        self._memory = LRUCache(max_entries=4096, max_bytes=self.memory_max_bytes)
+
+    def _auto_reload(self):
+        return bottle.DEBUG if self.auto_reload is None else self.auto_reload
+
+    @staticmethod
+    def file_etag(path):
+        digest = hashlib.sha1()
+        with open(path, 'rb') as fp:
+            for block in iter(lambda: fp.read(65536), b''):
+                digest.update(block)
+        return '"{digest}"'.format(digest=digest.hexdigest())
+
+    def file_info(self, path):
+        """
+        Returns the cached StaticFileInfo for path, or None if it is not a file
+        :rtype: StaticFileInfo
+        """
+        info = self._info.get(path)
+        if info is not None and not self._auto_reload():
+            return info
+        try:
+            stats = os.stat(path)
+        except OSError:
+            return None
+        if info is not None and info.mtime == stats.st_mtime and info.size == stats.st_size:
+            return info
+        if not os.path.isfile(path):
+            return None
+
+        mimetype, encoding = mimetypes.guess_type(path)
+        if encoding:
+            mimetype = 'application/octet-stream'
+        variants = {}
+        etag = self.file_etag(path)
+        for content_encoding in self.encodings:
+            variant_path = path + self.extensions[content_encoding]
+            try:
+                variant_stats = os.stat(variant_path)
+            except OSError:
+                continue
+            if variant_stats.st_mtime >= stats.st_mtime:
+                variant_etag = '{etag}-{encoding}"'.format(etag=etag[:-1], encoding=content_encoding)
+                variants[content_encoding] = (variant_path, variant_stats.st_size, variant_etag)
+        info = StaticFileInfo(path, stats, etag, mimetype, variants)
+        with self._lock:
+            self._info[path] = info
+        return info
+
+    def serve(self, filename, versioned=False, charset='UTF-8'):
+        """
+        Returns the response for a static file
+        :param filename: file path, relative to the static folder
+        :type filename: str
+        :param versioned: the file was requested through a versioned URL
+        :type versioned: bool
+        :rtype: HTTPResponse
+        """
+        root = os.path.abspath(self.root) + os.sep
+        path = os.path.abspath(os.path.join(root, filename.strip('/\\')))
+        if not path.startswith(root):
+            return HTTPError(403, "Access denied.")
+        info = self.file_info(path)
+        if info is None:
+            return HTTPError(404, "File does not exist.")
+
+        if 'HTTP_RANGE' in request.environ:
+            response = static_file(filename, root=root, charset=charset)
+            self._set_cache_headers(response, versioned)
+            return response
+
+        headers = {'Last-Modified': info.last_modified, 'Accept-Ranges': 'bytes'}
+        if info.mimetype:
+            mimetype = info.mimetype
+            if mimetype[:5] == 'text/' and charset and 'charset' not in mimetype:
+                mimetype += '; charset=%s' % charset
+            headers['Content-Type'] = mimetype
+        if info.variants:
+            headers['Vary'] = 'Accept-Encoding'
+
+        body_path, size, etag = path, info.size, info.etag
+        accepted = self.accepted_encodings() if info.variants else ()
+        for content_encoding, variant in info.variants.items():
+            if content_encoding in accepted:
+                body_path, size, etag = variant
+                headers['Content-Encoding'] = content_encoding
+                break
+        headers['ETag'] = etag
+        headers['Content-Length'] = size
+
+        response = HTTPResponse(status=200, **headers)
+        self._set_cache_headers(response, versioned)
+        if self._not_modified(info, etag):
+            response.status = 304
+            del response.headers['Content-Length']
+            return response
+        if request.method != 'HEAD':
+            response.body = self._body(body_path, size, etag)
+        return response
+
+    def accepted_encodings(self):
+        """
+        Returns the content encodings of encodings accepted by the client. ``*`` accepts every
+        encoding not refused with q=0
+        :rtype: set
+        """
+        accepted, refused = set(), set()
+        for item in request.environ.get('HTTP_ACCEPT_ENCODING', '').split(','):
+            name, _, params = item.partition(';')
+            params = params.replace(' ', '')
+            name = name.strip().lower()
+            if params.startswith('q=') and params[2:].strip('0.') == '':
+                refused.add(name)
+            else:
+                accepted.add(name)
+        if '*' in accepted:
+            accepted.update(self.encodings)
+        return accepted - refused
+
+    def _set_cache_headers(self, response, versioned):
+        if versioned:
+            response.set_header('Cache-Control', 'public, max-age={age}, immutable'.format(age=self.immutable_max_age))
+        elif self.max_age is not None:
+            response.set_header('Cache-Control', 'public, max-age={age}'.format(age=self.max_age))
+
+    @staticmethod
+    def _not_modified(info, etag):
+        if_none_match = request.environ.get('HTTP_IF_NONE_MATCH')
+        if if_none_match:
+            # weak comparison: CompressionMiddleware sends the ETag of compressed bodies as weak
+            return etag_matches(if_none_match, etag)
+        if_modified_since = request.environ.get('HTTP_IF_MODIFIED_SINCE')
+        if if_modified_since:
+            if_modified_since = parse_date(if_modified_since.split(';')[0].strip())
+            return if_modified_since is not None and if_modified_since >= int(info.mtime)
+        return False
+
+    def _body(self, path, size, etag):
+        if size > self.memory_max_file_size:
+            return open(path, 'rb')
+        # keyed by content too, so a file changed under auto_reload is read again
+        key = (path, etag)
+        try:
+            return self._memory.get(key)
+        except KeyError:
+            with open(path, 'rb') as fp:
+                data = fp.read()
+            self._memory.put(key, data)
+            return data
+
+    def is_compressible(self, path):
+        mimetype, encoding = mimetypes.guess_type(path)
+        if encoding or not mimetype:
+            return False
+        return mimetype.startswith('text/') or mimetype in self.compressible_types
+
+    def compress(self, min_size=256):
+        """
+        Writes ``.gz`` (and ``.br`` when the brotli package is installed) siblings for every
+        compressible file in the static folder. Variants not smaller than the original are skipped.
+        :param min_size: smallest file size worth compressing
+        :type min_size: int
+        :return: list of written files
+        :rtype: list
+        """
+        compressors = {'gzip': lambda data: gzip.compress(data, 9, mtime=0)}
+        if brotli is not None:
+            compressors['br'] = lambda data: brotli.compress(data, quality=11)
+        written = []
+        suffixes = tuple(self.extensions.values())
+        for root, dirs, files in os.walk(self.root):
+            for filename in files:
+                path = os.path.join(root, filename)
+                if filename.endswith(suffixes) or not self.is_compressible(path):
+                    continue
+                with open(path, 'rb') as fp:
+                    data = fp.read()
+                if len(data) < min_size:
+                    continue
+                for content_encoding, compressor in compressors.items():
+                    compressed = compressor(data)
+                    variant_path = path + self.extensions[content_encoding]
+                    if len(compressed) >= len(data):
+                        continue
+                    with open(variant_path, 'wb') as fp:
+                        fp.write(compressed)
+                    written.append(variant_path)
+        return written
@@ -1,29 +1,48 @@
 import re
-from bottle import Router
+
+from bottle import Route, makelist
 
 from ron.base.ronobject import RonObject
 from ron.exceptions.invalid_configuration_exception import InvalidConfigurationException
+from ron.web.reverse import reverse_index
+from ron.web.router import update_router
+
 
 class UrlManagerComponent(RonObject):
+    """
+    Rewrites the application routes: removes routes matching ``remove_rules`` and adds the
+    routes in ``rules``.
+
+    Rules are compiled once and applied incrementally: every call only looks at the routes
+    registered since the previous one. Checked routes are flagged in their config. Added and
+    removed routes are applied to the live router, method by method, see update_router.
+    ``report`` tells which rules matched which routes.
+    """
 
+    # routes to add, as (path, method, 'controller.namespace.action')
     rules = []
 
+    # routes to remove, as a path regex or a (path regex, method or list of methods) tuple
     remove_rules = []
 
-    def set_routes(self):
-        from ron import Application
-        for route in self.rules:
-            try:
-                bottle_route = [route[0], route[1], Application().find_action(route[2])]
-                Application().route(*bottle_route)
-            except:
-                raise InvalidConfigurationException()
+    # route config key flagging the routes already checked against remove_rules
+    checked_key = 'url_manager.checked'
 
-    def remove_defined_routes(self):
-        from ron import Application
-        current_routes = [r for r in Application().routes]
+    def __init__(self, *args, **kwargs):
+        RonObject.__init__(self, *args, **kwargs)
+        self._compiled_remove_rules = None
+        self._added_rules = set()
+        self.removed = {}
+        self.added = {}
 
-        for default_route in Application().routes:
+    def compiled_remove_rules(self):
+        """
+        Returns the remove rules as (original rule, compiled regex, methods) tuples.
+        methods is '*' for any method
+        :rtype: list
+        """
+        if self._compiled_remove_rules is None:
+            compiled = []
             for rule_to_remove in self.remove_rules:
                 try:
                     if isinstance(rule_to_remove, str):
@@ -35,14 +54,93 @@ class UrlManagerComponent(RonObject):
                             method = [rule_to_remove[1]]
                         else:
                             method = rule_to_remove[1]
-                except:
-                    raise InvalidConfigurationException()
-                if re.findall(rule, default_route.rule) and (method == '*' or default_route.method in method):
-                    if default_route in current_routes:
-                        current_routes.remove(default_route)
-
-        if current_routes:
-            Application().router = Router()
-            Application().routes = []
-            for route in current_routes:
-                Application().add_route(route)
+                    compiled.append((rule_to_remove, re.compile(rule), method))
+                except Exception:
+                    raise InvalidConfigurationException('Invalid URL manager remove rule: {rule!r}'.format(rule=rule_to_remove))
+            self._compiled_remove_rules = compiled
+        return self._compiled_remove_rules
+
+    def set_routes(self, strict=True):
+        """
+        Builds the routes defined in rules that were not added yet. They are not registered in
+        the application: update does it
+        :param strict: raise if a rule action cannot be found. Otherwise it is retried on the next call
+        :type strict: bool
+        :return: the new routes
+        :rtype: list
+        """
+        from ron import Application
+        app = Application()
+        added = []
+        for index, route in enumerate(self.rules):
+            if index in self._added_rules:
+                continue
+            try:
+                action = app.find_action(route[2])
+            except Exception:
+                if strict:
+                    raise InvalidConfigurationException('Invalid URL manager rule: {rule!r}'.format(rule=route))
+                continue
+            for method in makelist(route[1]):
+                added_route = Route(app, route[0], method.upper(), action)
+                added_route.config[self.checked_key] = True
+                added.append(added_route)
+            self._added_rules.add(index)
+            reverse_index.add(route[2], app, route[0], first=True)
+            self.added[tuple(route)] = '{method} {rule}'.format(method=route[1], rule=route[0])
+        return added
+
+    def remove_defined_routes(self):
+        """
+        Finds the application routes, registered since the last call, that match remove_rules.
+        They are not removed from the application: update does it
+        :return: the routes to remove
+        :rtype: list
+        """
+        from ron import Application
+        app = Application()
+        remove_rules = self.compiled_remove_rules()
+        to_remove = []
+
+        for default_route in app.routes:
+            if default_route.config.get(self.checked_key):
+                continue
+            default_route.config[self.checked_key] = True
+            for rule_to_remove, pattern, method in remove_rules:
+                if pattern.search(default_route.rule) and (method == '*' or default_route.method in method):
+                    to_remove.append(default_route)
+                    self.removed.setdefault(rule_to_remove if isinstance(rule_to_remove, str) else tuple(rule_to_remove), []).append(
+                        '{method} {rule}'.format(method=default_route.method, rule=default_route.rule))
+                    break
+        return to_remove
+
+    def update(self, strict=True):
+        """
+        Applies the rules to the routes registered since the last call. Only the router tables
+        of the methods concerned are rebuilt, each swapped in at once, so requests dispatched
+        meanwhile, e.g. while a lazy module loads, see either the old routes or the new ones
+        """
+        from ron import Application
+        app = Application()
+        to_remove = self.remove_defined_routes()
+        added = self.set_routes(strict=strict)
+        if to_remove:
+            removed = set(to_remove)
+            app.routes[:] = [route for route in app.routes if route not in removed]
+        app.routes.extend(added)
+        if to_remove or added:
+            update_router(app.router, to_remove, added)
+
+    def report(self):
+        """
+        Returns the routes removed by each remove rule, the routes added by each rule, and the
+        rules that did not match anything
+        :rtype: dict
+        """
+        return {
+            'removed': dict(self.removed),
+            'added': dict(self.added),
+            'unmatched': [rule for rule, pattern, method in self.compiled_remove_rules()
+                          if (rule if isinstance(rule, str) else tuple(rule)) not in self.removed]
+                         + [tuple(rule) for index, rule in enumerate(self.rules) if index not in self._added_rules],
+        }
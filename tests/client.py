@@ -0,0 +1,58 @@
+import asyncio
+import io
+
+
+def call(app, path, headers=None, method='GET'):
+    """
+    Calls a WSGI application
+    :return: status line, headers dict and body
+    :rtype: tuple
+    """
+    environ = {
+        'REQUEST_METHOD': method,
+        'PATH_INFO': path,
+        'QUERY_STRING': '',
+        'SERVER_NAME': 'localhost',
+        'SERVER_PORT': '80',
+        'wsgi.url_scheme': 'http',
+        'wsgi.input': io.BytesIO(),
+        'wsgi.errors': io.StringIO(),
+    }
+    environ.update(headers or {})
+    response = {}
+
+    def start_response(status, response_headers, exc_info=None):
+        response['status'], response['headers'] = status, dict(response_headers)
+
+    result = app(environ, start_response)
+    try:
+        body = b''.join(result)
+    finally:
+        if hasattr(result, 'close'):
+            result.close()
+    return response['status'], response['headers'], body
+
+
+async def call_asgi(app, path, headers=(), method='GET'):
+    """
+    Calls an ASGI application
+    :return: status code, headers dict and body
+    :rtype: tuple
+    """
+    sent = []
+    messages = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        await asyncio.Event().wait()
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {'type': 'http', 'method': method, 'path': path, 'query_string': b'', 'root_path': '',
+             'headers': [(name.encode('latin1'), value.encode('latin1')) for name, value in headers],
+             'http_version': '1.1', 'scheme': 'http', 'server': ('localhost', 80)}
+    await app(scope, receive, send)
+    headers = {name.decode('latin1'): value.decode('latin1') for name, value in sent[0]['headers']}
+    return sent[0]['status'], headers, b''.join(message.get('body', b'') for message in sent[1:])
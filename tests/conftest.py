@@ -0,0 +1,57 @@
+import bottle
+import pytest
+
+from ron import Application
+from ron.base import Module
+from ron.base.lazymodule import LazyModule
+from ron.base.singleton import Singleton
+from ron.models import PeeweeDB
+from ron.web.reverse import reverse_index
+
+
+@pytest.fixture
+def make_app(tmp_path):
+    """
+    Returns a function creating a fresh Application from a config dict, with a SQLite database
+    in a temporary directory unless the config has a db component. The application singleton
+    and the state modules share through class attributes are reset afterwards
+    """
+    module_plugins = list(Module.module_plugins)
+    controllers = dict(Module.controllers)
+
+    def make(config=None, initialize=True):
+        config = dict(config or {})
+        components = config['components'] = dict(config.get('components', {}))
+        components.setdefault('db', {'class': PeeweeDB, 'on_initialize': True,
+                                     'options': {'connection': 'sqlite:///%s' % (tmp_path / 'db.sqlite')}})
+        Singleton._instances.pop(Application, None)
+        app = Application(config)
+        if initialize:
+            app.initialize()
+        return app
+
+    yield make
+    Singleton._instances.pop(Application, None)
+    Module.module_plugins[:] = module_plugins
+    Module.controllers.clear()
+    Module.controllers.update(controllers)
+    LazyModule.pending[:] = []
+    reverse_index.reset()
+
+
+@pytest.fixture
+def context_locals():
+    """
+    Makes bottle.request and bottle.response context-local for one test
+    """
+    from ron.web.asgi import use_context_locals
+    saved = {cls: dict(vars(cls)) for cls in (bottle.LocalRequest, bottle.LocalResponse)}
+    use_context_locals()
+    yield
+    for cls, attributes in saved.items():
+        for name in list(vars(cls)):
+            if name not in attributes:
+                delattr(cls, name)
+        for name, value in attributes.items():
+            if vars(cls).get(name) is not value:
+                setattr(cls, name, value)
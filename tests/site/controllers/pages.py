@@ -0,0 +1,17 @@
+from ron import request
+from ron.web import Controller
+
+
+class PagesController(Controller):
+
+    @Controller.route('/')
+    def index(self):
+        return 'index path=' + request.path
+
+    @Controller.route('/page/<n:int>')
+    def page(self, n):
+        return 'page %d path=%s' % (n, request.path)
+
+    @Controller.route('/about')
+    def about(self):
+        return 'about'
@@ -0,0 +1,5 @@
+from ron.base import Module
+
+
+class SiteModule(Module):
+    pass
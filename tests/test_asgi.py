@@ -0,0 +1,83 @@
+import asyncio
+import time
+
+import bottle
+
+from tests.client import call_asgi
+
+
+def test_sync_body_keeps_its_request(make_app):
+    app = make_app({'asgi_threads': 4})
+
+    @app.route('/r<n:int>')
+    def echo(n):
+        for _ in range(5):
+            time.sleep(0.005)
+            yield bottle.request.path + ' '
+
+    async def main():
+        return await asyncio.gather(*(call_asgi(app.get_asgi(), '/r%d' % n) for n in range(6)))
+
+    for n, (status, headers, body) in enumerate(asyncio.run(main())):
+        assert status == 200
+        assert body.decode().split() == ['/r%d' % n] * 5
+
+
+def test_sync_body_runs_on_one_thread(make_app):
+    import threading
+    app = make_app({'asgi_threads': 4})
+
+    @app.route('/threads')
+    def threads():
+        for _ in range(5):
+            yield str(threading.get_ident()) + ' '
+
+    status, headers, body = asyncio.run(call_asgi(app.get_asgi(), '/threads'))
+    assert len(set(body.split())) == 1
+
+
+def test_async_action(make_app, context_locals):
+    app = make_app({'asgi_context_locals': True})
+
+    async def hello():
+        await asyncio.sleep(0)
+        return {'path': bottle.request.path}
+
+    app.route('/hello', callback=hello)
+    status, headers, body = asyncio.run(call_asgi(app.get_asgi(), '/hello'))
+    assert status == 200
+    assert body == b'{"path":"/hello"}'
+
+
+def test_sync_body_closed_when_the_client_is_gone(make_app):
+    app = make_app()
+    closed = []
+
+    @app.route('/endless')
+    def endless():
+        try:
+            while True:
+                yield b'chunk'
+        finally:
+            closed.append(True)
+
+    async def main():
+        messages = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message)
+            if len(sent) > 3:
+                raise OSError('client disconnected')
+
+        scope = {'type': 'http', 'method': 'GET', 'path': '/endless', 'query_string': b'', 'headers': []}
+        try:
+            await app.get_asgi()(scope, receive, send)
+        except OSError:
+            pass
+
+    asyncio.run(main())
+    assert closed == [True]
@@ -0,0 +1,72 @@
+import gzip
+
+from ron.web.compression import CompressionMiddleware
+from tests.client import call
+
+
+def test_negotiate():
+    middleware = CompressionMiddleware(None)
+    assert middleware.negotiate('') is None
+    assert middleware.negotiate('gzip') == 'gzip'
+    assert middleware.negotiate('deflate, gzip;q=0.5') == 'gzip'
+    assert middleware.negotiate('*') == 'gzip'
+    assert middleware.negotiate('gzip;q=0, *') == 'deflate'
+    assert middleware.negotiate('gzip;q=0, deflate;q=0.0, *') is None
+    assert middleware.negotiate('*;q=0') is None
+
+
+def make_static_app(make_app, tmp_path):
+    (tmp_path / 'app.css').write_text('body { color: red; }\n' * 100)
+    return make_app({
+        'statics': {'root': str(tmp_path)},
+        'middlewares': [{'class': CompressionMiddleware, 'options': {'min_size': 100}}],
+    })
+
+
+def test_static_file_revalidation(make_app, tmp_path):
+    app = make_static_app(make_app, tmp_path)
+    wsgi = app.get_with_middleware()
+    status, headers, body = call(wsgi, '/static/app.css', {'HTTP_ACCEPT_ENCODING': 'gzip'})
+    assert status == '200 OK'
+    assert headers['Content-Encoding'] == 'gzip'
+    assert headers['Etag'].startswith('W/"')
+    assert gzip.decompress(body) == (tmp_path / 'app.css').read_bytes()
+
+    status, headers, body = call(wsgi, '/static/app.css', {'HTTP_ACCEPT_ENCODING': 'gzip',
+                                                           'HTTP_IF_NONE_MATCH': headers['Etag']})
+    assert status == '304 Not Modified'
+    assert body == b''
+    assert headers['Vary'] == 'Accept-Encoding'
+
+
+def test_not_modified_carries_vary(make_app, tmp_path):
+    app = make_app({'etags': True, 'middlewares': [{'class': CompressionMiddleware, 'options': {'min_size': 10}}]})
+    app.route('/page', callback=lambda: 'hello compression ' * 100)
+    wsgi = app.get_with_middleware()
+    status, headers, body = call(wsgi, '/page', {'HTTP_ACCEPT_ENCODING': 'gzip'})
+    assert headers['Vary'] == 'Accept-Encoding'
+    status, headers, body = call(wsgi, '/page', {'HTTP_ACCEPT_ENCODING': 'gzip', 'HTTP_IF_NONE_MATCH': headers['Etag']})
+    assert status == '304 Not Modified'
+    assert headers['Vary'] == 'Accept-Encoding'
+
+
+def test_streamed_body_is_compressed(make_app):
+    app = make_app({'middlewares': [{'class': CompressionMiddleware, 'options': {'min_size': 10}}]})
+
+    @app.route('/feed')
+    def feed():
+        for n in range(3):
+            yield 'chunk %d;' % n
+
+    status, headers, body = call(app.get_with_middleware(), '/feed', {'HTTP_ACCEPT_ENCODING': 'gzip'})
+    assert headers['Content-Encoding'] == 'gzip'
+    assert 'Content-Length' not in headers
+    assert gzip.decompress(body) == b'chunk 0;chunk 1;chunk 2;'
+
+
+def test_small_bodies_are_sent_as_they_are(make_app):
+    app = make_app({'middlewares': [{'class': CompressionMiddleware, 'options': {'min_size': 1024}}]})
+    app.route('/small', callback=lambda: 'small')
+    status, headers, body = call(app.get_with_middleware(), '/small', {'HTTP_ACCEPT_ENCODING': 'gzip'})
+    assert 'Content-Encoding' not in headers
+    assert body == b'small'
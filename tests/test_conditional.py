@@ -0,0 +1,35 @@
+from ron.web.conditional import conditional
+from tests.client import call
+
+
+def test_etag_from_the_body(make_app):
+    app = make_app({'etags': True})
+
+    @app.route('/hello')
+    def hello():
+        return 'hello'
+
+    status, headers, body = call(app, '/hello')
+    assert status == '200 OK'
+    etag = headers['Etag']
+    assert etag.startswith('W/"')
+    status, headers, body = call(app, '/hello', {'HTTP_IF_NONE_MATCH': etag})
+    assert status == '304 Not Modified'
+    assert body == b''
+    assert call(app, '/hello', {'HTTP_IF_NONE_MATCH': '"other"'})[2] == b'hello'
+
+
+def test_validators_checked_before_rendering(make_app):
+    app = make_app()
+    rendered = []
+
+    @app.route('/item')
+    def item():
+        conditional(etag=3, last_modified=1700000000)
+        rendered.append(True)
+        return 'item 3'
+
+    headers = call(app, '/item')[1]
+    assert call(app, '/item', {'HTTP_IF_NONE_MATCH': headers['Etag']})[0] == '304 Not Modified'
+    assert call(app, '/item', {'HTTP_IF_MODIFIED_SINCE': headers['Last-Modified']})[0] == '304 Not Modified'
+    assert len(rendered) == 1
@@ -0,0 +1,99 @@
+import threading
+
+from ron.models import PeeweeDB
+from tests.client import call
+
+
+def pooled_app(make_app, tmp_path, **options):
+    options.setdefault('connection', 'sqlite:///%s' % (tmp_path / 'pool.sqlite'))
+    return make_app({'components': {'db': {'class': PeeweeDB, 'on_initialize': True,
+                                           'options': dict(max_connections=4, **options)}}})
+
+
+def test_connection_released_after_a_streamed_body(make_app, tmp_path, monkeypatch):
+    app = pooled_app(make_app, tmp_path)
+    # a query on a connection released before the body is sent fails instead of reconnecting
+    monkeypatch.setattr(app.db.database, 'autoconnect', False)
+    in_use = []
+
+    @app.route('/rows')
+    def rows():
+        for n in range(3):
+            app.db.database.execute_sql('SELECT %d' % n)
+            in_use.append(app.db.pool_stats()['primary']['in_use'])
+            yield '%d ' % n
+
+    status, headers, body = call(app, '/rows')
+    assert body == b'0 1 2 '
+    assert in_use == [1, 1, 1]
+    assert app.db.pool_stats()['primary']['in_use'] == 0
+
+
+def test_connection_released_after_an_empty_or_failing_body(make_app, tmp_path, monkeypatch):
+    app = pooled_app(make_app, tmp_path)
+    monkeypatch.setattr(app.db.database, 'autoconnect', False)
+
+    @app.route('/empty')
+    def empty():
+        app.db.database.execute_sql('SELECT 1')
+        return iter(())
+
+    @app.route('/failing')
+    def failing():
+        app.db.database.execute_sql('SELECT 1')
+        raise ValueError('no rows')
+        yield
+
+    call(app, '/empty')
+    call(app, '/failing')
+    assert app.db.pool_stats()['primary']['in_use'] == 0
+
+
+def test_connection_released_after_a_plain_body(make_app, tmp_path):
+    app = pooled_app(make_app, tmp_path)
+
+    @app.route('/one')
+    def one():
+        return str(app.db.database.execute_sql('SELECT 1').fetchone()[0])
+
+    assert call(app, '/one')[2] == b'1'
+    stats = app.db.pool_stats()['primary']
+    assert stats['in_use'] == 0
+    assert stats['idle'] == 1
+
+
+def test_replicas_are_not_used_in_a_transaction(make_app, tmp_path):
+    replica = 'sqlite:///%s' % (tmp_path / 'replica.sqlite')
+    app = pooled_app(make_app, tmp_path, replicas=[replica])
+    assert app.db.read_database() is app.db().replicas[0]
+    with app.db.database.atomic():
+        assert app.db.read_database() is None
+    assert app.db.read_database() is app.db().replicas[0]
+
+
+def test_replica_transactions_are_per_thread(make_app, tmp_path):
+    replica = 'sqlite:///%s' % (tmp_path / 'replica.sqlite')
+    app = pooled_app(make_app, tmp_path, replicas=[replica])
+    other = []
+    with app.db.database.atomic():
+        thread = threading.Thread(target=lambda: other.append(app.db.read_database()))
+        thread.start()
+        thread.join()
+        assert app.db.read_database() is None
+    assert other == [app.db().replicas[0]]
+
+
+def test_queries_counted_by_action(make_app, tmp_path):
+    app = pooled_app(make_app, tmp_path, n_plus_one_threshold=2)
+
+    @app.route('/queries')
+    def queries():
+        for n in range(3):
+            app.db.database.execute_sql('SELECT %d' % n)
+        return 'done'
+
+    call(app, '/queries')
+    stats = next(iter(app.db.query_stats().values()))
+    assert stats['requests'] == 1
+    assert stats['queries'] == 3
+    assert stats['n_plus_one'] == 1
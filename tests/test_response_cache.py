@@ -0,0 +1,27 @@
+from ron.caching.cache import CacheComponent
+from ron.caching.response import ResponseCache
+from tests.client import call
+
+
+class Pages:
+    built = 0
+
+    @ResponseCache(ttl=60, tags=('pages',))
+    def page(self):
+        from ron import response
+        Pages.built += 1
+        response.set_header('X-Built', str(Pages.built))
+        return 'page %d' % Pages.built
+
+
+def test_response_served_from_cache_until_invalidated(make_app):
+    app = make_app({'components': {'cache_component': {'class': CacheComponent, 'options': {'type': 'memory'}}}})
+    pages = Pages()
+    app.route('/page', callback=pages.page)
+
+    assert call(app, '/page')[2] == b'page 1'
+    status, headers, body = call(app, '/page')
+    assert body == b'page 1'
+    assert headers['X-Built'] == '1'
+    ResponseCache.invalidate('pages')
+    assert call(app, '/page')[2] == b'page 2'
@@ -0,0 +1,36 @@
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from ron.web.server import PooledWSGIServer, QuietHandler
+
+
+def test_pooled_server_bounds_concurrent_requests():
+    lock = threading.Lock()
+    running = [0, 0]
+
+    def app(environ, start_response):
+        with lock:
+            running[0] += 1
+            running[1] = max(running)
+        time.sleep(0.05)
+        with lock:
+            running[0] -= 1
+        start_response('200 OK', [('Content-Type', 'text/plain')])
+        return [b'ok']
+
+    server = PooledWSGIServer(('127.0.0.1', 0), QuietHandler, threads=2)
+    server.set_app(app)
+    thread = threading.Thread(target=server.serve_forever, kwargs={'poll_interval': 0.05})
+    thread.start()
+    try:
+        url = 'http://127.0.0.1:%d/' % server.server_address[1]
+        with ThreadPoolExecutor(max_workers=6) as clients:
+            bodies = list(clients.map(lambda _: urllib.request.urlopen(url, timeout=5).read(), range(6)))
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join()
+    assert bodies == [b'ok'] * 6
+    assert running[1] == 2
@@ -0,0 +1,110 @@
+import time
+
+from ron.web.session import WriteBehind
+
+
+class FlakyCache:
+
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.values = {}
+
+    def put(self, key, value):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError('cache unavailable')
+        self.values[key] = value
+
+    def remove_value(self, key):
+        self.values.pop(key, None)
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_write_behind_flushes_in_the_background():
+    cache = FlakyCache()
+    writer = WriteBehind(cache, batch_size=2, flush_interval=0.05)
+    writer.put('a', 1)
+    assert writer.get('a') == 1
+    writer.put('b', 2)
+    assert wait_for(lambda: cache.values == {'a': 1, 'b': 2})
+    writer.remove('a')
+    assert writer.get('a') is None
+    assert wait_for(lambda: cache.values == {'b': 2})
+
+
+def test_write_behind_requeues_a_failed_batch():
+    cache = FlakyCache(failures=1)
+    writer = WriteBehind(cache, flush_interval=0.05)
+    writer.pending.update([('a', 1), ('b', 2)])
+    try:
+        writer.flush()
+    except ConnectionError:
+        pass
+    assert dict(writer.pending) == {'a': 1, 'b': 2}
+    writer.put('a', 3)
+    writer.flush()
+    assert cache.values == {'a': 3, 'b': 2}
+    assert not writer.pending
+
+
+def test_write_behind_thread_survives_failures():
+    cache = FlakyCache(failures=2)
+    writer = WriteBehind(cache, flush_interval=0.02)
+    writer.put('a', 1)
+    assert wait_for(lambda: cache.values == {'a': 1})
+    writer.put('b', 2)
+    assert wait_for(lambda: cache.values == {'a': 1, 'b': 2})
+
+
+def make_session_app(make_app, **options):
+    from ron import Application
+    from ron.web.session import SessionComponent
+    app = make_app({'components': {'session_manager': {'class': SessionComponent, 'options': options,
+                                                       'on_initialize': True}}})
+
+    @app.route('/write')
+    def write():
+        Application().session_manager()['n'] = 1
+        return 'written'
+
+    @app.route('/read')
+    def read():
+        return str(Application().session_manager().get('n'))
+
+    return app
+
+
+def session_cookie(headers):
+    return {'HTTP_COOKIE': headers['Set-Cookie'].split(';')[0]}
+
+
+def test_beaker_session_unchanged_is_not_saved(make_app):
+    from tests.client import call
+    app = make_session_app(make_app, type='memory')
+    status, headers, body = call(app, '/write')
+    cookie = session_cookie(headers)
+    status, headers, body = call(app, '/read', cookie)
+    assert body == b'1'
+    assert 'Set-Cookie' not in headers
+
+
+def test_beaker_session_timeout_counts_from_the_last_access(make_app, tmp_path, monkeypatch):
+    from tests.client import call
+    now = [time.time()]
+    monkeypatch.setattr(time, 'time', lambda: now[0])
+    app = make_session_app(make_app, type='file', data_dir=str(tmp_path / 'sessions'), timeout=10)
+    status, headers, body = call(app, '/write')
+    cookie = session_cookie(headers)
+    now[0] += 6
+    assert call(app, '/read', cookie)[2] == b'1'
+    now[0] += 6
+    # 12 seconds after the last change, 6 after the last access
+    assert call(app, '/read', cookie)[2] == b'1'
+    now[0] += 11
+    assert call(app, '/read', cookie)[2] == b'None'
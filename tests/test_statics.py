@@ -0,0 +1,53 @@
+import gzip
+import os
+
+import pytest
+
+from tests.client import call
+
+
+@pytest.fixture
+def static_root(tmp_path):
+    root = tmp_path / 'static'
+    root.mkdir()
+    (root / 'app.css').write_text('body { color: red; }\n' * 50)
+    return root
+
+
+def test_versioned_urls_are_immutable(make_app, static_root):
+    app = make_app({'statics': {'root': str(static_root)}})
+    status, headers, body = call(app, '/static/_1.2.3/app.css')
+    assert status == '200 OK'
+    assert 'immutable' in headers['Cache-Control']
+    assert body == (static_root / 'app.css').read_bytes()
+
+
+def test_not_modified(make_app, static_root):
+    app = make_app({'statics': {'root': str(static_root)}})
+    etag = call(app, '/static/app.css')[1]['Etag']
+    assert call(app, '/static/app.css', {'HTTP_IF_NONE_MATCH': etag})[0] == '304 Not Modified'
+    assert call(app, '/static/app.css', {'HTTP_IF_NONE_MATCH': 'W/' + etag})[0] == '304 Not Modified'
+    assert call(app, '/static/app.css', {'HTTP_IF_NONE_MATCH': '"other"'})[0] == '200 OK'
+
+
+def test_precompressed_variants(make_app, static_root):
+    app = make_app({'statics': {'root': str(static_root), 'encodings': ('gzip',)}})
+    assert app.static_files.compress(min_size=10)
+    for accept_encoding in ('gzip', '*', 'br;q=0, *'):
+        status, headers, body = call(app, '/static/app.css', {'HTTP_ACCEPT_ENCODING': accept_encoding})
+        assert headers.get('Content-Encoding') == 'gzip'
+        assert gzip.decompress(body) == (static_root / 'app.css').read_bytes()
+    status, headers, body = call(app, '/static/app.css', {'HTTP_ACCEPT_ENCODING': 'gzip;q=0, *'})
+    assert 'Content-Encoding' not in headers
+    assert headers['Vary'] == 'Accept-Encoding'
+
+
+def test_memory_cache_follows_changed_files(make_app, static_root):
+    app = make_app({'statics': {'root': str(static_root), 'memory_max_file_size': 4096, 'auto_reload': True}})
+    assert call(app, '/static/app.css')[2] == (static_root / 'app.css').read_bytes()
+    (static_root / 'app.css').write_text('body { color: blue; }\n')
+    stats = os.stat(static_root / 'app.css')
+    os.utime(static_root / 'app.css', (stats.st_atime, stats.st_mtime + 10))
+    status, headers, body = call(app, '/static/app.css')
+    assert body == b'body { color: blue; }\n'
+    assert headers['Content-Length'] == str(len(body))
@@ -0,0 +1,38 @@
+from ron.templates.yatl_template import YatlTemplate
+
+
+def make_template(tmp_path, text, name='page.tpl'):
+    (tmp_path / name).write_text(text)
+    return YatlTemplate(name=name, lookup=[str(tmp_path)])
+
+
+def test_stream_matches_render(tmp_path):
+    template = make_template(tmp_path, '<ul>{{for x in rows:}}<li>{{=x}}</li>{{pass}}</ul>')
+    assert ''.join(template.stream(rows=range(3))) == template.render(rows=range(3))
+
+
+def test_stream_keeps_def_helpers_output(tmp_path):
+    template = make_template(tmp_path, '<ul>{{def row(x):}}<li>{{=x}}</li>{{return}}'
+                                       '{{for x in rows:}}{{row(x)}}{{pass}}</ul>')
+    assert template.render(rows=[1, 2]) == '<ul><li>1</li><li>2</li></ul>'
+    assert ''.join(template.stream(rows=[1, 2])) == '<ul><li>1</li><li>2</li></ul>'
+
+
+def test_stream_sends_chunks_while_rendering(tmp_path):
+    template = make_template(tmp_path, '{{for x in rows:}}{{=x}}{{=FLUSH}}{{pass}}')
+    consumed = []
+
+    def rows():
+        for x in range(3):
+            consumed.append(x)
+            yield x
+
+    chunks = template.stream(rows=rows())
+    assert next(chunks) == '0'
+    assert consumed == [0]
+    assert list(chunks) == ['1', '2']
+
+
+def test_stream_chunk_size(tmp_path):
+    template = make_template(tmp_path, '{{for x in rows:}}{{=x}}{{pass}}')
+    assert list(template.stream(rows=range(10), chunk_size=4)) == ['0123', '4567', '89']
@@ -0,0 +1,72 @@
+from bottle import Bottle, Route
+
+from ron.web.router import FlatRouter, build_flat_router, update_router
+from ron.web.urlmanager import UrlManagerComponent
+from tests.client import call
+from tests.site.module import SiteModule
+
+
+def make_site(make_app, **options):
+    return make_app({
+        'modules': {'/site': {'class': SiteModule, 'options': {}}},
+        'components': {'url_manager': {'class': UrlManagerComponent, 'options': options, 'on_initialize': True}},
+    })
+
+
+def test_rules_add_and_remove_routes(make_app):
+    app = make_site(make_app, remove_rules=[('^/site', 'PROXY')],
+                    rules=[('/p/<n:int>', 'GET', 'tests.site.controllers.pages.page'),
+                           ('/about', 'GET', 'tests.site.controllers.pages.about')])
+    assert call(app, '/site/about')[0] == '404 Not Found'
+    assert call(app, '/p/3')[2] == b'page 3 path=/p/3'
+    assert call(app, '/about')[2] == b'about'
+    report = app.url_manager.report()
+    assert report['removed'] == {('^/site', 'PROXY'): ['PROXY /site/<:re:.*>', 'PROXY /site']}
+    assert report['unmatched'] == []
+
+
+def test_update_keeps_the_router(make_app):
+    app = make_site(make_app, rules=[('/p/<n:int>', 'GET', 'tests.site.controllers.pages.page')])
+    router = app.router
+    for n in range(150):
+        app.route('/dynamic%d/<x>' % n, callback=lambda x: x)
+    regexes = list(router.dyna_regexes['GET'])
+    app.url_manager.rules = app.url_manager.rules + [('/q/<n:int>', 'GET', 'tests.site.controllers.pages.page')]
+    app.url_manager.update()
+    assert app.router is router
+    # the first combined regex holds 99 unchanged rules and is not compiled again
+    assert router.dyna_regexes['GET'][0] is regexes[0]
+    assert call(app, '/q/4')[2] == b'page 4 path=/q/4'
+    assert call(app, '/dynamic149/y')[2] == b'y'
+
+
+def test_update_router_replaces_one_method():
+    app = Bottle()
+    app.route('/a/<x>', callback=lambda x: 'get ' + x)
+    app.route('/a/<x>', method='POST', callback=lambda x: 'post ' + x)
+    app.route('/static', callback=lambda: 'static')
+    post_regexes = app.router.dyna_regexes['POST']
+    added = Route(app, '/b/<x>', 'GET', lambda x: 'b ' + x)
+    update_router(app.router, removed=[app.routes[0]], added=[added])
+    assert app.router.dyna_regexes['POST'] is post_regexes
+    assert call(app, '/a/1')[0] == '405 Method Not Allowed'
+    assert call(app, '/a/1', method='POST')[2] == b'post 1'
+    assert call(app, '/b/1')[2] == b'b 1'
+    assert call(app, '/static')[2] == b'static'
+
+
+def test_flat_router_update_removes_a_mount():
+    app, sub = Bottle(), Bottle()
+    sub.route('/x/<n>', callback=lambda n: 'sub ' + n)
+    sub.route('/y', callback=lambda: 'y')
+    app.mount('/sub', sub)
+    app.route('/z', callback=lambda: 'z')
+    app.router = build_flat_router(app)
+    assert isinstance(app.router, FlatRouter)
+    assert call(app, '/sub/x/1')[2] == b'sub 1'
+    mount = [route for route in app.routes if route.method == 'PROXY']
+    update_router(app.router, removed=mount, added=[Route(app, '/w/<n>', 'GET', lambda n: 'w ' + n)])
+    assert call(app, '/sub/x/1')[0] == '404 Not Found'
+    assert call(app, '/sub/y')[0] == '404 Not Found'
+    assert call(app, '/w/2')[2] == b'w 2'
+    assert call(app, '/z')[2] == b'z'